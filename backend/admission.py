@@ -0,0 +1,90 @@
+"""
+Request admission: keep in-flight requests within what the request
+threadpool and the database connection pool can serve together.
+
+Sync dependencies, route bodies and response serialization each run in a
+separate AnyIO threadpool hop, and a request's session keeps its connection
+from its first query until the session closes, across those hops. With more
+requests in flight than connections, every thread can end up blocked in a
+pool checkout while the connections are held by requests waiting for a
+thread; nothing moves until the checkout times out. A registration rush of
+100 concurrent enrollments, or plain GETs, got there.
+
+AdmissionMiddleware runs at most request_limit() requests at a time and
+queues the rest on the event loop, where they hold neither a thread nor a
+connection. The limit is REQUEST_THREADS, capped by the pool minus the
+connections background threads use (background_connections()), and the
+threadpool is sized to REQUEST_THREADS on each event loop's first request.
+An admitted request therefore never waits for a thread or a connection.
+
+/api/batch gives its slot back (release()) once it has authenticated and
+closed its session; each sub-request takes a slot of its own.
+"""
+import logging
+
+import anyio
+import anyio.to_thread
+from anyio.lowlevel import RunVar
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+SCOPE_KEY = "kastra.admission"
+
+# Per event loop, like AnyIO's own default thread limiter
+_slots: RunVar = RunVar("kastra_admission_slots")
+
+
+def background_connections() -> int:
+    """Connections held outside requests: job dispatcher and handlers, group-commit writer, health check."""
+    jobs = 1 + settings.JOB_WORKERS if settings.JOBS_ENABLED else 0
+    return jobs + 2
+
+
+def request_limit() -> int:
+    connections = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW - background_connections()
+    return max(min(settings.REQUEST_THREADS, connections), 1)
+
+
+def _limiter() -> anyio.CapacityLimiter:
+    try:
+        return _slots.get()
+    except LookupError:
+        limit = request_limit()
+        if limit < settings.REQUEST_THREADS:
+            logger.warning(
+                "Connection pool (%d + %d) leaves room for %d concurrent requests, fewer than REQUEST_THREADS=%d",
+                settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW, limit, settings.REQUEST_THREADS
+            )
+        anyio.to_thread.current_default_thread_limiter().total_tokens = settings.REQUEST_THREADS
+        limiter = anyio.CapacityLimiter(limit)
+        _slots.set(limiter)
+        return limiter
+
+
+def release(scope: dict):
+    """Give the request's slot back early; it must not touch its session afterwards."""
+    token = scope.pop(SCOPE_KEY, None)
+    if token is not None:
+        _limiter().release_on_behalf_of(token)
+
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = object()
+        await _limiter().acquire_on_behalf_of(token)
+        scope[SCOPE_KEY] = token
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            release(scope)
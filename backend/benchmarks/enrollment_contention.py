@@ -0,0 +1,220 @@
+"""
+Registration-rush contention test for course capacity.
+
+Fires many concurrent POST /api/enrollments for one course with a small
+capacity, then checks that exactly ``capacity`` students got a seat, the rest
+were waitlisted, and the seat counter matches the enrollments table. A second
+wave unenrolls some students concurrently and checks that the waitlist
+refilled every freed seat. Run from the backend directory:
+
+    python -m benchmarks.enrollment_contention                       # scratch SQLite DB, in-process app
+    python -m benchmarks.enrollment_contention --students 2000 --capacity 150 --concurrency 200
+    python -m benchmarks.enrollment_contention --base-url http://localhost:8000
+
+In-process runs use a throwaway database. With --base-url the fixtures are
+created in DATABASE_URL, which must be the live server's database (and the
+same SECRET_KEY). Exits non-zero if any course was oversubscribed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import List, Optional
+
+
+async def _fire(client, requests: List[tuple], concurrency: int):
+    """Send (method, path, json) requests with bounded concurrency; returns latencies, statuses, duration."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], Counter()
+
+    async def one(method, path, body):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                statuses[response.status_code] += 1
+            except Exception:
+                statuses[0] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(*request) for request in requests))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def create_fixtures(students: int, capacity: int) -> dict:
+    from sqlalchemy import insert
+    from database import Base, SessionLocal, engine
+    from auth import create_access_token, get_password_hash
+    import models
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        tag = str(int(time.time() * 1000))
+        password_hash = get_password_hash("contention")
+        admin = models.User(email=f"contention-admin-{tag}@example.com", password_hash=password_hash,
+                            first_name="Contention", last_name="Admin", role=models.RoleEnum.admin)
+        teacher_user = models.User(email=f"contention-teacher-{tag}@example.com", password_hash=password_hash,
+                                   first_name="Contention", last_name="Teacher", role=models.RoleEnum.teacher)
+        db.add_all([admin, teacher_user])
+        db.flush()
+        teacher = models.Teacher(user_id=teacher_user.id)
+        db.add(teacher)
+        db.flush()
+        course = models.Course(name="Registration Rush", code=f"RUSH-{tag}", teacher_id=teacher.id,
+                               capacity=capacity, enrolled_count=0)
+        db.add(course)
+
+        db.execute(insert(models.User), [
+            {"email": f"contention-{tag}-{i}@example.com", "password_hash": password_hash,
+             "first_name": "Student", "last_name": str(i), "role": models.RoleEnum.student}
+            for i in range(students)
+        ])
+        user_ids = [user_id for (user_id,) in db.query(models.User.id).filter(
+            models.User.email.like(f"contention-{tag}-%")
+        )]
+        db.execute(insert(models.Student), [{"user_id": user_id} for user_id in user_ids])
+        db.commit()
+        student_ids = [student_id for (student_id,) in db.query(models.Student.id).filter(
+            models.Student.user_id.in_(user_ids)
+        ).order_by(models.Student.id)]
+        return {
+            "course_id": course.id,
+            "student_ids": student_ids,
+            "token": create_access_token(data={"sub": str(admin.id)}),
+        }
+    finally:
+        db.close()
+
+
+def course_state(course_id: int) -> dict:
+    from sqlalchemy import func
+    from database import SessionLocal
+    import models
+
+    db = SessionLocal()
+    try:
+        return {
+            "capacity": db.query(models.Course.capacity).filter(models.Course.id == course_id).scalar(),
+            "enrolled_count": db.query(models.Course.enrolled_count).filter(models.Course.id == course_id).scalar(),
+            "enrollments": db.query(func.count(models.Enrollment.id)).filter(
+                models.Enrollment.course_id == course_id
+            ).scalar(),
+            "waitlisted": db.query(func.count(models.WaitlistEntry.id)).filter(
+                models.WaitlistEntry.course_id == course_id
+            ).scalar(),
+        }
+    finally:
+        db.close()
+
+
+def enrollment_ids(course_id: int, limit: int) -> List[int]:
+    from database import SessionLocal
+    import models
+
+    db = SessionLocal()
+    try:
+        return [enrollment_id for (enrollment_id,) in db.query(models.Enrollment.id).filter(
+            models.Enrollment.course_id == course_id
+        ).order_by(models.Enrollment.id).limit(limit)]
+    finally:
+        db.close()
+
+
+async def run(args) -> dict:
+    import httpx
+    from benchmarks.loadtest import print_result, summarize
+
+    fixtures = create_fixtures(args.students, args.capacity)
+    course_id = fixtures["course_id"]
+    headers = {"Authorization": f"Bearer {fixtures['token']}"}
+
+    if args.base_url:
+        transport, base_url = None, args.base_url
+    else:
+        from main import app
+        transport, base_url = httpx.ASGITransport(app=app), "http://contention"
+
+    report = {"config": vars(args), "phases": {}}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, headers=headers, timeout=60) as client:
+        requests = [
+            ("POST", "/api/enrollments", {"student_id": student_id, "course_id": course_id})
+            for student_id in fixtures["student_ids"]
+        ]
+        latencies, statuses, duration = await _fire(client, requests, args.concurrency)
+        result = summarize(latencies, statuses, duration)
+        result["state"] = course_state(course_id)
+        report["phases"]["enroll"] = result
+        print_result("enroll (200 seat, 202 waitlist)", result)
+
+        drops = min(args.drop, args.capacity)
+        requests = [("DELETE", f"/api/enrollments/{enrollment_id}", None)
+                    for enrollment_id in enrollment_ids(course_id, drops)]
+        latencies, statuses, duration = await _fire(client, requests, args.concurrency)
+        result = summarize(latencies, statuses, duration)
+        result["state"] = course_state(course_id)
+        report["phases"]["unenroll"] = result
+        print_result("unenroll + promote", result)
+
+    return report
+
+
+def check(report: dict, students: int, capacity: int, drops: int) -> List[str]:
+    problems = []
+    seated = min(students, capacity)
+    enroll = report["phases"]["enroll"]
+    after_enroll = enroll["state"]
+    if after_enroll["enrollments"] > capacity:
+        problems.append(f"oversubscribed: {after_enroll['enrollments']} enrollments for {capacity} seats")
+    if after_enroll["enrollments"] != after_enroll["enrolled_count"]:
+        problems.append(f"seat counter {after_enroll['enrolled_count']} != {after_enroll['enrollments']} enrollments")
+    if enroll["status_codes"].get("200", 0) != seated or after_enroll["enrollments"] != seated:
+        problems.append(f"expected {seated} seats taken, got {after_enroll['enrollments']}")
+    if enroll["status_codes"].get("202", 0) != students - seated:
+        problems.append(f"expected {students - seated} waitlisted, got {enroll['status_codes'].get('202', 0)}")
+
+    after_drop = report["phases"]["unenroll"]["state"]
+    promoted = min(drops, after_enroll["waitlisted"])
+    if after_drop["enrollments"] > capacity or after_drop["enrollments"] != seated - drops + promoted:
+        problems.append(f"after unenrolling {drops}: {after_drop['enrollments']} enrollments")
+    if after_drop["enrollments"] != after_drop["enrolled_count"]:
+        problems.append(f"seat counter {after_drop['enrolled_count']} != {after_drop['enrollments']} enrollments")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Concurrent enrollment contention test.")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--capacity", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=100, help="Requests in flight")
+    parser.add_argument("--drop", type=int, default=25, help="Enrollments to cancel in the second wave")
+    parser.add_argument("--base-url", help="Target a live server instead of the in-process app")
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.base_url:
+            # Must be set before anything imports database.py
+            os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'contention.db')}"
+        report = asyncio.run(run(args))
+
+    problems = check(report, args.students, args.capacity, min(args.drop, args.capacity))
+    report["problems"] = problems
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    for phase, result in report["phases"].items():
+        print(f"{phase:8s} state: {result['state']}")
+    if problems:
+        print("FAILED: " + "; ".join(problems))
+        sys.exit(1)
+    print("OK: no oversubscription, seat counter consistent, waitlist promoted into every freed seat")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Group commit versus per-request commits for bursts of attendance and grade writes.
+
+Fires the same class-changeover burst (POST /api/attendance and POST
+/api/grades, many in flight at once) at the in-process app twice: once with
+every request committing its own transaction, once through the group-commit
+writer. Prints throughput, latency percentiles and error counts side by side,
+and checks that every successful write is in the database. Run from the
+backend directory:
+
+    python -m benchmarks.group_commit
+    python -m benchmarks.group_commit --writes 4000 --concurrency 128 --window-ms 2
+    python -m benchmarks.group_commit --db-dir /var/tmp --output group_commit.json
+
+Each mode starts from empty tables in a scratch SQLite database in --db-dir
+(a temporary directory by default). Commit cost is mostly fsync, so put it on the disk production uses:
+on tmpfs the difference shrinks to the lock hand-offs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+from typing import List, Optional
+
+from benchmarks.enrollment_contention import _fire
+
+MODES = ("per-request", "group")
+
+
+def create_fixtures(students: int, assignments: int) -> dict:
+    from sqlalchemy import insert
+    from database import Base, SessionLocal, engine
+    from auth import create_access_token, get_password_hash
+    import models
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        password_hash = get_password_hash("group-commit")
+        teacher_user = models.User(email="group-commit-teacher@example.com", password_hash=password_hash,
+                                   first_name="Burst", last_name="Teacher", role=models.RoleEnum.teacher)
+        db.add(teacher_user)
+        db.flush()
+        teacher = models.Teacher(user_id=teacher_user.id)
+        db.add(teacher)
+        db.flush()
+        course = models.Course(name="Changeover", code="BURST-1", teacher_id=teacher.id)
+        db.add(course)
+        db.flush()
+        db.add_all([
+            models.Assignment(course_id=course.id, title=f"Quiz {i}", max_points=10)
+            for i in range(assignments)
+        ])
+        db.execute(insert(models.User), [
+            {"email": f"group-commit-{i}@example.com", "password_hash": password_hash,
+             "first_name": "Student", "last_name": str(i), "role": models.RoleEnum.student}
+            for i in range(students)
+        ])
+        user_ids = [user_id for (user_id,) in db.query(models.User.id).filter(
+            models.User.role == models.RoleEnum.student
+        )]
+        db.execute(insert(models.Student), [{"user_id": user_id} for user_id in user_ids])
+        db.commit()
+        return {
+            "course_id": course.id,
+            "student_ids": [student_id for (student_id,) in db.query(models.Student.id).order_by(models.Student.id)],
+            "assignment_ids": [assignment_id for (assignment_id,) in db.query(models.Assignment.id)],
+            "token": create_access_token(data={"sub": str(teacher_user.id)}),
+        }
+    finally:
+        db.close()
+
+
+def burst(fixtures: dict, writes: int) -> List[tuple]:
+    """Alternating attendance marks and new grades, each for a distinct row."""
+    course_id = fixtures["course_id"]
+    students = fixtures["student_ids"]
+    grades = [(student_id, assignment_id) for assignment_id in fixtures["assignment_ids"] for student_id in students]
+    requests = []
+    for i in range(writes):
+        if i % 2 and grades:
+            student_id, assignment_id = grades.pop()
+            requests.append(("POST", "/api/grades", {
+                "student_id": student_id, "assignment_id": assignment_id, "points_earned": i % 11
+            }))
+        else:
+            day = date.today() - timedelta(days=i // (2 * len(students)))
+            requests.append(("POST", "/api/attendance", {
+                "student_id": students[(i // 2) % len(students)], "course_id": course_id,
+                "date": day.isoformat(), "status": "present"
+            }))
+    return requests
+
+
+def stored_rows() -> int:
+    from database import SessionLocal
+    import models
+
+    db = SessionLocal()
+    try:
+        return db.query(models.Attendance).count() + db.query(models.Grade).count()
+    finally:
+        db.close()
+
+
+async def run_mode(args, mode: str) -> dict:
+    import httpx
+    from benchmarks.loadtest import summarize
+    from config import get_settings
+    from main import app
+    import group_commit
+
+    settings = get_settings()
+    settings.GROUP_COMMIT_ENABLED = mode == "group"
+    group_commit.writer.window = args.window_ms / 1000
+    group_commit.writer.max_batch = args.max_batch
+
+    fixtures = create_fixtures(args.students, args.assignments)
+    headers = {"Authorization": f"Bearer {fixtures['token']}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://group-commit",
+                                 headers=headers, timeout=120) as client:
+        latencies, statuses, duration = await _fire(client, burst(fixtures, args.writes), args.concurrency)
+    await asyncio.to_thread(group_commit.writer.stop)
+
+    result = summarize(latencies, statuses, duration)
+    result["stored_rows"] = stored_rows()
+    return result
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Group commit versus per-request commits.")
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64, help="Requests in flight")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--assignments", type=int, default=10)
+    parser.add_argument("--window-ms", type=float, default=5.0, help="GROUP_COMMIT_WINDOW_MS for the group run")
+    parser.add_argument("--max-batch", type=int, default=100, help="GROUP_COMMIT_MAX_BATCH for the group run")
+    parser.add_argument("--db-dir", help="Directory for the scratch databases")
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = {"config": vars(args), "modes": {}}
+    with tempfile.TemporaryDirectory(dir=args.db_dir) as tmp:
+        # Must be set before anything imports database.py
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'group_commit.db')}"
+        from benchmarks.loadtest import print_result
+        from database import Base, engine
+
+        for mode in MODES:
+            # Both modes share the engine; each starts from empty tables
+            Base.metadata.drop_all(bind=engine)
+            report["modes"][mode] = asyncio.run(run_mode(args, mode))
+            print_result(mode, report["modes"][mode])
+        engine.dispose()
+
+    problems = [
+        f"{mode}: {result['stored_rows']} rows stored for {result['status_codes'].get('200', 0)} successful writes"
+        for mode, result in report["modes"].items()
+        if result["stored_rows"] != result["status_codes"].get("200", 0)
+    ]
+    baseline, grouped = report["modes"]["per-request"], report["modes"]["group"]
+    if baseline["throughput_rps"]:
+        print(f"group commit: {grouped['throughput_rps'] / baseline['throughput_rps']:.2f}x throughput, "
+              f"p95 {baseline['p95_ms']:.1f} -> {grouped['p95_ms']:.1f} ms")
+    report["problems"] = problems
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if problems:
+        print("FAILED: " + "; ".join(problems))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
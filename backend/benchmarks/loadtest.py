@@ -0,0 +1,262 @@
+"""
+HTTP load-testing harness with scripted school-day scenarios.
+
+Seed the target database first (see generate_scale_data.py), then run from
+the backend directory:
+
+    python -m benchmarks.loadtest                                  # in-process ASGI app
+    python -m benchmarks.loadtest --base-url http://localhost:8000 # live server
+    python -m benchmarks.loadtest --scenario login_storm --concurrency 100
+    python -m benchmarks.loadtest --output results.json --baseline previous.json
+
+Scenarios read their fixtures (teachers, rosters, students) straight from
+DATABASE_URL and mint tokens with SECRET_KEY, so a live target must share the
+same .env. Results (throughput, p50/p95/p99 latency) are written as JSON; with
+--baseline (an earlier run's --output), a scenario whose p95 or throughput
+regresses by more than --max-regression fails the run. No baseline is
+committed: the numbers depend on the machine and on the seeded data.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, List, Tuple
+
+import httpx
+from sqlalchemy import func
+
+from auth import create_access_token
+from database import SessionLocal
+import models
+
+# (method, path, request kwargs, bearer token)
+RequestSpec = Tuple[str, str, dict, str]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100.0 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+def summarize(latencies: List[float], statuses: Counter, duration: float) -> dict:
+    ordered = sorted(latencies)
+    total = len(ordered)
+    errors = sum(count for code, count in statuses.items() if code >= 400 or code == 0)
+    return {
+        "requests": total,
+        "errors": errors,
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(total / duration, 2) if duration else 0.0,
+        "mean_ms": round(sum(ordered) / total * 1000, 2) if total else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if total else 0.0,
+    }
+
+
+def _token(user_id: int) -> str:
+    return create_access_token(data={"sub": str(user_id)})
+
+
+def morning_attendance_rush(db, users: int, limit: int, rng: random.Random) -> List[RequestSpec]:
+    """Teachers mark today's attendance for a whole class at once."""
+    today = date.today().isoformat()
+    teachers = db.query(models.Teacher).join(models.Course).distinct().limit(users).all()
+    specs = []
+    for teacher in teachers:
+        token = _token(teacher.user_id)
+        course = teacher.courses[0]
+        roster = db.query(models.Enrollment.student_id).filter(
+            models.Enrollment.course_id == course.id
+        ).all()
+        for (student_id,) in roster:
+            specs.append(("POST", "/api/attendance", {"json": {
+                "student_id": student_id,
+                "course_id": course.id,
+                "date": today,
+                "status": rng.choice(["present"] * 8 + ["late", "absent"])
+            }}, token))
+    rng.shuffle(specs)
+    return specs[:limit]
+
+
+def login_storm(db, users: int, limit: int, rng: random.Random, password: str = "password123") -> List[RequestSpec]:
+    """Many students log in at the same moment (bcrypt-bound)."""
+    emails = [
+        email for (email,) in db.query(models.User.email).filter(
+            models.User.role == models.RoleEnum.student
+        ).order_by(func.random()).limit(min(users, limit)).all()
+    ]
+    return [
+        ("POST", "/api/auth/login", {"json": {"email": email, "password": password}}, None)
+        for email in emails
+    ]
+
+
+def end_of_term_report_cards(db, users: int, limit: int, rng: random.Random) -> List[RequestSpec]:
+    """Admins generate and then fetch report cards for a batch of students."""
+    admin = db.query(models.User).filter(models.User.role == models.RoleEnum.admin).first()
+    token = _token(admin.id)
+    academic_year = f"{datetime.utcnow().year}-{datetime.utcnow().year + 1}"
+    student_ids = [
+        student_id for (student_id,) in db.query(models.Student.id).order_by(func.random()).limit(limit // 2).all()
+    ]
+    specs = []
+    for student_id in student_ids:
+        specs.append(("POST", f"/api/report-cards/generate/{student_id}", {
+            "params": {"academic_year": academic_year, "term": "fall"}
+        }, token))
+        specs.append(("GET", f"/api/report-cards/student/{student_id}", {}, token))
+    return specs
+
+
+SCENARIOS = {
+    "morning_attendance_rush": morning_attendance_rush,
+    "login_storm": login_storm,
+    "end_of_term_report_cards": end_of_term_report_cards,
+}
+
+
+async def run_specs(client: httpx.AsyncClient, specs: List[RequestSpec], concurrency: int) -> dict:
+    queue: asyncio.Queue = asyncio.Queue()
+    for spec in specs:
+        queue.put_nowait(spec)
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+
+    async def worker():
+        while True:
+            try:
+                method, path, kwargs, token = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            headers = {"Authorization": f"Bearer {token}"} if token else {}
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, headers=headers, **kwargs)
+                status_code = response.status_code
+            except httpx.HTTPError:
+                status_code = 0
+            latencies.append(time.perf_counter() - start)
+            statuses[status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+def build_client(base_url: str = None, timeout: float = 60.0) -> httpx.AsyncClient:
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=timeout)
+    from main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=timeout)
+
+
+async def run(
+    scenarios: List[str],
+    base_url: str = None,
+    concurrency: int = 20,
+    requests: int = 500,
+    users: int = 50,
+    seed: int = 42
+) -> dict:
+    rng = random.Random(seed)
+    results: Dict[str, dict] = {}
+    async with build_client(base_url) as client:
+        for name in scenarios:
+            db = SessionLocal()
+            try:
+                specs = SCENARIOS[name](db, users, requests, rng)
+            finally:
+                db.close()
+            if not specs:
+                print(f"{name}: no fixtures found in the database, skipping")
+                continue
+            results[name] = await run_specs(client, specs, concurrency)
+            results[name]["concurrency"] = concurrency
+            print_result(name, results[name])
+
+    return {
+        "generated_at": datetime.utcnow().isoformat(),
+        "target": base_url or "asgi",
+        "scenarios": results,
+    }
+
+
+def print_result(name: str, result: dict):
+    print(
+        f"{name:28s} {result['requests']:6d} req  {result['throughput_rps']:8.1f} req/s  "
+        f"p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+        f"p99 {result['p99_ms']:8.1f} ms  errors {result['errors']}"
+    )
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Scenarios whose p95 grew or throughput fell by more than max_regression."""
+    failures = []
+    for name, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        p95_change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] if previous["p95_ms"] else 0.0
+        rps_change = (
+            (current["throughput_rps"] - previous["throughput_rps"]) / previous["throughput_rps"]
+            if previous["throughput_rps"] else 0.0
+        )
+        print(f"{name:28s} p95 {p95_change:+7.1%}  throughput {rps_change:+7.1%}")
+        if p95_change > max_regression or rps_change < -max_regression:
+            failures.append(name)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run scripted load-test scenarios.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--base-url", help="Live server URL; omit to drive the ASGI app in-process")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500, help="Upper bound on requests per scenario")
+    parser.add_argument("--users", type=int, default=50, help="Distinct teachers/students per scenario")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Compare against a previous JSON report")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed fractional p95/throughput regression against --baseline")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(
+        scenarios=args.scenario or list(SCENARIOS),
+        base_url=args.base_url,
+        concurrency=args.concurrency,
+        requests=args.requests,
+        users=args.users,
+        seed=args.seed
+    ))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = compare(report, baseline, args.max_regression)
+        if failures:
+            print(f"Regressed beyond {args.max_regression:.0%}: {', '.join(failures)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Microbenchmarks for the ORM work behind the hottest routes.
+
+Each benchmark calls the route function directly (no HTTP) against a fixed,
+seeded SQLite database and serializes the result with the route's response
+schema, so it measures query + ORM + Pydantic cost only:
+
+    python -m benchmarks.microbench                    # compare with the committed baseline
+    python -m benchmarks.microbench --threshold 0.3    # allow 30% slowdown
+    python -m benchmarks.microbench --save-baseline    # re-record after an intended change
+
+The run exits non-zero when any benchmark's median is more than --threshold
+slower than benchmarks/baselines/microbench.json. Timings are machine
+specific: record the baseline on the machine that runs the gate.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from typing import Callable, Dict
+
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from auth import create_access_token, get_current_user
+from generate_scale_data import generate
+from routes import attendance_routes, course_routes, fee_routes, report_card_routes, student_routes
+import models
+import schemas
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "microbench.json")
+
+# Small enough to seed in a couple of seconds, large enough for realistic plans
+DATASET = {
+    "students": 2_000,
+    "teachers": 80,
+    "courses": 200,
+    "attendance": 100_000,
+    "grades": 50_000,
+    "seed": 1234,
+}
+
+
+def build_database(path: str):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    generate(bind=engine, **DATASET)
+    return engine
+
+
+def make_benchmarks(session_factory) -> Dict[str, Callable[[], object]]:
+    setup = session_factory()
+    admin = setup.query(models.User).filter(models.User.role == models.RoleEnum.admin).first()
+    student_id = setup.query(models.Grade.student_id).group_by(models.Grade.student_id).order_by(
+        func.count(models.Grade.id).desc()
+    ).first()[0]
+    busiest_day = setup.query(models.Attendance.date).order_by(models.Attendance.date.desc()).first()[0]
+    largest_course_id = setup.query(models.Enrollment.course_id).group_by(models.Enrollment.course_id).order_by(
+        func.count(models.Enrollment.id).desc()
+    ).first()[0]
+    setup.close()
+
+    credentials = HTTPAuthorizationCredentials(
+        scheme="Bearer", credentials=create_access_token(data={"sub": str(admin.id)})
+    )
+
+    def with_session(fn):
+        def run():
+            db = session_factory()
+            try:
+                user = db.get(models.User, admin.id)
+                return fn(db, user)
+            finally:
+                db.rollback()
+                db.close()
+        return run
+
+    def current_user(db, user):
+        return get_current_user(credentials=credentials, db=db)
+
+    def student_grades(db, user):
+        return student_routes.get_student_grades(student_id=student_id, db=db, current_user=user)
+
+    def attendance_by_date(db, user):
+        records = attendance_routes.get_attendance_by_date(date=busiest_day, db=db, current_user=user)
+        return [schemas.AttendanceResponse.model_validate(record) for record in records]
+
+    def report_card_generation(db, user):
+        report_card = report_card_routes.generate_report_card(
+            student_id=student_id, academic_year="2099-2100", term=models.TermEnum.fall,
+            db=db, current_user=user
+        )
+        # generate_report_card commits; remove the row so every run sees the same table
+        db.delete(report_card)
+        db.commit()
+
+    def fee_record_listing(db, user):
+        records = fee_routes.get_all_fee_records(db=db, current_user=user)
+        return [schemas.FeeRecordResponse.model_validate(record) for record in records]
+
+    def course_gradebook(db, user):
+        gradebook = course_routes.get_course_gradebook(course_id=largest_course_id, db=db, current_user=user)
+        return schemas.CourseGradebookResponse.model_validate(gradebook)
+
+    def course_summary(db, user):
+        page = course_routes.get_course_summaries(
+            teacher_id=None, department=None, limit=50, offset=0, db=db, current_user=user
+        )
+        return schemas.CourseSummaryPage.model_validate(page)
+
+    return {
+        "get_current_user": with_session(current_user),
+        "student_grades": with_session(student_grades),
+        "attendance_by_date": with_session(attendance_by_date),
+        "report_card_generation": with_session(report_card_generation),
+        "fee_record_listing": with_session(fee_record_listing),
+        "course_gradebook": with_session(course_gradebook),
+        "course_summary": with_session(course_summary),
+    }
+
+
+def measure(fn: Callable[[], object], rounds: int, min_time: float) -> dict:
+    """Median/min per-call time over ``rounds`` rounds of auto-sized batches."""
+    fn()  # warm caches and compiled statement cache
+
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or iterations >= 1000:
+            break
+        iterations *= 2
+
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        samples.append((time.perf_counter() - start) / iterations)
+
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 4),
+        "min_ms": round(min(samples) * 1000, 4),
+        "stdev_ms": round(statistics.pstdev(samples) * 1000, 4),
+        "iterations": iterations,
+        "rounds": rounds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run ORM hot-path microbenchmarks.")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed fractional slowdown of the median versus the baseline")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.1, help="Target seconds per round")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with this run")
+    parser.add_argument("--only", action="append", help="Run only the named benchmark (repeatable)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_database(os.path.join(tmp, "microbench.db"))
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        benchmarks = make_benchmarks(session_factory)
+
+        results = {}
+        for name, fn in benchmarks.items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = measure(fn, args.rounds, args.min_time)
+        engine.dispose()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("benchmarks", {})
+
+    failures = []
+    for name, result in results.items():
+        line = f"{name:24s} median {result['median_ms']:9.3f} ms  min {result['min_ms']:9.3f} ms"
+        previous = baseline.get(name)
+        if previous:
+            change = result["median_ms"] / previous["median_ms"] - 1
+            line += f"  vs baseline {change:+7.1%}"
+            if change > args.threshold:
+                failures.append(name)
+                line += "  REGRESSED"
+        print(line)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "recorded_on": date.today().isoformat(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "dataset": DATASET,
+                "benchmarks": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if failures:
+        print(f"Slower than baseline by more than {args.threshold:.0%}: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Cold-start import-time budget.
+
+Imports ``main`` in fresh interpreters with ``python -X importtime`` and
+compares the median cumulative import time against the committed budget in
+benchmarks/baselines/startup.json:
+
+    python -m benchmarks.startup                   # fail if over budget
+    python -m benchmarks.startup --lazy            # measure with LAZY_ROUTERS=true
+    python -m benchmarks.startup --save-baseline   # re-record the budget
+
+The slowest modules by self time are listed to show where a regression
+came from. Bytecode is compiled by a warm-up run first, so only genuine
+import work is measured.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "startup.json")
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Dict[str, float]]:
+    """Return (cumulative ms for ``main``, self ms per module)."""
+    total = 0.0
+    self_times: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header line
+        module = parts[2].strip()
+        self_times[module] = self_us / 1000
+        if module == "main":
+            total = cumulative_us / 1000
+    return total, self_times
+
+
+def measure_once(lazy: bool) -> Tuple[float, Dict[str, float]]:
+    env = dict(os.environ, LAZY_ROUTERS="true" if lazy else "false")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return parse_importtime(result.stderr)
+
+
+def measure(runs: int, lazy: bool) -> Tuple[List[float], Dict[str, float]]:
+    measure_once(lazy)  # compile bytecode
+    totals = []
+    self_times: Dict[str, List[float]] = defaultdict(list)
+    for _ in range(runs):
+        total, modules = measure_once(lazy)
+        totals.append(total)
+        for module, ms in modules.items():
+            self_times[module].append(ms)
+    return totals, {module: statistics.median(times) for module, times in self_times.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check cold-start import time against a budget.")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--lazy", action="store_true", help="Measure with LAZY_ROUTERS=true")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed fractional increase over the recorded budget")
+    parser.add_argument("--top", type=int, default=10, help="Show the N slowest modules")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    mode = "lazy" if args.lazy else "eager"
+    totals, self_times = measure(args.runs, args.lazy)
+    median = statistics.median(totals)
+    print(f"import main ({mode} routers): median {median:.1f} ms, min {min(totals):.1f} ms over {args.runs} runs")
+    for module, ms in sorted(self_times.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {ms:8.1f} ms  {module}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.save_baseline:
+        baseline.setdefault("budgets_ms", {})[mode] = round(median, 1)
+        baseline.update({
+            "recorded_on": date.today().isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        })
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"Budget written to {args.baseline}")
+        return
+
+    budget = baseline.get("budgets_ms", {}).get(mode)
+    if budget is None:
+        print(f"No {mode} budget recorded; run with --save-baseline")
+        return
+    limit = budget * (1 + args.threshold)
+    print(f"budget {budget:.1f} ms (+{args.threshold:.0%} = {limit:.1f} ms)")
+    if median > limit:
+        print("Cold start regressed beyond budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Throughput comparison: single uvicorn process versus the pre-forked server.
+
+Starts each server as a subprocess on a free local port, drives it with
+several client processes for a fixed duration, and prints req/s and latency
+percentiles side by side:
+
+    python -m benchmarks.throughput                       # single vs serve.py (one worker per core)
+    python -m benchmarks.throughput --workers 4 --duration 20 --concurrency 64
+    python -m benchmarks.throughput --output throughput.json
+
+The single-process mode is ``uvicorn main:app`` without --reload, i.e. what
+``python main.py`` serves minus the file watcher. Authenticated routes use
+the first admin in DATABASE_URL; seed with generate_scale_data.py for
+realistic payloads. Client processes share the machine with the server, so
+compare runs on the same host only.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Optional
+
+import httpx
+
+from benchmarks.loadtest import print_result, summarize
+from serve import default_workers
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (path, needs auth): a framework-only route, an aggregate and a list route
+ENDPOINTS = [
+    ("/health/live", False),
+    ("/api/dashboard/stats", True),
+    ("/api/courses", True),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_command(mode: str, port: int, workers: int) -> List[str]:
+    if mode == "single":
+        return [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                "--no-access-log"]
+    return [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)]
+
+
+def wait_until_up(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health/live", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not come up within {timeout}s")
+
+
+def admin_token() -> Optional[str]:
+    from auth import create_access_token
+    from database import SessionLocal
+    import models
+
+    db = SessionLocal()
+    try:
+        admin = db.query(models.User).filter(models.User.role == models.RoleEnum.admin).first()
+        return create_access_token(data={"sub": str(admin.id)}) if admin else None
+    finally:
+        db.close()
+
+
+async def _drive(base_url: str, token: Optional[str], duration: float, concurrency: int):
+    endpoints = [(path, auth) for path, auth in ENDPOINTS if token or not auth]
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+        async def worker(offset: int):
+            i = offset
+            while time.perf_counter() < deadline:
+                path, auth = endpoints[i % len(endpoints)]
+                i += 1
+                headers = {"Authorization": f"Bearer {token}"} if auth else {}
+                start = time.perf_counter()
+                try:
+                    status_code = (await client.get(path, headers=headers)).status_code
+                except httpx.HTTPError:
+                    status_code = 0
+                latencies.append(time.perf_counter() - start)
+                statuses[status_code] += 1
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return latencies, statuses
+
+
+def drive(base_url: str, token: Optional[str], duration: float, concurrency: int):
+    """Run one client process' share of the load (executed in a child process)."""
+    return asyncio.run(_drive(base_url, token, duration, concurrency))
+
+
+def measure(mode: str, args, token: Optional[str]) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        server_command(mode, port, args.workers), cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_up(base_url)
+        # Warm up every worker's imports, pools and statement caches
+        drive(base_url, token, 1.0, args.concurrency)
+
+        per_client = max(args.concurrency // args.clients, 1)
+        latencies: List[float] = []
+        statuses: Counter = Counter()
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.clients) as pool:
+            futures = [pool.submit(drive, base_url, token, args.duration, per_client) for _ in range(args.clients)]
+            for future in futures:
+                client_latencies, client_statuses = future.result()
+                latencies.extend(client_latencies)
+                statuses.update(client_statuses)
+        result = summarize(latencies, statuses, time.perf_counter() - started)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+    result["workers"] = 1 if mode == "single" else args.workers
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-process and pre-forked server throughput.")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per mode")
+    parser.add_argument("--concurrency", type=int, default=64, help="Total in-flight requests")
+    parser.add_argument("--clients", type=int, default=max(min(default_workers() // 2, 4), 1),
+                        help="Load-generating processes")
+    parser.add_argument("--output", help="Write the comparison as JSON")
+    args = parser.parse_args()
+
+    token = admin_token()
+    if token is None:
+        print("No admin user in the database; measuring unauthenticated routes only")
+
+    results = {}
+    for mode in ("single", "prefork"):
+        results[mode] = measure(mode, args, token)
+        print_result(f"{mode} ({results[mode]['workers']} worker(s))", results[mode])
+
+    single, prefork = results["single"]["throughput_rps"], results["prefork"]["throughput_rps"]
+    if single:
+        print(f"speedup: {prefork / single:.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "generated_at": datetime.utcnow().isoformat(),
+                "duration_s": args.duration,
+                "concurrency": args.concurrency,
+                "clients": args.clients,
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
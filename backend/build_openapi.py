@@ -0,0 +1,30 @@
+"""
+Precompute the OpenAPI schema at build time.
+
+FastAPI otherwise generates it on the first /docs or /openapi.json hit, which
+on a cold container means importing every router first. Run this in the image
+build; main.py serves the file from OPENAPI_SCHEMA_PATH when it exists:
+
+    python build_openapi.py
+"""
+import json
+
+from fastapi import FastAPI
+
+from config import get_settings
+from main import app
+import routes
+
+
+def build_openapi(path: str):
+    routes.include_all_routers(app)
+    schema = FastAPI.openapi(app)
+    with open(path, "w") as f:
+        json.dump(schema, f, separators=(",", ":"))
+    return schema
+
+
+if __name__ == "__main__":
+    path = get_settings().OPENAPI_SCHEMA_PATH
+    schema = build_openapi(path)
+    print(f"Wrote {len(schema['paths'])} paths to {path}")
@@ -0,0 +1,107 @@
+"""
+Small in-process TTL caches for read-heavy endpoints.
+
+Entries live in this worker's memory only: each serve.py worker keeps its own
+copy, and a cached value can be up to ``ttl`` seconds stale. Use these for
+data where that staleness is acceptable, and invalidate explicitly where it
+is not.
+
+A cache given a ``name`` counts its hits and misses in the
+``kastra_cache_lookups_total`` metric.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+import metrics
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire ``ttl`` seconds after being set.
+
+    At most ``maxsize`` entries are kept; the least recently set one is
+    evicted first.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024, name: Optional[str] = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by invalidate()/clear(), so a value computed before one is not stored after it
+        self._generation = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and entry[0] > now
+            if hit:
+                self.hits += 1
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+        if self.name is not None:
+            metrics.CACHE_LOOKUPS.inc(labels=(self.name, "hit" if hit else "miss"))
+        return entry[1] if hit else default
+
+    def _store(self, key: Hashable, value: Any):
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._store(key, value)
+
+    def get_or_set(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Cached value for ``key``, computing and storing it on a miss.
+
+        ``compute`` runs outside the lock, so two concurrent misses may both
+        compute; the later result wins. That's cheaper than serializing every
+        miss behind one slow computation. None (nothing to cache) and a value
+        whose computation overlapped an invalidation, which may predate it, are
+        returned but not stored.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            generation = self._generation
+            value = compute()
+            if value is not None:
+                with self._lock:
+                    if self._generation == generation:
+                        self._store(key, value)
+        return value
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def keys(self) -> list:
+        """Keys of the entries that have not expired."""
+        now = time.monotonic()
+        with self._lock:
+            return [key for key, (expires, _) in self._entries.items() if expires > now]
+
+    def hit_rate(self) -> Optional[float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return self.hits / total if total else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
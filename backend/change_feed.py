@@ -0,0 +1,210 @@
+"""
+Incremental change feed for offline-capable clients (GET /api/sync).
+
+Mutable models carry ``updated_at``, set on insert and on every UPDATE (ORM
+or Core), and the course-scoped tables index it together with the course.
+Deletes leave a SyncTombstone, written by a before_flush hook in the same
+transaction as the delete, so a client that was offline still hears about
+them. Rows whose student was deleted (student_id set to NULL) are reported
+as deleted too.
+
+A sync covers the caller's courses: the ones a teacher teaches, the ones a
+student is enrolled in (and only that student's grades and attendance), or
+every course for admins. The cursor handed back is the server time when the
+sync started minus SYNC_CURSOR_OVERLAP_SECONDS, so a transaction that
+stamped its rows just before then but committed after the reads is picked up
+next time; clients apply changes as upserts, so seeing a row twice is
+harmless. Tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS are pruned at
+startup, and an older cursor gets a full snapshot with ``reset`` set.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, event, or_
+from sqlalchemy.orm import Session, joinedload
+
+from config import get_settings
+import models
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Deleted instances of these models leave a tombstone under this key
+TRACKED_DELETES = {
+    models.Course: "courses",
+    models.Enrollment: "enrollments",
+    models.Assignment: "assignments",
+    models.Grade: "grades",
+    models.Attendance: "attendance",
+    # Not part of the sync feed: the cached student dashboard check reads these (dashboards.py)
+    models.FeeRecord: "fee_records",
+}
+# Entities whose deletes /api/sync reports
+SYNCED_DELETES = ("courses", "enrollments", "assignments", "grades", "attendance")
+
+
+def _owner(session: Session, instance):
+    """(course_id, student_id) of a deleted row, for scoping its tombstone."""
+    if isinstance(instance, models.Course):
+        return instance.id, None
+    if isinstance(instance, models.Assignment):
+        return instance.course_id, None
+    if isinstance(instance, models.Grade):
+        course_id = None
+        if instance.assignment_id is not None:
+            with session.no_autoflush:
+                assignment = session.get(models.Assignment, instance.assignment_id)
+            course_id = assignment.course_id if assignment else None
+        return course_id, instance.student_id
+    if isinstance(instance, models.FeeRecord):
+        return None, instance.student_id
+    return instance.course_id, instance.student_id
+
+
+@event.listens_for(Session, "before_flush")
+def _record_tombstones(session: Session, flush_context, instances):
+    for instance in list(session.deleted):
+        entity = TRACKED_DELETES.get(type(instance))
+        if entity is None:
+            continue
+        course_id, student_id = _owner(session, instance)
+        session.add(models.SyncTombstone(
+            entity=entity, entity_id=instance.id, course_id=course_id, student_id=student_id
+        ))
+
+
+def _scope(db: Session, user: models.User):
+    """(course IDs in scope, student ID to restrict student-owned rows to or None)."""
+    if user.role == models.RoleEnum.admin:
+        return [course_id for course_id, in db.query(models.Course.id).order_by(models.Course.id)], None
+    if user.role == models.RoleEnum.teacher:
+        course_ids = db.query(models.Course.id).join(
+            models.Teacher, models.Course.teacher_id == models.Teacher.id
+        ).filter(models.Teacher.user_id == user.id).order_by(models.Course.id)
+        return [course_id for course_id, in course_ids], None
+
+    student = db.query(models.Student.id).filter(models.Student.user_id == user.id).first()
+    if not student:
+        return [], None
+    course_ids = db.query(models.Enrollment.course_id).filter(
+        models.Enrollment.student_id == student.id,
+        models.Enrollment.course_id.isnot(None)
+    ).order_by(models.Enrollment.course_id)
+    return [course_id for course_id, in course_ids], student.id
+
+
+def _changed(query, column, since: Optional[datetime]):
+    return query if since is None else query.filter(column > since)
+
+
+def _split_orphans(rows) -> tuple:
+    """Live rows, and IDs of rows whose student was deleted."""
+    live = [row for row in rows if row.student_id is not None]
+    return live, [row.id for row in rows if row.student_id is None]
+
+
+def changes_since(db: Session, user: models.User, since: Optional[datetime]) -> dict:
+    """Everything in the user's scope changed after ``since`` (everything when None)."""
+    started = datetime.utcnow()
+    reset = since is None or since < started - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    if reset:
+        since = None
+
+    course_ids, student_id = _scope(db, user)
+    changes = {name: [] for name in ("courses", "students", "enrollments", "assignments", "grades", "attendance")}
+    deleted = {name: [] for name in SYNCED_DELETES}
+
+    if course_ids:
+        changes["courses"] = _changed(
+            db.query(models.Course).filter(models.Course.id.in_(course_ids)), models.Course.updated_at, since
+        ).order_by(models.Course.id).all()
+
+        enrollments = db.query(models.Enrollment).filter(models.Enrollment.course_id.in_(course_ids))
+        if student_id is not None:
+            enrollments = enrollments.filter(models.Enrollment.student_id == student_id)
+        changes["enrollments"], orphaned = _split_orphans(
+            _changed(enrollments, models.Enrollment.updated_at, since).order_by(models.Enrollment.id).all()
+        )
+        deleted["enrollments"] += orphaned
+
+        changes["assignments"] = _changed(
+            db.query(models.Assignment).filter(models.Assignment.course_id.in_(course_ids)),
+            models.Assignment.updated_at, since
+        ).order_by(models.Assignment.id).all()
+
+        grades = db.query(models.Grade).join(
+            models.Assignment, models.Grade.assignment_id == models.Assignment.id
+        ).filter(models.Assignment.course_id.in_(course_ids))
+        attendance = db.query(models.Attendance).filter(models.Attendance.course_id.in_(course_ids))
+        if student_id is not None:
+            grades = grades.filter(models.Grade.student_id == student_id)
+            attendance = attendance.filter(models.Attendance.student_id == student_id)
+        changes["grades"], orphaned = _split_orphans(
+            _changed(grades, models.Grade.updated_at, since).order_by(models.Grade.id).all()
+        )
+        deleted["grades"] += orphaned
+        changes["attendance"], orphaned = _split_orphans(
+            _changed(attendance, models.Attendance.updated_at, since).order_by(models.Attendance.id).all()
+        )
+        deleted["attendance"] += orphaned
+
+        changes["students"] = _roster_changes(db, course_ids, student_id, since, changes["enrollments"])
+
+    if since is not None:
+        tombstones = db.query(models.SyncTombstone.entity, models.SyncTombstone.entity_id).filter(
+            models.SyncTombstone.deleted_at > since,
+            models.SyncTombstone.entity.in_(SYNCED_DELETES)
+        )
+        if student_id is not None:
+            # Their own rows wherever they were, plus course-wide deletes in their courses
+            tombstones = tombstones.filter(or_(
+                models.SyncTombstone.student_id == student_id,
+                models.SyncTombstone.course_id.in_(course_ids) & models.SyncTombstone.student_id.is_(None)
+            ))
+        elif user.role != models.RoleEnum.admin:
+            # A deleted course is already out of scope; course_ids tells the client to drop it
+            tombstones = tombstones.filter(models.SyncTombstone.course_id.in_(course_ids))
+        for entity, entity_id in tombstones.order_by(models.SyncTombstone.id):
+            deleted[entity].append(entity_id)
+
+    return {
+        "cursor": started - timedelta(seconds=settings.SYNC_CURSOR_OVERLAP_SECONDS),
+        "reset": reset,
+        "course_ids": course_ids,
+        "changes": changes,
+        "deleted": deleted,
+    }
+
+
+def _roster_changes(db: Session, course_ids: List[int], student_id: Optional[int],
+                    since: Optional[datetime], changed_enrollments: list) -> list:
+    """Student profiles (with user) that changed, or that a new enrollment brings into scope."""
+    query = db.query(models.Student).join(
+        models.User, models.Student.user_id == models.User.id
+    ).options(joinedload(models.Student.user))
+    if student_id is not None:
+        query = query.filter(models.Student.id == student_id)
+    else:
+        query = query.filter(models.Student.id.in_(
+            db.query(models.Enrollment.student_id).filter(models.Enrollment.course_id.in_(course_ids))
+        ))
+    if since is not None:
+        newly_enrolled = {enrollment.student_id for enrollment in changed_enrollments}
+        query = query.filter(or_(
+            models.Student.updated_at > since,
+            models.User.updated_at > since,
+            models.Student.id.in_(newly_enrolled)
+        ))
+    return query.order_by(models.Student.id).all()
+
+
+def prune(bind) -> int:
+    """Drop tombstones older than any cursor still answered incrementally."""
+    cutoff = datetime.utcnow() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    with bind.begin() as conn:
+        removed = conn.execute(delete(models.SyncTombstone).where(models.SyncTombstone.deleted_at < cutoff)).rowcount
+    if removed:
+        logger.info("Pruned %d sync tombstones", removed)
+    return removed
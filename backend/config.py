@@ -1,12 +1,56 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./kastra_systems.db"
+    # Requests in flight are capped to fit the pool as well as the threadpool (admission.py)
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 30
+    REQUEST_THREADS: int = 40  # Threadpool for sync routes and dependencies, and the most requests run at once
+    SQLITE_BUSY_TIMEOUT_SECONDS: float = 30.0  # Wait for the write lock instead of failing with "database is locked"
     SECRET_KEY: str = "your-secret-key-change-this-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 hours
+    METRICS_ENABLED: bool = True
+    QUERY_INSPECTOR_ENABLED: bool = False  # Development/test only
+    QUERY_INSPECTOR_REPEAT_THRESHOLD: int = 3
+    LAZY_ROUTERS: bool = False  # Mount routers on first use (scale-to-zero deployments)
+    OPENAPI_SCHEMA_PATH: str = "openapi.json"  # Written by build_openapi.py
+    HEALTH_CHECK_INTERVAL_SECONDS: float = 5.0
+    WEB_CONCURRENCY: int = 0  # serve.py workers; 0 = one per CPU core
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEP_ALIVE_SECONDS: int = 75  # Above typical load balancer idle timeouts (60s)
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = 30
+    JOBS_ENABLED: bool = True  # Run the background job dispatcher in this process
+    JOB_WORKERS: int = 2
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 10.0  # Doubles with every attempt
+    JOB_STALE_AFTER_SECONDS: float = 60.0  # Re-queue running jobs without a heartbeat this long
+    BATCH_MAX_REQUESTS: int = 25  # Sub-requests per /api/batch call
+    BATCH_MAX_CONCURRENCY: int = 4  # Reads run in parallel, up to this many at once
+    BATCH_TIMEOUT_SECONDS: float = 15.0  # Sub-requests not started by then get 504
+    TEACHER_DASHBOARD_TTL_SECONDS: float = 60.0  # Per-worker cache; figures lag the data by up to this much
+    STUDENT_DASHBOARD_TTL_SECONDS: float = 300.0  # Per-worker cache, checked for changes in the database on each hit
+    GROUP_COMMIT_ENABLED: bool = False  # Batch attendance and new-grade writes into shared transactions (group_commit.py)
+    GROUP_COMMIT_WINDOW_MS: float = 5.0  # How long the writer gathers writes before committing; adds up to this to each write
+    GROUP_COMMIT_MAX_BATCH: int = 100  # Writes per transaction at most
+    SYNC_CURSOR_OVERLAP_SECONDS: float = 10.0  # /api/sync re-sends this much history to catch late commits
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = 90  # Older cursors get a full snapshot
+    IDEMPOTENCY_TTL_SECONDS: int = 86400  # Retries with the same Idempotency-Key replay the stored response this long
+    IDEMPOTENCY_PRUNE_INTERVAL_SECONDS: float = 300.0  # How often expired keys are deleted
+    FEE_RECONCILE_CHUNK_SIZE: int = 500  # Bank statement lines matched and committed per transaction
+    FEE_STRUCTURE_CACHE_TTL_SECONDS: float = 600.0  # Per-worker; other workers see fee structure edits after at most this long
+    EARLY_WARNING_WINDOW_DAYS: int = 14  # Recent attendance window, compared with the one before it
+    EARLY_WARNING_GRADE_WINDOW_DAYS: int = 42  # Grades in the slope fit
+    # Relative weight of each risk component; JSON in the environment
+    EARLY_WARNING_WEIGHTS: Dict[str, float] = {
+        "absence": 0.35, "attendance_drop": 0.15, "low_average": 0.30, "grade_decline": 0.20
+    }
+    EARLY_WARNING_AT_RISK_SCORE: float = 40.0  # Scores from 0 to 100; at or above this a student is flagged
+    REPORT_RENDER_WORKERS: int = 0  # Report card render processes; 0 = one per CPU core
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,255 @@
+"""
+Shared pytest fixtures: a scratch SQLite database, the app, and a seeded school.
+
+Settings are read once, on first import, so the environment is set up here
+before anything imports config.py. Background runners (job dispatcher, health
+refresher) stay off so tests only see their own requests' SQL.
+"""
+import os
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="kastra-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ["JOBS_ENABLED"] = "false"
+os.environ["METRICS_ENABLED"] = "true"
+os.environ["HEALTH_CHECK_INTERVAL_SECONDS"] = "3600"
+os.environ["REPORT_RENDER_WORKERS"] = "1"
+
+from datetime import date, datetime, timedelta  # noqa: E402
+from functools import lru_cache  # noqa: E402
+from types import SimpleNamespace  # noqa: E402
+
+import pytest  # noqa: E402
+
+pytest_plugins = ("pytest_query_budget",)
+
+PASSWORD = "test-password"
+GUARDIAN_EMAIL = "guardian@example.com"
+ACADEMIC_YEAR = "2024-2025"
+NEXT_ACADEMIC_YEAR = "2025-2026"
+GRADE_LEVEL = 10
+
+
+@lru_cache()
+def _password_hash() -> str:
+    # bcrypt is deliberately slow; hash once for every seeded user
+    from auth import get_password_hash
+    return get_password_hash(PASSWORD)
+
+
+def _clear_caches():
+    import dashboards
+    import fee_structures
+    from routes import dashboard_routes
+
+    dashboards.invalidate_all()
+    fee_structures.structures.clear()
+    dashboard_routes.teacher_dashboards.clear()
+
+
+def _user(db, email: str, role, first_name: str, last_name: str):
+    import models
+
+    user = models.User(email=email, password_hash=_password_hash(), first_name=first_name,
+                       last_name=last_name, role=role)
+    db.add(user)
+    db.flush()
+    return user
+
+
+def seed_school(db) -> SimpleNamespace:
+    """Enough rows of everything (more than the N+1 threshold) for every route to have work to do."""
+    import models
+
+    today = date.today()
+    now = datetime.utcnow()
+    admin = _user(db, "admin@example.com", models.RoleEnum.admin, "Ada", "Admin")
+
+    teachers = []
+    for i in range(2):
+        user = _user(db, f"teacher{i}@example.com", models.RoleEnum.teacher, "Tess", f"Teacher{i}")
+        teacher = models.Teacher(user_id=user.id, department="Science")
+        db.add(teacher)
+        teachers.append(teacher)
+    db.flush()
+
+    students = []
+    for i in range(5):
+        user = _user(db, f"student{i}@example.com", models.RoleEnum.student, "Sam", f"Student{i}")
+        student = models.Student(user_id=user.id, grade_level=GRADE_LEVEL, student_id=f"STU{i:04d}",
+                                 guardian_name="Gale Guardian", guardian_email=GUARDIAN_EMAIL)
+        db.add(student)
+        students.append(student)
+    db.flush()
+    # Linked to the first two students only, though every student lists the email
+    guardian = _user(db, GUARDIAN_EMAIL, models.RoleEnum.student, "Gale", "Guardian")
+    db.add_all([
+        models.GuardianLink(student_id=student.id, user_id=guardian.id, created_by_id=admin.id)
+        for student in students[:2]
+    ])
+
+    courses = []
+    for i in range(4):
+        course = models.Course(name=f"Course {i}", code=f"C-{i}", teacher_id=teachers[0].id,
+                               enrolled_count=len(students))
+        db.add(course)
+        courses.append(course)
+    full_course = models.Course(name="Full Course", code="FULL-1", teacher_id=teachers[1].id,
+                                capacity=2, enrolled_count=2)
+    db.add(full_course)
+    db.flush()
+
+    for course in courses:
+        db.add_all([
+            models.GradingCategory(course_id=course.id, name="Homework", weight=40),
+            models.GradingCategory(course_id=course.id, name="Exams", weight=60),
+        ])
+    enrollments = [
+        models.Enrollment(student_id=student.id, course_id=course.id)
+        for course in courses for student in students
+    ]
+    enrollments += [models.Enrollment(student_id=student.id, course_id=full_course.id) for student in students[:2]]
+    db.add_all(enrollments)
+    waitlist = [models.WaitlistEntry(student_id=student.id, course_id=full_course.id) for student in students[2:]]
+    db.add_all(waitlist)
+
+    assignments = []
+    for course in courses:
+        for i in range(4):
+            assignment = models.Assignment(
+                course_id=course.id, title=f"{course.code} work {i}", max_points=20,
+                category="Homework" if i % 2 else "Exams",
+                # Two past due (graded), two coming up
+                due_date=now + timedelta(days=-7 + i * 4)
+            )
+            db.add(assignment)
+            assignments.append(assignment)
+    db.flush()
+
+    grades = [
+        models.Grade(student_id=student.id, assignment_id=assignment.id, points_earned=10 + student.id % 10,
+                     graded_at=now - timedelta(days=student.id))
+        for assignment in assignments if assignment.due_date < now
+        for student in students
+    ]
+    db.add_all(grades)
+    db.add_all([
+        models.Attendance(student_id=student.id, course_id=course.id, date=today - timedelta(days=day),
+                          status=models.AttendanceStatusEnum.present if day % 3 else models.AttendanceStatusEnum.absent)
+        for course in courses[:2] for student in students for day in range(1, 6)
+    ])
+    announcements = [
+        models.Announcement(title=f"Notice {i}", content="School news", created_by_id=admin.id)
+        for i in range(4)
+    ]
+    db.add_all(announcements)
+
+    structures = [
+        models.FeeStructure(academic_year=year, grade_level=GRADE_LEVEL, tuition=9000, total_annual=9000)
+        for year in (ACADEMIC_YEAR, NEXT_ACADEMIC_YEAR)
+    ]
+    db.add_all(structures)
+    fee_records = [
+        models.FeeRecord(student_id=student.id, academic_year=ACADEMIC_YEAR, term=term, amount=3000,
+                         due_date=today + timedelta(days=30 * i), transaction_id=f"BNK-{student.id}-{i}")
+        for student in students for i, term in enumerate(models.TermEnum)
+    ]
+    db.add_all(fee_records)
+
+    report_cards = []
+    for student in students:
+        report_card = models.ReportCard(student_id=student.id, academic_year=ACADEMIC_YEAR,
+                                        term=models.TermEnum.fall, gpa=3.2)
+        report_card.skill_assessments = [
+            models.SkillAssessment(skill_name=skill, score=4.0) for skill in ("Reading", "Teamwork")
+        ]
+        db.add(report_card)
+        report_cards.append(report_card)
+
+    job = models.Job(kind="fees.generate_year", params={"academic_year": ACADEMIC_YEAR}, created_by_id=admin.id)
+    db.add(job)
+    db.add_all([
+        models.StudentRiskScore(student_id=student.id, score=10.0 * i, at_risk=i > 3, attendance_rate=0.8,
+                                previous_attendance_rate=0.9, grade_average=70.0, recent_grades=4, computed_at=now)
+        for i, student in enumerate(students)
+    ])
+    db.commit()
+
+    return SimpleNamespace(
+        admin=admin.id,
+        teacher_users=[teacher.user_id for teacher in teachers],
+        teachers=[teacher.id for teacher in teachers],
+        student_users=[student.user_id for student in students],
+        guardian=guardian.id,
+        students=[student.id for student in students],
+        courses=[course.id for course in courses],
+        full_course=full_course.id,
+        enrollments=[enrollment.id for enrollment in enrollments],
+        waitlist=[entry.id for entry in waitlist],
+        assignments=[assignment.id for assignment in assignments],
+        grades=[grade.id for grade in grades],
+        announcements=[announcement.id for announcement in announcements],
+        structures=[structure.id for structure in structures],
+        fee_records=[record.id for record in fee_records],
+        report_cards=[report_card.id for report_card in report_cards],
+        job=job.id,
+    )
+
+
+@pytest.fixture(scope="session")
+def app():
+    from main import app
+    import routes
+
+    routes.include_all_routers(app)
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    from fastapi.testclient import TestClient
+    from database import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def db():
+    """A fresh, empty schema for every test."""
+    from database import Base, SessionLocal, engine
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    _clear_caches()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def seed(db) -> SimpleNamespace:
+    return seed_school(db)
+
+
+def auth_headers(user_id: int) -> dict:
+    from auth import create_access_token
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id)})}"}
+
+
+@pytest.fixture
+def admin_headers(seed) -> dict:
+    return auth_headers(seed.admin)
+
+
+@pytest.fixture
+def teacher_headers(seed) -> dict:
+    return auth_headers(seed.teacher_users[0])
+
+
+@pytest.fixture
+def student_headers(seed) -> dict:
+    return auth_headers(seed.student_users[0])
@@ -0,0 +1,162 @@
+"""
+Per-user cache of student dashboards, invalidated when the data changes.
+
+A student dashboard covers the students linked to a user: their own student
+record and every student an admin linked them to as a guardian. Each is
+cached per user for STUDENT_DASHBOARD_TTL_SECONDS. The cache is per worker
+like the others in cache.py, so a change has to reach every worker's copy:
+
+- On the worker that made it, a committed change to a student's grades,
+  attendance, fee records or enrollments drops the dashboards of every user
+  that student is linked to. ORM writes are picked up by session events (a
+  flush notes the affected student IDs, a commit invalidates them, a
+  rollback forgets them); Core bulk writes report their students with
+  students_changed().
+- Every other worker finds out on its next hit: before serving a cached
+  dashboard, one query checks whether any of those rows or an announcement
+  changed after the dashboard was computed, using the ``updated_at``
+  columns, and whether one of those rows was deleted since, using the
+  tombstones ORM deletes leave (change_feed.py; a Core delete of these rows
+  would have to add its own). Like /api/sync, the check reaches
+  SYNC_CURSOR_OVERLAP_SECONDS further back to catch late commits.
+
+Changes nothing tracks, such as a new assignment or a deleted announcement,
+show up when the entry expires.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, List
+
+from sqlalchemy import event, exists, or_, select
+from sqlalchemy.orm import Session
+
+from config import get_settings
+import cache
+import models
+
+settings = get_settings()
+
+student_dashboards = cache.TTLCache(
+    ttl=settings.STUDENT_DASHBOARD_TTL_SECONDS, maxsize=8192, name="student_dashboard"
+)
+
+# Models whose rows feed a student dashboard, each with a student_id column
+TRACKED_MODELS = (models.Grade, models.Attendance, models.FeeRecord, models.Enrollment)
+_SESSION_KEY = "dashboard_students"
+
+# Student ID -> users whose cached dashboard includes that student; users
+# whose entry expired or was evicted are pruned every TTL
+_viewers = {}
+_viewers_lock = threading.Lock()
+_last_prune = 0.0
+
+
+def cached(db: Session, user: models.User, student_ids: List[int], compute):
+    """The user's dashboard from the cache, computing it on a miss.
+
+    A cached dashboard is served only if nothing it covers changed since it
+    was computed, possibly on another worker. The user is linked to the
+    students before computing, so a change committed meanwhile still
+    invalidates it (see cache.TTLCache.get_or_set).
+    """
+    entry = student_dashboards.get(user.id)
+    if entry is not None:
+        computed_at, cached_ids, dashboard = entry
+        # Different students when a guardian link was added or removed
+        if cached_ids == tuple(student_ids) and not _changed_since(db, user, student_ids, computed_at):
+            return dashboard
+        student_dashboards.invalidate(user.id)
+
+    _prune_viewers_if_due()
+    with _viewers_lock:
+        for student_id in student_ids:
+            _viewers.setdefault(student_id, set()).add(user.id)
+
+    def computed():
+        computed_at = datetime.utcnow()
+        return computed_at, tuple(student_ids), compute()
+
+    return student_dashboards.get_or_set(user.id, computed)[2]
+
+
+def _changed_since(db: Session, user: models.User, student_ids: List[int], computed_at: datetime) -> bool:
+    """Whether anything on the dashboard changed since ``computed_at``, on any worker."""
+    if user.announcements_read_at is not None and user.announcements_read_at >= computed_at:
+        return True
+    since = computed_at - timedelta(seconds=settings.SYNC_CURSOR_OVERLAP_SECONDS)
+    checks = [
+        exists().where(model.student_id.in_(student_ids), model.updated_at >= since)
+        for model in TRACKED_MODELS
+    ]
+    checks.append(exists().where(
+        models.SyncTombstone.student_id.in_(student_ids), models.SyncTombstone.deleted_at >= since
+    ))
+    checks.append(exists().where(models.Announcement.updated_at >= since))
+    return db.execute(select(or_(*checks))).scalar()
+
+
+def _prune_viewers_if_due():
+    """Forget links of users whose dashboard is no longer cached."""
+    global _last_prune
+    if time.monotonic() - _last_prune < student_dashboards.ttl:
+        return
+    cached_users = set(student_dashboards.keys())
+    with _viewers_lock:
+        _last_prune = time.monotonic()
+        for student_id in list(_viewers):
+            _viewers[student_id] &= cached_users
+            if not _viewers[student_id]:
+                del _viewers[student_id]
+
+
+def invalidate_students(student_ids: Iterable[int]):
+    with _viewers_lock:
+        users = set()
+        for student_id in student_ids:
+            users |= _viewers.pop(student_id, set())
+    for user_id in users:
+        student_dashboards.invalidate(user_id)
+
+
+def invalidate_user(user_id: int):
+    student_dashboards.invalidate(user_id)
+
+
+def invalidate_all():
+    with _viewers_lock:
+        _viewers.clear()
+    student_dashboards.clear()
+
+
+def students_changed(db: Session, student_ids: Iterable[int]):
+    """Note students changed by a Core statement; their dashboards drop when ``db`` commits."""
+    db.info.setdefault(_SESSION_KEY, set()).update(
+        student_id for student_id in student_ids if student_id is not None
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _note_changed_students(session: Session, flush_context):
+    changed = [
+        instance.student_id
+        for instance in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(instance, TRACKED_MODELS)
+    ]
+    if changed:
+        students_changed(session, changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session):
+    student_ids = session.info.pop(_SESSION_KEY, None)
+    if student_ids:
+        invalidate_students(student_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session: Session):
+    if session.in_nested_transaction():
+        # Only a savepoint (group_commit.py); the rest of the transaction may still commit
+        return
+    session.info.pop(_SESSION_KEY, None)
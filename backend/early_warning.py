@@ -0,0 +1,224 @@
+"""
+Early-warning risk scores for every student, vectorized over the whole school.
+
+Each run loads per-student aggregates into NumPy arrays:
+
+- attendance rate (present or late) over the last EARLY_WARNING_WINDOW_DAYS
+  and over the window before it, from one grouped query;
+- overall grade average, from the grade aggregates;
+- grade slope, the least-squares trend of grade percentages over the last
+  EARLY_WARNING_GRADE_WINDOW_DAYS in percentage points per week. The
+  database returns the five per-student sums the fit needs, and the slopes
+  of all students are solved at once.
+
+Four risk components in [0, 1] are combined with the EARLY_WARNING_WEIGHTS
+into a 0-100 score:
+
+- ``absence``: share of the recent window missed
+- ``attendance_drop``: fall in the attendance rate since the previous window
+- ``low_average``: how far the grade average sits below PASSING_PERCENTAGE
+- ``grade_decline``: downward grade slope, saturating at SLOPE_SCALE points a week
+
+A component without data (no attendance, fewer than MIN_SLOPE_GRADES recent
+grades) contributes nothing. The scores replace the contents of
+``student_risk_scores`` in one transaction, so readers never see a half-written
+run.
+"""
+from datetime import date, datetime, timedelta
+from typing import Callable, Optional
+
+import numpy as np
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from config import get_settings
+import models
+
+settings = get_settings()
+
+COMPONENTS = ("absence", "attendance_drop", "low_average", "grade_decline")
+PASSING_PERCENTAGE = 60.0
+SLOPE_SCALE = 10.0  # Points per week lost for the full grade_decline component
+MIN_SLOPE_GRADES = 3
+INSERT_BATCH_SIZE = 5000
+
+
+def _weights() -> np.ndarray:
+    unknown = set(settings.EARLY_WARNING_WEIGHTS) - set(COMPONENTS)
+    if unknown:
+        raise ValueError(f"Unknown early-warning components: {', '.join(sorted(unknown))}")
+    weights = np.array([settings.EARLY_WARNING_WEIGHTS.get(name, 0.0) for name in COMPONENTS])
+    if weights.sum() <= 0:
+        raise ValueError("EARLY_WARNING_WEIGHTS must have a positive total")
+    return weights / weights.sum()
+
+
+def _attendance_rates(db: Session, index: Callable, n: int, today: date):
+    """(recent, previous) attendance rates per student; NaN without records."""
+    window = settings.EARLY_WARNING_WINDOW_DAYS
+    recent_start = today - timedelta(days=window - 1)
+    previous_start = recent_start - timedelta(days=window)
+    recent = models.Attendance.date >= recent_start
+    attended = models.Attendance.status.in_((models.AttendanceStatusEnum.present, models.AttendanceStatusEnum.late))
+    rows = db.execute(
+        select(
+            models.Attendance.student_id,
+            case((recent, 1), else_=0),
+            func.count(),
+            func.sum(case((attended, 1), else_=0))
+        ).where(
+            models.Attendance.date >= previous_start,
+            models.Attendance.date <= today,
+            models.Attendance.student_id.isnot(None)
+        ).group_by(models.Attendance.student_id, case((recent, 1), else_=0))
+    ).all()
+
+    counts = np.zeros((2, n))
+    present = np.zeros((2, n))
+    if rows:
+        # Plain tuples: numpy probes Row objects for array attributes, one exception per cell
+        data = np.array([tuple(row) for row in rows], dtype=float)
+        positions = index(data[:, 0])
+        known = positions >= 0
+        window_index = 1 - data[known, 1].astype(np.int64)  # 0 = recent, 1 = previous
+        np.add.at(counts, (window_index, positions[known]), data[known, 2])
+        np.add.at(present, (window_index, positions[known]), data[known, 3])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rates = np.where(counts > 0, present / counts, np.nan)
+    return rates[0], rates[1]
+
+
+def _grade_averages(db: Session, index: Callable, n: int) -> np.ndarray:
+    """Mean grade percentage across all courses; NaN when nothing is graded."""
+    rows = db.execute(
+        select(
+            models.GradeAggregate.student_id,
+            func.sum(models.GradeAggregate.percentage_sum),
+            func.sum(models.GradeAggregate.graded_count)
+        ).group_by(models.GradeAggregate.student_id)
+    ).all()
+    averages = np.full(n, np.nan)
+    if rows:
+        data = np.array([tuple(row) for row in rows], dtype=float)
+        positions = index(data[:, 0])
+        known = (positions >= 0) & (data[:, 2] > 0)
+        averages[positions[known]] = data[known, 1] / data[known, 2]
+    return averages
+
+
+def _weeks_since(db: Session, column, start: datetime):
+    """SQL expression for the weeks from ``start`` to a timestamp column."""
+    if db.get_bind().dialect.name == "sqlite":
+        return (func.julianday(column) - func.julianday(start)) / 7.0
+    return func.extract("epoch", column - start) / (7 * 86400.0)
+
+
+def _grade_slopes(db: Session, index: Callable, n: int, now: datetime):
+    """(slope in points per week, recent grade count) per student; NaN below MIN_SLOPE_GRADES."""
+    start = now - timedelta(days=settings.EARLY_WARNING_GRADE_WINDOW_DAYS)
+    graded = select(
+        models.Grade.student_id,
+        _weeks_since(db, models.Grade.graded_at, start).label("x"),
+        (func.coalesce(models.Grade.points_earned, 0.0) * 100.0 / models.Assignment.max_points).label("y")
+    ).join(
+        models.Assignment, models.Grade.assignment_id == models.Assignment.id
+    ).where(
+        models.Grade.graded_at >= start,
+        models.Grade.student_id.isnot(None),
+        models.Assignment.max_points > 0
+    ).subquery()
+    # Only the sums a least-squares fit needs leave the database: one row per student
+    rows = db.execute(
+        select(
+            graded.c.student_id,
+            func.count(),
+            func.sum(graded.c.x),
+            func.sum(graded.c.y),
+            func.sum(graded.c.x * graded.c.y),
+            func.sum(graded.c.x * graded.c.x)
+        ).group_by(graded.c.student_id)
+    ).all()
+
+    sums = np.zeros((5, n))
+    if rows:
+        data = np.array([tuple(row) for row in rows], dtype=float)
+        positions = index(data[:, 0])
+        known = positions >= 0
+        sums[:, positions[known]] = data[known, 1:].T
+    count, sum_x, sum_y, sum_xy, sum_xx = sums
+
+    # slope = (n*Sxy - Sx*Sy) / (n*Sxx - Sx^2)
+    denominator = count * sum_xx - sum_x ** 2
+    # Grades all entered at the same moment have no trend
+    fit = (count >= MIN_SLOPE_GRADES) & (denominator > 1e-9 * np.maximum(count, 1) ** 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slopes = np.where(fit, (count * sum_xy - sum_x * sum_y) / denominator, np.nan)
+    return slopes, count.astype(np.int64)
+
+
+def score(recent_rate, previous_rate, averages, slopes, weights: np.ndarray) -> np.ndarray:
+    """0-100 risk scores from the per-student figures; NaN inputs contribute nothing."""
+    components = np.stack([
+        1.0 - recent_rate,
+        previous_rate - recent_rate,
+        (PASSING_PERCENTAGE - averages) / PASSING_PERCENTAGE,
+        -slopes / SLOPE_SCALE,
+    ], axis=1)
+    components = np.clip(np.nan_to_num(components, nan=0.0), 0.0, 1.0)
+    return components @ weights * 100
+
+
+def compute(db: Session, progress: Optional[Callable[[int, int, str], None]] = None) -> dict:
+    """Score every student and replace ``student_risk_scores``; returns counts for the job result."""
+    now = datetime.utcnow()
+    weights = _weights()  # Fail on bad settings before doing any work
+    student_ids = np.array(
+        db.execute(select(models.Student.id).order_by(models.Student.id)).scalars().all(), dtype=np.int64
+    )
+    n = len(student_ids)
+
+    def index(ids: np.ndarray) -> np.ndarray:
+        """Row of each student ID in the arrays; -1 for students created since the ID list was read."""
+        ids = ids.astype(np.int64)
+        if n == 0:
+            return np.full(len(ids), -1)
+        positions = np.minimum(np.searchsorted(student_ids, ids), n - 1)
+        return np.where(student_ids[positions] == ids, positions, -1)
+
+    recent_rate, previous_rate = _attendance_rates(db, index, n, now.date())
+    averages = _grade_averages(db, index, n)
+    slopes, recent_grades = _grade_slopes(db, index, n, now)
+    scores = score(recent_rate, previous_rate, averages, slopes, weights)
+    at_risk = scores >= settings.EARLY_WARNING_AT_RISK_SCORE
+
+    def column(array: np.ndarray, digits: int = 2) -> list:
+        """Rounded Python values, None for NaN"""
+        return np.where(np.isnan(array), None, np.round(array, digits)).tolist()
+
+    columns = {
+        "student_id": student_ids.tolist(),
+        "score": np.round(scores, 2).tolist(),
+        "at_risk": at_risk.tolist(),
+        "attendance_rate": column(recent_rate, 4),
+        "previous_attendance_rate": column(previous_rate, 4),
+        "grade_average": column(averages),
+        "grade_slope": column(slopes),
+        "recent_grades": recent_grades.tolist(),
+    }
+    rows = [
+        dict(zip(columns, values), computed_at=now) for values in zip(*columns.values())
+    ]
+    # Reported before writing: progress commits on its own connection, which
+    # would wait on this transaction's write lock under SQLite
+    if progress is not None:
+        progress(n, n, f"Scored {n} students, saving")
+    db.execute(delete(models.StudentRiskScore))
+    for start in range(0, n, INSERT_BATCH_SIZE):
+        # Core insert: the rows are plain dicts, nothing for the ORM to track
+        db.execute(insert(models.StudentRiskScore.__table__), rows[start:start + INSERT_BATCH_SIZE])
+    db.commit()
+    return {
+        "students_scored": n,
+        "at_risk": int(at_risk.sum()),
+        "weights": dict(zip(COMPONENTS, weights.round(4).tolist())),
+    }
@@ -0,0 +1,241 @@
+"""
+Bank statement reconciliation: mark fee records paid from a CSV file.
+
+The statement needs a header line with ``transaction_id``, ``student_id``
+(the student's school reference, ``students.student_id``), ``amount`` and
+``date`` (YYYY-MM-DD) columns; an optional ``payment_method`` column
+overrides the default per line. Lines are read as a stream and handled
+FEE_RECONCILE_CHUNK_SIZE lines at a time, each chunk in its own
+transaction: indexed lookups find the candidate records for the whole
+chunk, and one bulk UPDATE marks the matches paid. Because chunks commit as
+they go, the whole upload is first read once without touching the
+database; a line that is not UTF-8 text or not valid CSV is rejected by
+number before anything is written.
+
+A line matches:
+
+1. the fee record carrying its transaction ID, if there is one (the amount
+   must agree); a record already paid is reported as matched but left alone,
+   so uploading the same file twice is harmless;
+2. otherwise the one outstanding record of that student with that amount,
+   which also gets the line's transaction ID.
+
+Several candidates make a line ambiguous; it and unmatched lines are left
+for someone to resolve by hand. A record is matched by at most one line per
+upload.
+"""
+import csv
+from collections import defaultdict
+from datetime import date
+from itertools import islice
+from typing import IO, Iterator, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+import dashboards
+import models
+
+REQUIRED_COLUMNS = {"transaction_id", "student_id", "amount", "date"}
+OUTSTANDING = (models.PaymentStatusEnum.unpaid, models.PaymentStatusEnum.pending, models.PaymentStatusEnum.overdue)
+
+
+def _cents(amount: float) -> int:
+    return round(amount * 100)
+
+
+def _parse(line_number: int, row: dict, default_method: str) -> dict:
+    """One statement line; ``error`` is set when it cannot be matched at all."""
+    line = {
+        "line": line_number,
+        "transaction_id": (row.get("transaction_id") or "").strip() or None,
+        "student_reference": (row.get("student_id") or "").strip() or None,
+        "amount": None,
+        "payment_method": (row.get("payment_method") or "").strip() or default_method,
+        "error": None,
+    }
+    try:
+        line["amount"] = float((row.get("amount") or "").replace(",", ""))
+        line["paid_date"] = date.fromisoformat((row.get("date") or "").strip())
+    except ValueError:
+        line["error"] = "Invalid amount or date"
+    return line
+
+
+def _decoded(raw: IO[bytes], position: Optional[dict] = None) -> Iterator[str]:
+    """The upload's lines as text, an optional byte order mark dropped.
+
+    Decoding line by line (rather than through a buffered text wrapper) pins
+    an error to its line, counted in ``position["line"]``.
+    """
+    for number, line in enumerate(raw, start=1):
+        if position is not None:
+            position["line"] = number
+        yield line.decode("utf-8-sig" if number == 1 else "utf-8")
+
+
+def _validate(raw: IO[bytes]):
+    """Read the whole statement once; 400 naming the first line that cannot be read."""
+    position = {"line": 0}
+    try:
+        for _ in csv.reader(_decoded(raw, position)):
+            pass
+    except UnicodeDecodeError:
+        reason = "is not UTF-8 text"
+    except csv.Error as error:
+        reason = f"is not valid CSV ({error})"
+    else:
+        return
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Statement line {position['line']} {reason}; nothing was reconciled"
+    )
+
+
+def _records(reader: csv.DictReader) -> Iterator[tuple]:
+    """Each row with the line it starts on; a quoted field can span several lines.
+
+    ``reader.line_num`` is the line a row ends on, so the newlines inside its
+    fields are counted back off.
+    """
+    for row in reader:
+        values = [value for value in row.values() if isinstance(value, str)]
+        values += [value for value in row.get(None) or []]
+        yield reader.line_num - sum(value.count("\n") for value in values), row
+
+
+def _chunks(rows: Iterator, size: int) -> Iterator[list]:
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _paid(record_id: int, line: dict) -> dict:
+    return {
+        "id": record_id,
+        "status": models.PaymentStatusEnum.paid,
+        "paid_date": line["paid_date"],
+        "payment_method": line["payment_method"],
+        "transaction_id": line["transaction_id"],
+    }
+
+
+def _entry(line: dict, **fields) -> dict:
+    entry = {key: line[key] for key in ("line", "transaction_id", "student_reference", "amount")}
+    entry.update(fields)
+    return entry
+
+
+def reconcile(db: Session, raw: IO[bytes], default_method: str, chunk_size: int) -> dict:
+    """Match every line of a statement, a seekable binary file; returns the report."""
+    _validate(raw)
+    raw.seek(0)
+    reader = csv.DictReader(_decoded(raw))
+    if reader.fieldnames is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Statement is empty")
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    missing = REQUIRED_COLUMNS - set(reader.fieldnames)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Statement is missing columns: {', '.join(sorted(missing))}"
+        )
+
+    report = {"total_lines": 0, "updated_count": 0, "matched": [], "unmatched": [], "ambiguous": []}
+    claimed = set()
+    for chunk in _chunks(_records(reader), chunk_size):
+        lines = [_parse(line_number, row, default_method) for line_number, row in chunk]
+        report["total_lines"] += len(lines)
+        report["updated_count"] += _reconcile_chunk(db, lines, claimed, report)
+        db.commit()
+
+    for key in ("matched", "unmatched", "ambiguous"):
+        report[key].sort(key=lambda entry: entry["line"])
+        report[f"{key}_count"] = len(report[key])
+    return report
+
+
+def _reconcile_chunk(db: Session, lines: List[dict], claimed: set, report: dict) -> int:
+    valid = []
+    for line in lines:
+        if line["error"]:
+            report["unmatched"].append(_entry(line, reason=line["error"]))
+        else:
+            valid.append(line)
+
+    by_transaction = defaultdict(list)
+    transaction_ids = {line["transaction_id"] for line in valid if line["transaction_id"]}
+    if transaction_ids:
+        for record in db.query(
+            models.FeeRecord.id, models.FeeRecord.student_id, models.FeeRecord.transaction_id,
+            models.FeeRecord.amount, models.FeeRecord.status
+        ).filter(models.FeeRecord.transaction_id.in_(transaction_ids)):
+            by_transaction[record.transaction_id].append(record)
+
+    students, by_amount = {}, defaultdict(list)
+    references = {line["student_reference"] for line in valid if line["student_reference"]}
+    if references:
+        students = dict(db.query(models.Student.student_id, models.Student.id).filter(
+            models.Student.student_id.in_(references)
+        ).all())
+    if students:
+        for record_id, student_id, amount in db.query(
+            models.FeeRecord.id, models.FeeRecord.student_id, models.FeeRecord.amount
+        ).filter(
+            models.FeeRecord.student_id.in_(students.values()),
+            models.FeeRecord.status.in_(OUTSTANDING)
+        ).order_by(models.FeeRecord.due_date, models.FeeRecord.id):
+            by_amount[(student_id, _cents(amount))].append(record_id)
+
+    updates, changed_students = [], set()
+    for line in valid:
+        by_id = by_transaction.get(line["transaction_id"], [])
+        if len(by_id) > 1:
+            report["ambiguous"].append(_entry(
+                line, candidate_ids=[record.id for record in by_id], reason="Transaction ID is on several fee records"
+            ))
+            continue
+        if by_id:
+            record = by_id[0]
+            if record.id in claimed:
+                report["unmatched"].append(_entry(line, fee_record_id=record.id, reason="Fee record already matched by an earlier line"))
+            elif _cents(record.amount) != _cents(line["amount"]):
+                report["unmatched"].append(_entry(line, fee_record_id=record.id, reason="Amount differs from the fee record"))
+            elif record.status == models.PaymentStatusEnum.paid:
+                claimed.add(record.id)
+                report["matched"].append(_entry(line, fee_record_id=record.id, reason="Already paid"))
+            else:
+                claimed.add(record.id)
+                updates.append(_paid(record.id, line))
+                changed_students.add(record.student_id)
+                report["matched"].append(_entry(line, fee_record_id=record.id))
+            continue
+
+        student_id = students.get(line["student_reference"])
+        if student_id is None:
+            report["unmatched"].append(_entry(line, reason="No fee record with this transaction ID and no such student"))
+            continue
+        candidates = [
+            record_id for record_id in by_amount.get((student_id, _cents(line["amount"])), [])
+            if record_id not in claimed
+        ]
+        if not candidates:
+            report["unmatched"].append(_entry(line, reason="No outstanding fee record for this student and amount"))
+        elif len(candidates) > 1:
+            report["ambiguous"].append(_entry(
+                line, candidate_ids=candidates, reason="Several outstanding fee records for this student and amount"
+            ))
+        else:
+            claimed.add(candidates[0])
+            updates.append(_paid(candidates[0], line))
+            changed_students.add(student_id)
+            report["matched"].append(_entry(line, fee_record_id=candidates[0]))
+
+    if updates:
+        # ORM bulk UPDATE by primary key: one executemany for the chunk
+        db.execute(update(models.FeeRecord), updates)
+        dashboards.students_changed(db, changed_students)
+    return len(updates)
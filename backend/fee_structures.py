@@ -0,0 +1,86 @@
+"""
+Read-through cache of fee structures, keyed by (academic_year, grade_level).
+
+Fee structures change about once a year but are read on every fee page.
+Each cached entry is a FeeStructureDetail: the structure plus its
+precomputed itemized total and term split, so callers neither query nor
+recompute. The fee structure routes invalidate the key on create, update and
+delete; other serve.py workers pick the change up within
+FEE_STRUCTURE_CACHE_TTL_SECONDS. Missing structures are not cached, so a new
+one is visible everywhere at once. Hit rates are in the
+``kastra_cache_lookups_total{cache="fee_structure"}`` metric.
+
+That staleness is fine for pages but not for amounts that get written:
+fee record generation reads the structure with load(), never the cache.
+"""
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from config import get_settings
+import cache
+import models
+import schemas
+
+settings = get_settings()
+
+COMPONENTS = (
+    "tuition", "lab", "library", "sports", "technology", "activities", "transport",
+    "meals", "uniforms", "books", "examination", "insurance", "development_fee", "misc",
+)
+# (term, years after the academic year's first, month, day, share of total_annual)
+TERM_SPLIT = (
+    (models.TermEnum.fall, 0, 8, 15, 0.35),
+    (models.TermEnum.spring, 1, 1, 15, 0.35),
+    (models.TermEnum.summer, 1, 5, 15, 0.30),
+)
+
+structures = cache.TTLCache(ttl=settings.FEE_STRUCTURE_CACHE_TTL_SECONDS, maxsize=1024, name="fee_structure")
+
+
+def detail(structure: models.FeeStructure) -> schemas.FeeStructureDetail:
+    """The structure with its itemized total and term split computed."""
+    year = int(structure.academic_year.split('-')[0])
+    total_annual = structure.total_annual or 0.0
+    return schemas.FeeStructureDetail.model_validate({
+        **schemas.FeeStructureResponse.model_validate(structure).model_dump(),
+        "components_total": round(sum(getattr(structure, name) or 0.0 for name in COMPONENTS), 2),
+        "terms": [
+            {"term": term, "due_date": date(year + offset, month, day), "amount": round(total_annual * share, 2)}
+            for term, offset, month, day, share in TERM_SPLIT
+        ],
+    })
+
+
+def load(db: Session, academic_year: str, grade_level: int) -> Optional[schemas.FeeStructureDetail]:
+    """The fee structure for a year and grade level, read from the database."""
+    structure = db.query(models.FeeStructure).filter(
+        models.FeeStructure.academic_year == academic_year,
+        models.FeeStructure.grade_level == grade_level
+    ).first()
+    return detail(structure) if structure is not None else None
+
+
+def get(db: Session, academic_year: str, grade_level: int) -> Optional[schemas.FeeStructureDetail]:
+    """The fee structure for a year and grade level, from the cache when possible."""
+    return structures.get_or_set((academic_year, grade_level), lambda: load(db, academic_year, grade_level))
+
+
+def invalidate(academic_year: str, grade_level: int):
+    structures.invalidate((academic_year, grade_level))
+
+
+def fee_record_rows(structure: schemas.FeeStructureDetail, student_id: int) -> List[dict]:
+    """Fee record rows for the three terms of the structure's academic year"""
+    return [
+        {
+            "student_id": student_id,
+            "academic_year": structure.academic_year,
+            "term": term.term,
+            "amount": term.amount,
+            "due_date": term.due_date,
+            "status": models.PaymentStatusEnum.unpaid
+        }
+        for term in structure.terms
+    ]
@@ -0,0 +1,152 @@
+"""
+Sparse fieldsets for list and detail endpoints.
+
+``?fields=id,grade_level,user.first_name`` names the response fields to
+return; a dotted path picks fields of a nested object, and naming the object
+itself (``user``) returns all of it. The selection becomes:
+
+- a ``load_only`` projection of the requested columns, plus an eager load
+  (narrowed the same way) of each requested relationship, so nothing else
+  is read from the database;
+- a trimmed copy of the response schema, so nothing else is encoded.
+
+Without ``fields`` an endpoint behaves exactly as before. With it, the
+response is returned directly and the OpenAPI schema still documents the
+full model.
+"""
+import typing
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, status
+from fastapi.responses import Response
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+# Parsed selection: ((field name, nested selection or None for the whole field), ...),
+# sorted so equal selections share one cached trimmed schema
+FieldSet = Tuple[Tuple[str, Optional["FieldSet"]], ...]
+
+
+def _nested_model(annotation) -> Optional[Type[BaseModel]]:
+    """The model inside ``Model``, ``Optional[Model]`` or ``List[Model]``, if any."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in typing.get_args(annotation):
+        model = _nested_model(arg)
+        if model is not None:
+            return model
+    return None
+
+
+def _replace_model(annotation, model: Type[BaseModel]):
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return model
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        return typing.Union[tuple(_replace_model(arg, model) for arg in typing.get_args(annotation))]
+    if origin is list:
+        return List[model]
+    return annotation
+
+
+def _freeze(tree: Dict[str, Optional[dict]]) -> FieldSet:
+    return tuple(sorted((name, None if sub is None else _freeze(sub)) for name, sub in tree.items()))
+
+
+def parse(fields: Optional[str], schema: Type[BaseModel]) -> Optional[FieldSet]:
+    """Parse a ``fields`` parameter against a response schema; None when not given."""
+    if fields is None:
+        return None
+    tree: Dict[str, Optional[dict]] = {}
+    for path in (part.strip() for part in fields.split(",")):
+        if not path:
+            continue
+        node, model = tree, schema
+        names = path.split(".")
+        for depth, name in enumerate(names):
+            field = model.model_fields.get(name)
+            if field is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Unknown field: {path}"
+                )
+            if depth == len(names) - 1:
+                node[name] = None
+                break
+            model = _nested_model(field.annotation)
+            if model is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Field has no sub-fields: {'.'.join(names[:depth + 1])}"
+                )
+            if name in node and node[name] is None:
+                break  # The whole object is already selected
+            node = node.setdefault(name, {})
+    if not tree:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="fields must name at least one field"
+        )
+    return _freeze(tree)
+
+
+@lru_cache(maxsize=256)
+def trimmed_schema(schema: Type[BaseModel], fieldset: FieldSet) -> Type[BaseModel]:
+    """A copy of ``schema`` with only the selected fields (recursively)."""
+    selected = dict(fieldset)
+    definitions = {}
+    for name, field in schema.model_fields.items():
+        if name not in selected:
+            continue
+        nested = selected[name]
+        annotation = field.annotation
+        if nested is not None:
+            annotation = _replace_model(annotation, trimmed_schema(_nested_model(annotation), nested))
+        definitions[name] = (annotation, ... if field.is_required() else field.default)
+    return create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions
+    )
+
+
+def load_options(model, fieldset: FieldSet, always: Iterable = ()) -> list:
+    """Loader options reading only the selected columns and relationships of ``model``.
+
+    ``always`` lists extra column attributes the route itself needs, such as
+    an owner ID used for an authorization check.
+    """
+    mapper = inspect(model)
+    columns = [getattr(model, name) for name, _ in fieldset if name in mapper.column_attrs]
+    columns += [attribute for attribute in always if attribute not in columns]
+    options = [load_only(*columns)] if columns else [load_only(*[
+        getattr(model, mapper.get_property_by_column(column).key) for column in mapper.primary_key
+    ])]
+    for name, nested in fieldset:
+        relationship = mapper.relationships.get(name)
+        if relationship is None:
+            continue
+        # Join many-to-one relations into the query; collections get one extra query
+        loader = selectinload if relationship.uselist else joinedload
+        option = loader(getattr(model, name))
+        if nested is not None:
+            option = option.options(*load_options(relationship.mapper.class_, nested))
+        options.append(option)
+    return options
+
+
+@lru_cache(maxsize=256)
+def _adapter(schema: Type[BaseModel], fieldset: FieldSet, many: bool) -> TypeAdapter:
+    trimmed = trimmed_schema(schema, fieldset)
+    return TypeAdapter(List[trimmed] if many else trimmed)
+
+
+def respond(result, schema: Type[BaseModel], fieldset: FieldSet, many: bool = False) -> Response:
+    """Serialize ORM objects with the trimmed schema, bypassing the route's response_model."""
+    adapter = _adapter(schema, fieldset, many)
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(result, from_attributes=True)),
+        media_type="application/json"
+    )
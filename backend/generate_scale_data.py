@@ -0,0 +1,326 @@
+"""
+Synthetic data generator for load and performance testing.
+USE ONLY FOR TESTING/DEVELOPMENT - NOT FOR PRODUCTION!
+
+Bulk-loads a school of configurable size with driver-level executemany
+inserts, so even the default (20k students, 1M attendance rows) seeds in well
+under a minute on SQLite:
+
+    python generate_scale_data.py --drop
+    python generate_scale_data.py --students 2000 --teachers 80 --courses 200 \\
+        --attendance 100000 --grades 50000 --seed 7
+
+Every generated account uses the password from --password, so load tests can
+log in as any of them (admin@kastra.com, teacher00001@kastra.com,
+student00001@kastra.com, ...).
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from database import Base, engine
+from auth import get_password_hash
+import grade_aggregates
+import models
+import seats
+
+CHUNK_SIZE = 50_000
+
+DEPARTMENTS = [
+    "Mathematics", "Science", "English", "History", "Computer Science",
+    "Art", "Music", "Physical Education", "Languages", "Economics"
+]
+FIRST_NAMES = [
+    "Amina", "Brian", "Chloe", "David", "Esther", "Farah", "George", "Hana",
+    "Ian", "Joy", "Kevin", "Lena", "Moses", "Nora", "Otieno", "Priya"
+]
+LAST_NAMES = [
+    "Achieng", "Brown", "Chen", "Diaz", "Evans", "Fischer", "Garcia", "Hassan",
+    "Ito", "Jones", "Kamau", "Lopez", "Mwangi", "Nakamura", "Okafor", "Patel"
+]
+FEE_TERMS = [
+    (models.TermEnum.fall, 8, 15, 0.35),
+    (models.TermEnum.spring, 1, 15, 0.35),
+    (models.TermEnum.summer, 5, 15, 0.30),
+]
+
+
+def _bulk_insert(conn, model, rows):
+    """Insert rows with a driver-level executemany in fixed-size chunks.
+
+    Rows hold values the driver accepts as-is (enum names, dates), which skips
+    SQLAlchemy's per-row bind processing - the dominant cost at this scale.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    compiled = insert(table).compile(dialect=conn.dialect, column_keys=list(rows[0]))
+
+    # Columns the rows leave out still get their Python-side defaults
+    defaults = {}
+    for key in compiled.params:
+        if key not in rows[0]:
+            default = table.c[key].default
+            defaults[key] = default.arg(None) if default.is_callable else default.arg
+
+    if compiled.positional:
+        keys = compiled.positiontup
+        params = [tuple(row[key] if key in row else defaults[key] for key in keys) for row in rows]
+    else:
+        params = [{**defaults, **row} for row in rows]
+
+    for start in range(0, len(params), CHUNK_SIZE):
+        conn.exec_driver_sql(compiled.string, params[start:start + CHUNK_SIZE])
+
+
+def _school_days(end: date, count: int):
+    """The ``count`` most recent weekdays up to and including ``end``."""
+    days = []
+    day = end
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= timedelta(days=1)
+    return days
+
+
+def generate(
+    students: int = 20_000,
+    teachers: int = 800,
+    courses: int = 2_000,
+    courses_per_student: int = 6,
+    assignments_per_course: int = 10,
+    attendance: int = 1_000_000,
+    grades: int = 500_000,
+    academic_year: str = "2024-2025",
+    password: str = "password123",
+    seed: int = 42,
+    drop: bool = False,
+    bind=None
+):
+    bind = bind if bind is not None else engine
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    today = date.today()
+    password_hash = get_password_hash(password)  # bcrypt once, shared by every account
+    counts = {}
+
+    if drop:
+        Base.metadata.drop_all(bind=bind)
+    Base.metadata.create_all(bind=bind)
+
+    started = time.perf_counter()
+    with bind.begin() as conn:
+        if bind.dialect.name == "sqlite":
+            # Throwaway data: trade durability for load speed
+            conn.execute(text("PRAGMA synchronous = OFF"))
+
+        user_offset = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM users")).scalar()
+        if user_offset:
+            raise SystemExit("Database already has users; re-run with --drop to regenerate.")
+
+        # Users: one admin, then teachers, then students (ids are assigned in order)
+        users = [{
+            "id": 1, "email": "admin@kastra.com", "password_hash": password_hash,
+            "first_name": "Admin", "last_name": "User", "role": models.RoleEnum.admin.name,
+            "created_at": now
+        }]
+        for i in range(1, teachers + 1):
+            users.append({
+                "id": len(users) + 1, "email": f"teacher{i:05d}@kastra.com",
+                "password_hash": password_hash, "first_name": rng.choice(FIRST_NAMES),
+                "last_name": rng.choice(LAST_NAMES), "role": models.RoleEnum.teacher.name,
+                "created_at": now
+            })
+        for i in range(1, students + 1):
+            users.append({
+                "id": len(users) + 1, "email": f"student{i:05d}@kastra.com",
+                "password_hash": password_hash, "first_name": rng.choice(FIRST_NAMES),
+                "last_name": rng.choice(LAST_NAMES), "role": models.RoleEnum.student.name,
+                "created_at": now
+            })
+        _bulk_insert(conn, models.User, users)
+        counts["users"] = len(users)
+
+        teacher_rows = [
+            {"id": i, "user_id": 1 + i, "phone": f"+2547{i:08d}", "department": rng.choice(DEPARTMENTS)}
+            for i in range(1, teachers + 1)
+        ]
+        _bulk_insert(conn, models.Teacher, teacher_rows)
+        counts["teachers"] = len(teacher_rows)
+
+        student_rows = []
+        for i in range(1, students + 1):
+            grade_level = rng.randint(1, 12)
+            student_rows.append({
+                "id": i, "user_id": 1 + teachers + i, "phone": f"+2541{i:08d}",
+                "date_of_birth": date(today.year - 6 - grade_level, rng.randint(1, 12), rng.randint(1, 28)),
+                "address": f"{rng.randint(1, 999)} School Road", "grade_level": grade_level,
+                "student_id": f"STU{i:05d}", "admission_date": date(today.year - rng.randint(0, 5), 9, 1),
+                "guardian_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                "guardian_phone": f"+2540{i:08d}",
+                # Siblings share a guardian
+                "guardian_email": f"guardian{(i + 1) // 2:05d}@example.com"
+            })
+        _bulk_insert(conn, models.Student, student_rows)
+        counts["students"] = len(student_rows)
+
+        course_rows = [
+            {
+                "id": i, "name": f"{rng.choice(DEPARTMENTS)} {i}", "code": f"C{i:05d}",
+                "description": "Generated course", "teacher_id": rng.randint(1, teachers),
+                "credits": rng.choice([2, 3, 4]), "created_at": now
+            }
+            for i in range(1, courses + 1)
+        ]
+        _bulk_insert(conn, models.Course, course_rows)
+        counts["courses"] = len(course_rows)
+
+        enrollments = []
+        for student_id in range(1, students + 1):
+            for course_id in rng.sample(range(1, courses + 1), min(courses_per_student, courses)):
+                enrollments.append((student_id, course_id))
+        _bulk_insert(conn, models.Enrollment, [
+            {"id": i, "student_id": student_id, "course_id": course_id, "enrolled_at": now}
+            for i, (student_id, course_id) in enumerate(enrollments, start=1)
+        ])
+        counts["enrollments"] = len(enrollments)
+
+        assignment_rows = []
+        assignments_by_course = {}
+        for course_id in range(1, courses + 1):
+            for n in range(assignments_per_course):
+                assignment_id = len(assignment_rows) + 1
+                assignment_rows.append({
+                    "id": assignment_id, "course_id": course_id, "title": f"Assignment {n + 1}",
+                    "description": None,
+                    "due_date": now + timedelta(days=7 * (n - assignments_per_course // 2)),
+                    "max_points": rng.choice([10.0, 20.0, 50.0, 100.0]), "created_at": now
+                })
+                assignments_by_course.setdefault(course_id, []).append(assignment_id)
+        _bulk_insert(conn, models.Assignment, assignment_rows)
+        counts["assignments"] = len(assignment_rows)
+
+        max_points = {row["id"]: row["max_points"] for row in assignment_rows}
+        grade_pairs = set()
+        grade_target = min(grades, len(enrollments) * assignments_per_course)
+        while len(grade_pairs) < grade_target:
+            student_id, course_id = enrollments[rng.randrange(len(enrollments))]
+            grade_pairs.add((student_id, rng.choice(assignments_by_course[course_id])))
+        grade_rows = [
+            {
+                "student_id": student_id, "assignment_id": assignment_id,
+                "points_earned": round(max_points[assignment_id] * (0.45 + 0.55 * rng.random()), 1),
+                "feedback": None, "graded_at": now
+            }
+            for student_id, assignment_id in grade_pairs
+        ]
+        _bulk_insert(conn, models.Grade, grade_rows)
+        counts["grades"] = len(grade_rows)
+        del grade_rows, grade_pairs
+
+        # One row per (enrollment, school day), most recent days first
+        days = _school_days(today, -(-attendance // max(len(enrollments), 1)))
+        statuses = [models.AttendanceStatusEnum.present.name] * 17 + [
+            models.AttendanceStatusEnum.late.name, models.AttendanceStatusEnum.late.name,
+            models.AttendanceStatusEnum.absent.name
+        ]
+        attendance_rows = []
+        for day in days:
+            for student_id, course_id in enrollments:
+                if len(attendance_rows) >= attendance:
+                    break
+                attendance_rows.append({
+                    "student_id": student_id, "course_id": course_id, "date": day,
+                    "status": statuses[int(rng.random() * len(statuses))], "notes": None
+                })
+        _bulk_insert(conn, models.Attendance, attendance_rows)
+        counts["attendance"] = len(attendance_rows)
+        del attendance_rows
+
+        year = int(academic_year.split("-")[0])
+        structures = []
+        for grade_level in range(1, 13):
+            tuition = 40_000.0 + grade_level * 2_500.0
+            structures.append({
+                "academic_year": academic_year, "grade_level": grade_level, "tuition": tuition,
+                "lab": 2_000.0, "library": 1_000.0, "examination": 1_500.0,
+                "total_annual": tuition + 4_500.0, "created_at": now, "updated_at": now
+            })
+        _bulk_insert(conn, models.FeeStructure, structures)
+        counts["fee_structures"] = len(structures)
+
+        totals = {row["grade_level"]: row["total_annual"] for row in structures}
+        fee_rows = []
+        for student in student_rows:
+            for term, month, day, share in FEE_TERMS:
+                due_date = date(year if month >= 8 else year + 1, month, day)
+                paid = rng.random() < 0.6
+                fee_rows.append({
+                    "student_id": student["id"], "academic_year": academic_year, "term": term.name,
+                    "amount": round(totals[student["grade_level"]] * share, 2), "due_date": due_date,
+                    "status": (models.PaymentStatusEnum.paid if paid else models.PaymentStatusEnum.unpaid).name,
+                    "paid_date": due_date if paid else None,
+                    "payment_method": "bank_transfer" if paid else None,
+                    "transaction_id": f"TXN{student['id']:05d}{term.name[:2].upper()}" if paid else None,
+                    "created_at": now, "updated_at": now
+                })
+        _bulk_insert(conn, models.FeeRecord, fee_rows)
+        counts["fee_records"] = len(fee_rows)
+
+        _bulk_insert(conn, models.Announcement, [
+            {
+                "title": f"Announcement {i}", "content": "Generated announcement.",
+                "target_audience": rng.choice(["all", "students", "teachers"]),
+                "created_by_id": 1, "created_at": now - timedelta(hours=i)
+            }
+            for i in range(1, 201)
+        ])
+        counts["announcements"] = 200
+
+    # Grades and enrollments were bulk-loaded around the app, so derive their aggregates in one pass
+    grade_aggregates.rebuild(bind)
+    seats.recount_all(bind)
+
+    counts["seconds"] = round(time.perf_counter() - started, 2)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load a synthetic school for load testing.")
+    parser.add_argument("--students", type=int, default=20_000)
+    parser.add_argument("--teachers", type=int, default=800)
+    parser.add_argument("--courses", type=int, default=2_000)
+    parser.add_argument("--courses-per-student", type=int, default=6)
+    parser.add_argument("--assignments-per-course", type=int, default=10)
+    parser.add_argument("--attendance", type=int, default=1_000_000)
+    parser.add_argument("--grades", type=int, default=500_000)
+    parser.add_argument("--academic-year", default="2024-2025")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--drop", action="store_true", help="Drop ALL existing tables and data first")
+    args = parser.parse_args()
+
+    print("⚠️  WARNING: This script generates synthetic data for TESTING ONLY!")
+    counts = generate(
+        students=args.students,
+        teachers=args.teachers,
+        courses=args.courses,
+        courses_per_student=args.courses_per_student,
+        assignments_per_course=args.assignments_per_course,
+        attendance=args.attendance,
+        grades=args.grades,
+        academic_year=args.academic_year,
+        password=args.password,
+        seed=args.seed,
+        drop=args.drop
+    )
+    for table, count in counts.items():
+        print(f"  {table}: {count}")
+
+
+if __name__ == "__main__":
+    main()
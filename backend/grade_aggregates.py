@@ -0,0 +1,226 @@
+"""
+Per-(student, course) grade totals kept in step with the grades table.
+
+Every write path that changes a grade, an assignment's max_points or which
+grades count towards a course calls into this module inside the same
+transaction, so GPA, transcripts and gradebook totals read one row per
+course instead of scanning every grade.
+
+Adding or editing a grade applies a delta. Deletions and max_points edits
+recompute just the affected (student, course) rows from the grades table,
+which keeps last_graded_at exact. Anything that writes grades behind the
+app's back (bulk loads, manual SQL) should run the rebuild afterwards:
+
+    python grade_aggregates.py --rebuild
+"""
+import argparse
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, func, insert, inspect, select, tuple_, update
+from sqlalchemy.orm import Session
+
+import models
+
+Aggregate = models.GradeAggregate
+
+
+def grade_percentage(points_earned: Optional[float], max_points: Optional[float]) -> float:
+    if not max_points:
+        return 0.0
+    return (points_earned or 0.0) / max_points * 100
+
+
+def _apply_delta(
+    db: Session,
+    student_id: int,
+    course_id: int,
+    points_earned: float,
+    max_points: float,
+    percentage: float,
+    count: int,
+    graded_at: Optional[datetime]
+):
+    values = {
+        "points_earned_sum": Aggregate.points_earned_sum + points_earned,
+        "max_points_sum": Aggregate.max_points_sum + max_points,
+        "percentage_sum": Aggregate.percentage_sum + percentage,
+        "graded_count": Aggregate.graded_count + count,
+    }
+    if graded_at is not None:
+        values["last_graded_at"] = case(
+            (Aggregate.last_graded_at.is_(None), graded_at),
+            (Aggregate.last_graded_at < graded_at, graded_at),
+            else_=Aggregate.last_graded_at
+        )
+
+    updated = db.execute(
+        update(Aggregate).where(
+            Aggregate.student_id == student_id,
+            Aggregate.course_id == course_id
+        ).values(**values)
+    ).rowcount
+    if not updated:
+        db.execute(insert(Aggregate).values(
+            student_id=student_id,
+            course_id=course_id,
+            points_earned_sum=points_earned,
+            max_points_sum=max_points,
+            percentage_sum=percentage,
+            graded_count=count,
+            last_graded_at=graded_at
+        ))
+
+
+def grade_added(db: Session, grade: models.Grade, assignment: models.Assignment):
+    """Call after the new grade is flushed (so graded_at is set)."""
+    if grade.student_id is None or assignment.course_id is None:
+        return
+    _apply_delta(
+        db, grade.student_id, assignment.course_id,
+        points_earned=grade.points_earned or 0.0,
+        max_points=assignment.max_points or 0.0,
+        percentage=grade_percentage(grade.points_earned, assignment.max_points),
+        count=1,
+        graded_at=grade.graded_at
+    )
+
+
+def grade_points_changed(db: Session, grade: models.Grade, assignment: models.Assignment, old_points: Optional[float]):
+    if grade.student_id is None or assignment.course_id is None or grade.points_earned == old_points:
+        return
+    _apply_delta(
+        db, grade.student_id, assignment.course_id,
+        points_earned=(grade.points_earned or 0.0) - (old_points or 0.0),
+        max_points=0.0,
+        percentage=(
+            grade_percentage(grade.points_earned, assignment.max_points)
+            - grade_percentage(old_points, assignment.max_points)
+        ),
+        count=0,
+        graded_at=None
+    )
+
+
+def _aggregate_select():
+    """(student_id, course_id) totals straight from grades + assignments."""
+    percentage = func.coalesce(
+        func.coalesce(models.Grade.points_earned, 0.0) * 100.0 / func.nullif(models.Assignment.max_points, 0),
+        0.0
+    )
+    return select(
+        models.Grade.student_id,
+        models.Assignment.course_id,
+        func.sum(func.coalesce(models.Grade.points_earned, 0.0)),
+        func.sum(func.coalesce(models.Assignment.max_points, 0.0)),
+        func.sum(percentage),
+        func.count(models.Grade.id),
+        func.max(models.Grade.graded_at)
+    ).join(
+        models.Assignment, models.Grade.assignment_id == models.Assignment.id
+    ).where(
+        models.Grade.student_id.isnot(None),
+        models.Assignment.course_id.isnot(None)
+    ).group_by(models.Grade.student_id, models.Assignment.course_id)
+
+
+_COLUMNS = [
+    "student_id", "course_id", "points_earned_sum", "max_points_sum",
+    "percentage_sum", "graded_count", "last_graded_at"
+]
+
+
+def recompute(db: Session, keys: Iterable[tuple]):
+    """Rebuild the given (student_id, course_id) rows from the grades table."""
+    keys = list(set(keys))
+    if not keys:
+        return
+    db.flush()
+    key_columns = tuple_(Aggregate.student_id, Aggregate.course_id)
+    db.execute(delete(Aggregate).where(key_columns.in_(keys)))
+    db.execute(insert(Aggregate).from_select(
+        _COLUMNS,
+        _aggregate_select().where(tuple_(models.Grade.student_id, models.Assignment.course_id).in_(keys))
+    ))
+
+
+def grade_removed(db: Session, student_id: Optional[int], course_id: Optional[int]):
+    """Call after the grade is deleted (flushing is handled here)."""
+    if student_id is not None and course_id is not None:
+        recompute(db, [(student_id, course_id)])
+
+
+def assignment_changed(db: Session, assignment_id: int, course_id: Optional[int]):
+    """max_points edited or assignment deleted: recompute everyone graded on it."""
+    if course_id is None:
+        return
+    student_ids = db.query(models.Grade.student_id).filter(
+        models.Grade.assignment_id == assignment_id,
+        models.Grade.student_id.isnot(None)
+    ).distinct().all()
+    recompute(db, [(student_id, course_id) for (student_id,) in student_ids])
+
+
+def forget_student(db: Session, student_id: int):
+    db.execute(delete(Aggregate).where(Aggregate.student_id == student_id))
+
+
+def forget_course(db: Session, course_id: int):
+    db.execute(delete(Aggregate).where(Aggregate.course_id == course_id))
+
+
+def gpa_for_percentage(avg_percentage: float) -> float:
+    """Convert an average percentage to the 4.0 scale"""
+    if avg_percentage >= 90:
+        return 4.0
+    elif avg_percentage >= 80:
+        return 3.0
+    elif avg_percentage >= 70:
+        return 2.0
+    elif avg_percentage >= 60:
+        return 1.0
+    return 0.0
+
+
+def student_totals(db: Session, student_id: int):
+    """(percentage_sum, graded_count) across all of a student's courses."""
+    return db.query(
+        func.coalesce(func.sum(Aggregate.percentage_sum), 0.0),
+        func.coalesce(func.sum(Aggregate.graded_count), 0)
+    ).filter(Aggregate.student_id == student_id).one()
+
+
+def rebuild(bind):
+    """Recompute the whole table in one INSERT ... SELECT."""
+    with bind.begin() as conn:
+        conn.execute(delete(Aggregate))
+        conn.execute(insert(Aggregate).from_select(_COLUMNS, _aggregate_select()))
+
+
+def ensure_table(bind):
+    """Create the table on databases that predate it and backfill it once."""
+    inspector = inspect(bind)
+    # Uninitialized databases get every table from init_db.py instead
+    if inspector.has_table(models.Grade.__tablename__) and not inspector.has_table(Aggregate.__tablename__):
+        Aggregate.__table__.create(bind=bind, checkfirst=True)
+        rebuild(bind)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the grade_aggregates table.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute every row from the grades table")
+    args = parser.parse_args()
+
+    from database import engine
+    if args.rebuild:
+        Aggregate.__table__.create(bind=engine, checkfirst=True)
+        rebuild(engine)
+        with engine.connect() as conn:
+            rows = conn.execute(select(func.count()).select_from(Aggregate)).scalar()
+        print(f"Rebuilt grade_aggregates: {rows} (student, course) rows")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
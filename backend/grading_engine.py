@@ -0,0 +1,229 @@
+"""
+Weighted-category course grading, vectorized over the whole roster.
+
+A course's grades are loaded once into a (students x assignments) matrix of
+percentages (NaN = not graded). Per category, each student's scores are
+sorted, the lowest ``drop_lowest`` dropped (at least one score is always
+kept) and the rest averaged; category averages are then combined with the
+category weights, renormalized over the categories the student has grades
+in. Letters and GPA points come from the course's grading scale.
+
+Ungraded work is excluded rather than counted as zero, matching how report
+cards have always averaged grades. Courses without categories are graded as
+a single equally-weighted category.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+import models
+
+# Mirrors the 4.0 conversion report cards use
+DEFAULT_GRADING_SCALE = [
+    {"min_percentage": 90.0, "letter": "A", "points": 4.0},
+    {"min_percentage": 80.0, "letter": "B", "points": 3.0},
+    {"min_percentage": 70.0, "letter": "C", "points": 2.0},
+    {"min_percentage": 60.0, "letter": "D", "points": 1.0},
+    {"min_percentage": 0.0, "letter": "F", "points": 0.0},
+]
+
+DEFAULT_CATEGORY = "all"
+
+
+@dataclass
+class Category:
+    name: str
+    weight: float
+    drop_lowest: int = 0
+
+
+@dataclass
+class CourseGrades:
+    student_ids: np.ndarray            # (n,)
+    categories: List[Category]
+    category_averages: np.ndarray      # (n, k) percentages, NaN = nothing graded
+    averages: np.ndarray               # (n,) weighted percentage, NaN = nothing graded
+    letters: List[Optional[str]]       # (n,)
+    points: np.ndarray                 # (n,) GPA points, NaN = nothing graded
+    graded_counts: np.ndarray          # (n,)
+    assignment_counts: List[int] = field(default_factory=list)  # per category
+    uncategorized_assignments: int = 0
+
+
+def category_averages(percentages: np.ndarray, drop_lowest: int) -> np.ndarray:
+    """Mean of each row after dropping its ``drop_lowest`` lowest scores; NaN-aware."""
+    if percentages.shape[1] == 0:
+        return np.full(percentages.shape[0], np.nan)
+    ordered = np.sort(percentages, axis=1)  # NaN sorts last
+    graded = np.count_nonzero(~np.isnan(percentages), axis=1)
+    dropped = np.minimum(drop_lowest, np.maximum(graded - 1, 0))
+    position = np.arange(percentages.shape[1])
+    keep = (position >= dropped[:, None]) & (position < graded[:, None])
+    kept = keep.sum(axis=1)
+    totals = np.where(keep, ordered, 0.0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(kept > 0, totals / kept, np.nan)
+
+
+def apply_scale(averages: np.ndarray, scale: Sequence[dict]):
+    """Vectorized lookup of (letters, points) for each average."""
+    bands = sorted(scale, key=lambda band: band["min_percentage"])
+    thresholds = np.array([band["min_percentage"] for band in bands])
+    band_points = np.array([band["points"] for band in bands], dtype=float)
+    letters = np.array([band["letter"] for band in bands], dtype=object)
+
+    graded = ~np.isnan(averages)
+    index = np.searchsorted(thresholds, np.where(graded, averages, 0.0), side="right") - 1
+    below_scale = index < 0
+    index = np.clip(index, 0, len(bands) - 1)
+
+    points = np.where(graded & ~below_scale, band_points[index], np.nan)
+    points = np.where(graded & below_scale, 0.0, points)
+    letter_list = [
+        (letters[i] if not low else bands[0]["letter"]) if ok else None
+        for i, ok, low in zip(index.tolist(), graded.tolist(), below_scale.tolist())
+    ]
+    return letter_list, points
+
+
+def compute(
+    student_ids: np.ndarray,
+    percentages: np.ndarray,
+    assignment_categories: Sequence[Optional[str]],
+    categories: Sequence[Category],
+    scale: Sequence[dict]
+) -> CourseGrades:
+    """Grade a roster from its (students x assignments) percentage matrix."""
+    if not categories:
+        categories = [Category(DEFAULT_CATEGORY, 1.0, 0)]
+        column_category = np.zeros(len(assignment_categories), dtype=int)
+    else:
+        index_by_name = {category.name.lower(): i for i, category in enumerate(categories)}
+        column_category = np.array(
+            [index_by_name.get((name or "").lower(), -1) for name in assignment_categories], dtype=int
+        )
+
+    n_students = percentages.shape[0]
+    by_category = np.full((n_students, len(categories)), np.nan)
+    assignment_counts = []
+    for i, category in enumerate(categories):
+        columns = column_category == i
+        assignment_counts.append(int(columns.sum()))
+        by_category[:, i] = category_averages(percentages[:, columns], category.drop_lowest)
+
+    weights = np.array([category.weight for category in categories], dtype=float)
+    has_grades = ~np.isnan(by_category)
+    weight_present = (has_grades * weights).sum(axis=1)
+    weighted_sum = np.where(has_grades, by_category, 0.0) @ weights
+    with np.errstate(invalid="ignore", divide="ignore"):
+        averages = np.where(weight_present > 0, weighted_sum / weight_present, np.nan)
+
+    letters, points = apply_scale(averages, scale)
+    counted = column_category >= 0
+    graded_counts = np.count_nonzero(~np.isnan(percentages[:, counted]), axis=1)
+
+    return CourseGrades(
+        student_ids=student_ids,
+        categories=list(categories),
+        category_averages=by_category,
+        averages=averages,
+        letters=letters,
+        points=points,
+        graded_counts=graded_counts,
+        assignment_counts=assignment_counts,
+        uncategorized_assignments=int((~counted).sum())
+    )
+
+
+def load_course_grades(db: Session, course: models.Course) -> CourseGrades:
+    """Build the grade matrix for a course's roster in three queries and grade it."""
+    student_ids = np.array(db.execute(
+        select(models.Enrollment.student_id).where(
+            models.Enrollment.course_id == course.id,
+            models.Enrollment.student_id.isnot(None)
+        ).distinct().order_by(models.Enrollment.student_id)
+    ).scalars().all(), dtype=np.int64)
+
+    assignments = db.execute(
+        select(models.Assignment.id, models.Assignment.max_points, models.Assignment.category).where(
+            models.Assignment.course_id == course.id
+        ).order_by(models.Assignment.id)
+    ).all()
+    assignment_ids = np.array([row.id for row in assignments], dtype=np.int64)
+    max_points = np.array([row.max_points or 0.0 for row in assignments], dtype=float)
+
+    # Core execution skips ORM row processing, which dominates at this row count
+    grades = db.connection().execute(
+        select(
+            models.Grade.student_id,
+            models.Grade.assignment_id,
+            func.coalesce(models.Grade.points_earned, 0.0)
+        ).join(
+            models.Assignment, models.Grade.assignment_id == models.Assignment.id
+        ).where(
+            models.Assignment.course_id == course.id,
+            models.Grade.student_id.isnot(None)
+        )
+    ).all()
+
+    percentages = np.full((len(student_ids), len(assignment_ids)), np.nan)
+    if grades and len(student_ids) and len(assignment_ids):
+        # Plain tuples: numpy probes Row objects for array attributes, one exception per cell
+        rows = np.array([tuple(row) for row in grades], dtype=float)
+        grade_students = rows[:, 0].astype(np.int64)
+        grade_assignments = rows[:, 1].astype(np.int64)
+        row_index = np.searchsorted(student_ids, grade_students)
+        column_index = np.searchsorted(assignment_ids, grade_assignments)
+        # Grades for students no longer enrolled are ignored
+        enrolled = (row_index < len(student_ids)) & (
+            student_ids[np.minimum(row_index, len(student_ids) - 1)] == grade_students
+        )
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = np.where(
+                max_points[column_index] > 0, rows[:, 2] / max_points[column_index] * 100, 0.0
+            )
+        percentages[row_index[enrolled], column_index[enrolled]] = values[enrolled]
+
+    categories = [
+        Category(category.name, category.weight, category.drop_lowest or 0)
+        for category in sorted(course.grading_categories, key=lambda category: category.id)
+    ]
+    return compute(
+        student_ids,
+        percentages,
+        [row.category for row in assignments],
+        categories,
+        course.grading_scale or DEFAULT_GRADING_SCALE
+    )
+
+
+def _rounded(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+def class_average(grades: CourseGrades) -> Optional[float]:
+    """Mean of the weighted averages of students with at least one grade."""
+    graded = grades.averages[~np.isnan(grades.averages)]
+    return round(float(graded.mean()), 2) if len(graded) else None
+
+
+def to_rows(grades: CourseGrades, names: Dict[int, str]) -> List[dict]:
+    """Per-student dicts for the API response."""
+    rows = []
+    for i, student_id in enumerate(grades.student_ids.tolist()):
+        rows.append({
+            "student_id": student_id,
+            "student_name": names.get(student_id, ""),
+            "category_averages": {
+                category.name: _rounded(grades.category_averages[i, j])
+                for j, category in enumerate(grades.categories)
+            },
+            "average": _rounded(grades.averages[i]),
+            "letter": grades.letters[i],
+            "gpa_points": _rounded(grades.points[i]),
+            "graded_count": int(grades.graded_counts[i]),
+        })
+    return rows
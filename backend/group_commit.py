@@ -0,0 +1,152 @@
+"""
+Group commit for bursts of small writes (attendance marks and new grades).
+
+With GROUP_COMMIT_ENABLED, those endpoints still authenticate and validate on
+their own session, but hand the write itself to one writer thread per
+process and wait for its result. The writer collects the writes that arrive
+within GROUP_COMMIT_WINDOW_MS, up to GROUP_COMMIT_MAX_BATCH of them, and
+applies them in a single transaction. Under SQLite that is one write lock and
+one fsync per batch instead of one per request, and request threads no longer
+queue on the lock (or give up with "database is locked").
+
+Each write runs inside its own SAVEPOINT, so a write that fails (a duplicate
+grade, a lost Idempotency-Key race) rolls back alone and fails only its own
+request; the rest of the batch still commits. Results are handed back after
+the commit, so a request never reports a write that is not durable. If the
+commit itself fails, every request in the batch gets the error.
+
+The writer uses an ordinary session, so the session hooks (sync tombstones,
+dashboard invalidation) see these writes like any other.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from config import get_settings
+from database import engine
+import metrics
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class GroupCommitter:
+    """Single writer thread applying queued writes in batched transactions."""
+
+    def __init__(self, bind, window: float = 0.005, max_batch: int = 100):
+        self.session_factory = sessionmaker(bind=bind, autocommit=False, autoflush=False)
+        self.sqlite = bind.dialect.name == "sqlite"
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """Commit what is queued, then stop the writer."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, write: Callable[[Session], Any]) -> Any:
+        """Run ``write(session)`` in the next batch; returns its result once committed, or raises its error."""
+        self.start()
+        future: Future = Future()
+        self._queue.put((write, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._apply(batch)
+            except Exception:
+                # _apply resolves every future itself; this only keeps the writer alive
+                logger.exception("Group commit batch failed")
+            if stopping:
+                return
+
+    def _apply(self, batch: List[Tuple[Callable[[Session], Any], Future]]):
+        metrics.GROUP_COMMIT_BATCH_SIZE.observe(len(batch))
+        outcomes = []
+        db = self.session_factory()
+        try:
+            if self.sqlite:
+                # pysqlite would otherwise let the first SAVEPOINT open, and its
+                # RELEASE commit, the transaction; IMMEDIATE takes the write lock up front
+                db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+            for write, future in batch:
+                savepoint = db.begin_nested()
+                try:
+                    result = write(db)
+                    savepoint.commit()
+                except Exception as exc:
+                    savepoint.rollback()
+                    outcomes.append((future, None, exc))
+                else:
+                    outcomes.append((future, result, None))
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            for _, future in batch:
+                future.set_exception(exc)
+            raise
+        finally:
+            db.close()
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def holds_write_lock(db: Session) -> bool:
+    """Whether ``db`` has uncommitted writes that the writer's transaction would wait on.
+
+    Request sessions must not, while they wait in submit(): under SQLite the
+    writer's BEGIN IMMEDIATE would block on their lock until the busy timeout.
+    """
+    if db.new or db.dirty or db.deleted:
+        return True
+    if not db.in_transaction():
+        return False
+    # pysqlite only opens a transaction (and takes the lock) for writes
+    return bool(getattr(db.connection().connection.driver_connection, "in_transaction", False))
+
+
+settings = get_settings()
+
+writer = GroupCommitter(
+    engine,
+    window=settings.GROUP_COMMIT_WINDOW_MS / 1000,
+    max_batch=settings.GROUP_COMMIT_MAX_BATCH
+)
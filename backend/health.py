@@ -0,0 +1,110 @@
+"""
+Cached database health for the liveness/readiness probes.
+
+A background task runs ``SELECT 1`` every HEALTH_CHECK_INTERVAL_SECONDS and
+the probe endpoints only read the cached result, so a slow or locked
+database can never make a probe hang (and get a healthy replica restarted).
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    def __init__(self, engine, interval: float = 5.0):
+        self.engine = engine
+        self.interval = interval
+        self.database_online = False
+        self.message = "Database has not been checked yet"
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def check_database(self):
+        """Run the probe query and record the outcome. Blocking."""
+        start = time.perf_counter()
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            online, message = True, "Database is healthy"
+        except Exception as e:
+            online, message = False, f"Database error: {str(e)}"
+            logger.warning("Health check failed: %s", e)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self.database_online = online
+            self.message = message
+            self.latency_ms = round(latency_ms, 3)
+            self.checked_at = time.time()
+
+    def is_stale(self) -> bool:
+        """True when the refresher has not reported for three intervals."""
+        return self.checked_at is None or time.time() - self.checked_at > 3 * self.interval
+
+    def is_ready(self) -> bool:
+        return self.database_online and not self.is_stale()
+
+    def pool_stats(self) -> dict:
+        pool = self.engine.pool
+        stats = {"class": type(pool).__name__}
+        # Not every pool implementation (e.g. SQLite's SingletonThreadPool) exposes these
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, name, None)
+            if callable(method):
+                stats[name] = method()
+        return stats
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            online = self.database_online
+            message = self.message
+            latency_ms = self.latency_ms
+            checked_at = self.checked_at
+
+        stale = self.is_stale()
+        if stale and checked_at is not None:
+            message = "Health check result is stale"
+
+        p99 = metrics.recent_query_latency_percentile(99)
+        return {
+            "database": {
+                "status": "online" if online and not stale else "offline",
+                "message": message,
+                "latency_ms": latency_ms,
+                "checked_at": checked_at,
+                "age_seconds": round(time.time() - checked_at, 3) if checked_at else None,
+            },
+            "pool": self.pool_stats(),
+            "query_latency_p99_ms": round(p99 * 1000, 3) if p99 is not None else None,
+        }
+
+    async def _refresh_forever(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.check_database)
+            except Exception:
+                logger.exception("Health refresher crashed; retrying")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._refresh_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
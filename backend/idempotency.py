@@ -0,0 +1,202 @@
+"""
+Idempotency-Key support for create endpoints that clients retry.
+
+A write sent with an ``Idempotency-Key`` header stores its response in
+``idempotency_keys``, in the same transaction as the write itself. A retry
+with the same key (from the same user) within IDEMPOTENCY_TTL_SECONDS gets
+the stored response back after a single lookup, without validating or
+writing anything again. The key is bound to the endpoint and request body:
+reusing it for a different request is a 422.
+
+Two copies of a request racing each other both run, but the unique
+(user_id, key) index lets only one commit; the other rolls back and returns
+the winner's response. Only successful responses are stored, so a request
+that failed validation can be retried with the same key. Without the header
+an endpoint behaves exactly as before.
+"""
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional, Type
+
+from fastapi import HTTPException, status
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import get_settings
+import group_commit
+import models
+
+settings = get_settings()
+
+MAX_KEY_LENGTH = 255
+REPLAY_HEADER = "Idempotent-Replayed"
+
+_prune_lock = threading.Lock()
+_last_prune = 0.0
+
+
+class Idempotent:
+    """One write request, with or without an Idempotency-Key.
+
+    Call replay() before doing any work and return its response if there is
+    one; finish the write with commit() instead of ``db.commit()``, or hand
+    it to write() to go through the group-commit writer when enabled.
+    """
+
+    def __init__(self, db: Session, user: models.User, key: Optional[str], endpoint: str, payload: BaseModel):
+        self.db = db
+        self.key = key
+        # An expired row for the key, replaced when this request stores its response
+        self.expired_id: Optional[int] = None
+        if key is None:
+            return
+        if not key.strip() or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"
+            )
+        self.user_id = user.id
+        self.fingerprint = hashlib.sha256(f"{endpoint}\n{payload.model_dump_json()}".encode()).hexdigest()
+
+    def _stored(self, db: Optional[Session] = None) -> Optional[models.IdempotencyKey]:
+        return (db or self.db).query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.user_id == self.user_id,
+            models.IdempotencyKey.key == self.key
+        ).first()
+
+    def _replay(self, stored: models.IdempotencyKey) -> Response:
+        if stored.fingerprint != self.fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request"
+            )
+        return Response(
+            content=stored.response_body,
+            status_code=stored.status_code,
+            media_type="application/json",
+            headers={REPLAY_HEADER: "true"}
+        )
+
+    def replay(self) -> Optional[Response]:
+        """The stored response for this key, or None when the request should run."""
+        if self.key is None:
+            return None
+        stored = self._stored()
+        if stored is None:
+            return None
+        if stored.expires_at <= datetime.utcnow():
+            # Expired but not yet pruned; the key is free again. Nothing is
+            # written here: the row is replaced on the session that commits the
+            # write, which is the group-commit writer's when enabled
+            self.expired_id = stored.id
+            return None
+        return self._replay(stored)
+
+    def commit(self, result, schema: Type[BaseModel], status_code: int = status.HTTP_200_OK):
+        """Commit the write, storing ``result`` (serialized with ``schema``) under the key."""
+        if self.key is None:
+            self.db.commit()
+            self.db.refresh(result)
+            return result
+
+        body = self._store(self.db, result, schema, status_code)
+        try:
+            self.db.commit()
+        except IntegrityError as error:
+            # A concurrent copy of this request committed first; its response wins
+            self.db.rollback()
+            return self._lost_race(error)
+
+        _prune_if_due(self.db)
+        return Response(content=body, status_code=status_code, media_type="application/json")
+
+    def write(self, apply: Callable[[Session], Any], schema: Type[BaseModel], status_code: int = status.HTTP_200_OK):
+        """Run ``apply(session)``, which makes the write and returns the new row, then commit it.
+
+        With GROUP_COMMIT_ENABLED the write and the key are applied and
+        committed by the group-commit writer on its own session; otherwise
+        this is ``apply(db)`` followed by commit().
+        """
+        if not settings.GROUP_COMMIT_ENABLED:
+            result = apply(self.db)
+            self.db.flush()
+            return self.commit(result, schema, status_code)
+
+        if group_commit.holds_write_lock(self.db):
+            # The writer's transaction would wait on this one while we wait on the writer
+            raise RuntimeError("Commit the request session's own writes before handing a write to group commit")
+
+        def apply_and_store(db: Session):
+            if self.key is not None:
+                stored = self._stored(db)
+                if stored is not None and stored.expires_at > datetime.utcnow():
+                    # A copy of this request earlier in the same batch already ran
+                    return self._replay(stored)
+                if stored is not None:
+                    self.expired_id = stored.id
+            result = apply(db)
+            db.flush()
+            body = self._store(db, result, schema, status_code)
+            db.flush()
+            return body
+
+        try:
+            body = group_commit.writer.submit(apply_and_store)
+        except IntegrityError as error:
+            if self.key is None:
+                raise
+            # The writer only answers after committing, so the winner is visible by now
+            return self._lost_race(error)
+        if isinstance(body, Response):
+            return body
+        if self.key is not None:
+            _prune_if_due(self.db)
+        return Response(content=body, status_code=status_code, media_type="application/json")
+
+    def _store(self, db: Session, result, schema: Type[BaseModel], status_code: int) -> str:
+        """Serialize ``result`` and, with a key, add it to ``db`` for the pending commit."""
+        body = schema.model_validate(result).model_dump_json()
+        if self.key is None:
+            return body
+        if self.expired_id is not None:
+            db.execute(delete(models.IdempotencyKey).where(models.IdempotencyKey.id == self.expired_id))
+        now = datetime.utcnow()
+        db.add(models.IdempotencyKey(
+            user_id=self.user_id,
+            key=self.key,
+            fingerprint=self.fingerprint,
+            status_code=status_code,
+            response_body=body,
+            created_at=now,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+        ))
+        return body
+
+    def _lost_race(self, error: IntegrityError) -> Response:
+        stored = self._stored()
+        if stored is None:
+            raise error
+        return self._replay(stored)
+
+
+def _prune_if_due(db: Session):
+    global _last_prune
+    with _prune_lock:
+        if time.monotonic() - _last_prune < settings.IDEMPOTENCY_PRUNE_INTERVAL_SECONDS:
+            return
+        _last_prune = time.monotonic()
+    prune(db)
+
+
+def prune(db: Session) -> int:
+    """Delete expired keys; returns how many."""
+    removed = db.execute(
+        delete(models.IdempotencyKey).where(models.IdempotencyKey.expires_at <= datetime.utcnow())
+    ).rowcount
+    db.commit()
+    return removed
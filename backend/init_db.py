@@ -4,6 +4,7 @@ from models import (
     Announcement, ReportCard, SkillAssessment, FeeStructure, FeeRecord
 )
 from auth import get_password_hash
+import schema_sync
 from models import RoleEnum
 from datetime import date
 
@@ -22,6 +23,8 @@ def init_database(drop_existing=False):
 
     print("Creating database tables (if they don't exist)...")
     Base.metadata.create_all(bind=engine)
+    # Existing tables may predate columns added to the models since
+    schema_sync.add_missing_columns(engine)
     print("Database tables created successfully!")
 
 
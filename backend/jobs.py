@@ -0,0 +1,331 @@
+"""
+Persistent background jobs for long-running admin operations.
+
+Jobs are rows in the ``jobs`` table, so they survive restarts. A dispatcher
+thread claims due jobs with a conditional UPDATE (safe when several serve.py
+workers share the database) and runs them on a bounded thread pool. Handlers
+report progress through JobContext, which is also where cancellation and
+shutdown take effect. Failed jobs are retried with exponential backoff, and
+running jobs whose runner stopped heartbeating (crash, kill -9) are re-queued;
+handlers skip work that is already done, so a re-run resumes.
+"""
+import importlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import or_, and_, update
+from sqlalchemy.orm import sessionmaker
+
+from config import get_settings
+from database import engine
+import models
+
+logger = logging.getLogger(__name__)
+
+# Job kind -> "module:function" that runs it, imported on first use like ROUTE_MODULES
+JOB_HANDLERS = {
+    "report_cards.generate_term": "routes.report_card_routes:generate_term_report_cards_job",
+    "fees.generate_year": "routes.fee_routes:generate_year_fee_records_job",
+    "early_warning.score": "routes.early_warning_routes:score_students_job",
+}
+
+MAX_BACKOFF_SECONDS = 3600
+
+
+class JobCancelled(Exception):
+    """Raised from JobContext.progress() once a cancel was requested."""
+
+
+class JobInterrupted(Exception):
+    """Raised from JobContext.progress() while the runner is shutting down."""
+
+
+def _load_handler(kind: str):
+    module_name, _, attr = JOB_HANDLERS[kind].partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class JobContext:
+    """Handed to a job handler as its first argument."""
+
+    def __init__(self, runner: "JobRunner", job_id: int):
+        self.runner = runner
+        self.job_id = job_id
+        self.session_factory = runner.session_factory
+
+    def progress(self, current: int, total: Optional[int] = None, message: Optional[str] = None):
+        """Record progress and heartbeat; raises if the job should stop here."""
+        values = {"progress_current": current, "heartbeat_at": datetime.utcnow()}
+        if total is not None:
+            values["progress_total"] = total
+        if message is not None:
+            values["progress_message"] = message
+
+        db = self.session_factory()
+        try:
+            db.execute(update(models.Job).where(models.Job.id == self.job_id).values(**values))
+            cancel_requested = db.query(models.Job.cancel_requested).filter(
+                models.Job.id == self.job_id
+            ).scalar()
+            db.commit()
+        finally:
+            db.close()
+
+        if cancel_requested:
+            raise JobCancelled()
+        if self.runner.stopping:
+            raise JobInterrupted()
+
+
+class JobRunner:
+    def __init__(
+        self,
+        bind,
+        max_workers: int = 2,
+        poll_interval: float = 1.0,
+        retry_backoff: float = 10.0,
+        stale_after: float = 60.0
+    ):
+        self.bind = bind
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=bind)
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self.stale_after = stale_after
+        self._running = set()  # ids of jobs executing in this process
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        # Databases created before the job queue existed have no jobs table
+        models.Job.__table__.create(bind=self.bind, checkfirst=True)
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self._thread = threading.Thread(target=self._dispatch_forever, name="job-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop claiming work; running handlers are re-queued at their next progress() call."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        self._thread = None
+        self._executor = None
+
+    def wake(self):
+        self._wake.set()
+
+    def _dispatch_forever(self):
+        while not self._stop.is_set():
+            try:
+                self._heartbeat()
+                self._requeue_stale()
+                self._claim_due_jobs()
+            except Exception:
+                logger.exception("Job dispatcher iteration failed")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _heartbeat(self):
+        with self._lock:
+            job_ids = list(self._running)
+        if not job_ids:
+            return
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(models.Job).where(models.Job.id.in_(job_ids)).values(heartbeat_at=datetime.utcnow())
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _requeue_stale(self):
+        now = datetime.utcnow()
+        stale = and_(
+            models.Job.status == models.JobStatusEnum.running,
+            or_(
+                models.Job.heartbeat_at < now - timedelta(seconds=self.stale_after),
+                models.Job.heartbeat_at.is_(None)
+            )
+        )
+        db = self.session_factory()
+        try:
+            # An interrupted run still counts as an attempt, so a job that keeps
+            # killing its process eventually fails instead of looping forever
+            exhausted = db.execute(
+                update(models.Job).where(stale, models.Job.attempts >= models.Job.max_attempts).values(
+                    status=models.JobStatusEnum.failed,
+                    error="Interrupted too many times",
+                    finished_at=now
+                )
+            ).rowcount
+            resumed = db.execute(
+                update(models.Job).where(stale).values(
+                    status=models.JobStatusEnum.queued,
+                    run_after=now,
+                    progress_message="Resuming after interruption"
+                )
+            ).rowcount
+            db.commit()
+        finally:
+            db.close()
+        if exhausted or resumed:
+            logger.warning("Recovered interrupted jobs: %d re-queued, %d failed", resumed, exhausted)
+
+    def _claim_due_jobs(self):
+        with self._lock:
+            free_slots = self.max_workers - len(self._running)
+        if free_slots <= 0 or self._stop.is_set():
+            return
+
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            candidates = db.query(models.Job.id).filter(
+                models.Job.status == models.JobStatusEnum.queued,
+                models.Job.run_after <= now
+            ).order_by(models.Job.run_after, models.Job.id).limit(free_slots).all()
+
+            for (job_id,) in candidates:
+                # Only one process wins the queued -> running transition
+                claimed = db.execute(
+                    update(models.Job).where(
+                        models.Job.id == job_id,
+                        models.Job.status == models.JobStatusEnum.queued
+                    ).values(
+                        status=models.JobStatusEnum.running,
+                        attempts=models.Job.attempts + 1,
+                        started_at=now,
+                        heartbeat_at=now
+                    )
+                ).rowcount
+                db.commit()
+                if claimed:
+                    with self._lock:
+                        self._running.add(job_id)
+                    self._executor.submit(self._run, job_id)
+        finally:
+            db.close()
+
+    def _run(self, job_id: int):
+        try:
+            db = self.session_factory()
+            try:
+                job = db.get(models.Job, job_id)
+                kind, params = job.kind, dict(job.params or {})
+            finally:
+                db.close()
+
+            result = _load_handler(kind)(JobContext(self, job_id), **params)
+            self._finish(job_id, status=models.JobStatusEnum.succeeded, result=result, error=None,
+                         finished_at=datetime.utcnow())
+        except JobCancelled:
+            self._finish(job_id, status=models.JobStatusEnum.cancelled, finished_at=datetime.utcnow())
+        except JobInterrupted:
+            # Shutdown is not the job's fault: give the attempt back
+            self._finish(job_id, status=models.JobStatusEnum.queued, run_after=datetime.utcnow(),
+                         attempts=models.Job.attempts - 1, progress_message="Interrupted by shutdown")
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            self._fail_or_retry(job_id, e)
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+            self._wake.set()
+
+    def _finish(self, job_id: int, **values):
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(models.Job).where(
+                    models.Job.id == job_id,
+                    models.Job.status == models.JobStatusEnum.running
+                ).values(**values)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _fail_or_retry(self, job_id: int, error: Exception):
+        db = self.session_factory()
+        try:
+            job = db.get(models.Job, job_id)
+            now = datetime.utcnow()
+            job.error = f"{type(error).__name__}: {error}"
+            if job.attempts >= job.max_attempts:
+                job.status = models.JobStatusEnum.failed
+                job.finished_at = now
+            else:
+                delay = min(self.retry_backoff * 2 ** (job.attempts - 1), MAX_BACKOFF_SECONDS)
+                job.status = models.JobStatusEnum.queued
+                job.run_after = now + timedelta(seconds=delay)
+                job.progress_message = f"Retrying in {delay:.0f}s"
+            db.commit()
+        finally:
+            db.close()
+
+
+settings = get_settings()
+
+runner = JobRunner(
+    engine,
+    max_workers=settings.JOB_WORKERS,
+    poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+    retry_backoff=settings.JOB_RETRY_BACKOFF_SECONDS,
+    stale_after=settings.JOB_STALE_AFTER_SECONDS
+)
+
+
+def enqueue(db, kind: str, params: Optional[dict] = None, created_by: Optional[models.User] = None,
+            max_attempts: Optional[int] = None) -> models.Job:
+    """Persist a job and nudge the dispatcher; params must be JSON-serializable."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = models.Job(
+        kind=kind,
+        params=params or {},
+        status=models.JobStatusEnum.queued,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_after=datetime.utcnow(),
+        created_by_id=created_by.id if created_by else None
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    runner.wake()
+    return job
+
+
+def request_cancel(db, job_id: int) -> bool:
+    """Cancel a queued job now, or flag a running one; False if it already finished."""
+    cancelled = db.execute(
+        update(models.Job).where(
+            models.Job.id == job_id,
+            models.Job.status == models.JobStatusEnum.queued
+        ).values(status=models.JobStatusEnum.cancelled, cancel_requested=True, finished_at=datetime.utcnow())
+    ).rowcount
+    if not cancelled:
+        cancelled = db.execute(
+            update(models.Job).where(
+                models.Job.id == job_id,
+                models.Job.status == models.JobStatusEnum.running
+            ).values(cancel_requested=True)
+        ).rowcount
+    db.commit()
+    return bool(cancelled)
@@ -1,24 +1,70 @@
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routes import (
-    auth_routes,
-    student_routes,
-    teacher_routes,
-    course_routes,
-    enrollment_routes,
-    assignment_routes,
-    grade_routes,
-    attendance_routes,
-    announcement_routes,
-    dashboard_routes,
-    report_card_routes,
-    fee_routes
-)
+from fastapi.responses import JSONResponse, PlainTextResponse
+from config import get_settings
+from database import engine
+from health import HealthMonitor
+import admission
+import change_feed
+import grade_aggregates
+import group_commit
+import jobs
+import metrics
+import query_inspector
+import report_card_render
+import routes
+import schema_sync
+import seats
+
+settings = get_settings()
+
+health_monitor = HealthMonitor(engine, interval=settings.HEALTH_CHECK_INTERVAL_SECONDS)
+
+
+_database_prepared = False
+
+
+def prepare_database():
+    """Schema updates and backfills, once per process tree before serving.
+
+    serve.py runs this in the supervisor before forking, so workers inherit
+    the flag and never race each other on the same DDL. The single-process
+    server runs it from its lifespan.
+    """
+    global _database_prepared
+    if _database_prepared:
+        return
+    # Backfill needs to see the aggregates table missing, so it runs before sync
+    grade_aggregates.ensure_table(engine)
+    schema_sync.sync(engine)
+    seats.backfill(engine)
+    change_feed.prune(engine)
+    _database_prepared = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    prepare_database()
+    health_monitor.start()
+    if settings.JOBS_ENABLED:
+        jobs.runner.start()
+    yield
+    if settings.JOBS_ENABLED:
+        await asyncio.to_thread(jobs.runner.stop)
+    await asyncio.to_thread(group_commit.writer.stop)
+    await asyncio.to_thread(report_card_render.shutdown_pool)
+    await health_monitor.stop()
+
 
 app = FastAPI(
     title="Kastra Systems API",
     description="School Management System API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware configuration
@@ -37,19 +83,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Queue requests beyond what the threadpool and connection pool can serve at once
+app.add_middleware(admission.AdmissionMiddleware)
+
+# Routers are either mounted now or on the first request under their prefix
+if settings.LAZY_ROUTERS:
+    app.add_middleware(routes.LazyRouterLoader, fastapi_app=app)
+
+# Request metrics (latency, status codes, DB queries per route)
+if settings.METRICS_ENABLED:
+    metrics.instrument_engine(engine)
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Development/test mode: per-request statement counts and N+1 warnings
+if settings.QUERY_INSPECTOR_ENABLED:
+    query_inspector.instrument_engine(engine)
+    app.add_middleware(
+        query_inspector.QueryInspectorMiddleware,
+        repeat_threshold=settings.QUERY_INSPECTOR_REPEAT_THRESHOLD
+    )
+
 # Include all routers with /api prefix
-app.include_router(auth_routes.router, prefix="/api")
-app.include_router(student_routes.router, prefix="/api")
-app.include_router(teacher_routes.router, prefix="/api")
-app.include_router(course_routes.router, prefix="/api")
-app.include_router(enrollment_routes.router, prefix="/api")
-app.include_router(assignment_routes.router, prefix="/api")
-app.include_router(grade_routes.router, prefix="/api")
-app.include_router(attendance_routes.router, prefix="/api")
-app.include_router(announcement_routes.router, prefix="/api")
-app.include_router(dashboard_routes.router, prefix="/api")
-app.include_router(report_card_routes.router, prefix="/api")
-app.include_router(fee_routes.router, prefix="/api")
+if not settings.LAZY_ROUTERS:
+    routes.include_all_routers(app)
+
+
+def custom_openapi():
+    """Serve the schema precomputed by build_openapi.py when it exists."""
+    if app.openapi_schema is None:
+        if settings.OPENAPI_SCHEMA_PATH and os.path.exists(settings.OPENAPI_SCHEMA_PATH):
+            with open(settings.OPENAPI_SCHEMA_PATH) as f:
+                app.openapi_schema = json.load(f)
+        else:
+            routes.include_all_routers(app)
+            FastAPI.openapi(app)
+    return app.openapi_schema
+
+
+app.openapi = custom_openapi
 
 
 @app.get("/")
@@ -61,39 +132,47 @@ def root():
     }
 
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/health/live")
+def liveness():
+    """Process is up and serving; never touches the database."""
+    return {"status": "alive"}
+
+
+def _health_snapshot():
+    # Only blocks when the background refresher has not run yet (e.g. no lifespan)
+    if health_monitor.checked_at is None:
+        health_monitor.check_database()
+    return health_monitor.snapshot()
+
+
+@app.get("/health/ready")
+def readiness():
+    snapshot = _health_snapshot()
+    ready = snapshot["database"]["status"] == "online"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", **snapshot}
+    )
+
+
 @app.get("/health")
 def health_check():
-    from database import SessionLocal
-    from sqlalchemy import text
-
+    snapshot = _health_snapshot()
+    database = snapshot["database"]
     health_status = {
         "api": {
             "status": "online",
             "message": "API is running"
         },
-        "database": {
-            "status": "offline",
-            "message": "Database connection failed"
-        }
+        "database": database
     }
 
-    # Test database connection
-    try:
-        db = SessionLocal()
-        # Try to execute a simple query
-        db.execute(text("SELECT 1"))
-        db.close()
-
-        health_status["database"] = {
-            "status": "online",
-            "message": "Database is healthy"
-        }
-    except Exception as e:
-        health_status["database"] = {
-            "status": "offline",
-            "message": f"Database error: {str(e)}"
-        }
-
     # Determine overall status
     overall_healthy = all(
         component["status"] == "online"
@@ -102,7 +181,9 @@ def health_check():
 
     return {
         "status": "healthy" if overall_healthy else "unhealthy",
-        "components": health_status
+        "components": health_status,
+        "pool": snapshot["pool"],
+        "query_latency_p99_ms": snapshot["query_latency_p99_ms"]
     }
 
 
@@ -0,0 +1,295 @@
+"""
+In-process metrics exposed in the Prometheus text format at /metrics.
+
+Recording is a handful of dictionary updates under a lock, so the hot path
+stays cheap; the exposition text is only built when /metrics is scraped.
+"""
+import bisect
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [
+        '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in zip(labelnames, labelvalues)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{%s}" % ",".join(pairs) if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, labels: Tuple[str, ...] = ()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1.0, labels: Tuple[str, ...] = ()):
+        self.inc(-amount, labels)
+
+    def set(self, value: float, labels: Tuple[str, ...] = ()):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last slot is +Inf), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Tuple[str, ...] = ()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = [(labels, list(state[0]), state[1], state[2]) for labels, state in self._values.items()]
+
+        lines = []
+        for labels, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "kastra_http_requests_total",
+    "HTTP requests by method, route template and status code.",
+    ("method", "route", "status")
+))
+HTTP_LATENCY = registry.register(Histogram(
+    "kastra_http_request_duration_seconds",
+    "HTTP request latency by method and route template.",
+    ("method", "route")
+))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    "kastra_http_requests_in_flight",
+    "HTTP requests currently being served."
+))
+DB_QUERIES = registry.register(Counter(
+    "kastra_db_queries_total",
+    "SQL statements executed."
+))
+DB_QUERY_LATENCY = registry.register(Histogram(
+    "kastra_db_query_duration_seconds",
+    "SQL statement execution time.",
+    buckets=QUERY_BUCKETS
+))
+DB_QUERIES_PER_REQUEST = registry.register(Histogram(
+    "kastra_db_queries_per_request",
+    "SQL statements executed per HTTP request.",
+    ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS
+))
+DB_TIME_PER_REQUEST = registry.register(Histogram(
+    "kastra_db_time_per_request_seconds",
+    "Time spent executing SQL per HTTP request.",
+    ("method", "route"),
+    buckets=QUERY_BUCKETS + (2.5, 5.0)
+))
+POOL_CHECKOUT_WAIT = registry.register(Histogram(
+    "kastra_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool.",
+    buckets=QUERY_BUCKETS
+))
+GROUP_COMMIT_BATCH_SIZE = registry.register(Histogram(
+    "kastra_group_commit_batch_size",
+    "Writes applied per group-commit transaction.",
+    buckets=QUERY_COUNT_BUCKETS
+))
+CACHE_LOOKUPS = registry.register(Counter(
+    "kastra_cache_lookups_total",
+    "In-process cache lookups by cache and result (hit or miss).",
+    ("cache", "result")
+))
+
+
+# Most recent statement latencies, for a rolling p99 without a scrape
+RECENT_QUERY_LATENCIES = deque(maxlen=2048)
+_recent_lock = threading.Lock()
+
+
+def recent_query_latency_percentile(pct: float) -> Optional[float]:
+    """Percentile (seconds) over the most recent statements, or None if idle."""
+    with _recent_lock:
+        samples = sorted(RECENT_QUERY_LATENCIES)
+    if not samples:
+        return None
+    return samples[min(int(len(samples) * pct / 100.0), len(samples) - 1)]
+
+
+class RequestStats:
+    """Per-request accumulator filled in by the SQLAlchemy hooks."""
+
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# Set by the middleware; worker threads running sync endpoints inherit a copy
+# of the context, so they see (and mutate) the same RequestStats object.
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._kastra_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._kastra_query_start
+    DB_QUERIES.inc()
+    DB_QUERY_LATENCY.observe(elapsed)
+    with _recent_lock:
+        RECENT_QUERY_LATENCIES.append(elapsed)
+
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def instrument_engine(engine):
+    """Attach query counting and pool checkout timing to an engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    # The pool has no "before checkout" event, so time the call that blocks on
+    # it. This lives on the engine rather than the pool so it survives dispose().
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection():
+        start = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+    engine.raw_connection = timed_raw_connection
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and DB usage per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            current_request_stats.reset(token)
+
+            # Label by route template, never the raw path, to bound cardinality
+            route = scope.get("route")
+            route_label = getattr(route, "path", "unmatched")
+            method = scope["method"]
+
+            HTTP_REQUESTS.inc(labels=(method, route_label, str(status_code)))
+            HTTP_LATENCY.observe(elapsed, labels=(method, route_label))
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, labels=(method, route_label))
+            DB_TIME_PER_REQUEST.observe(stats.db_time, labels=(method, route_label))
+
+
+def render() -> str:
+    return registry.render()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Date, Float, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Date, Float, Enum, Boolean, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -30,6 +30,14 @@ class TermEnum(str, enum.Enum):
     summer = "summer"
 
 
+class JobStatusEnum(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+    cancelled = "cancelled"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -39,7 +47,9 @@ class User(Base):
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
     role = Column(Enum(RoleEnum), nullable=False)
+    announcements_read_at = Column(DateTime)  # Newer announcements count as unread
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     teacher = relationship("Teacher", back_populates="user", uselist=False)
@@ -54,6 +64,7 @@ class Teacher(Base):
     user_id = Column(Integer, ForeignKey("users.id"), unique=True)
     phone = Column(String)
     department = Column(String)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     user = relationship("User", back_populates="teacher")
@@ -73,7 +84,8 @@ class Student(Base):
     admission_date = Column(Date)
     guardian_name = Column(String)
     guardian_phone = Column(String)
-    guardian_email = Column(String)
+    guardian_email = Column(String)  # Contact details only; dashboard access goes through GuardianLink
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     user = relationship("User", back_populates="student")
@@ -84,6 +96,23 @@ class Student(Base):
     fee_records = relationship("FeeRecord", back_populates="student")
 
 
+class GuardianLink(Base):
+    """A user an admin has allowed to see a student's dashboard as their guardian"""
+    __tablename__ = "guardian_links"
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    created_by_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    user = relationship("User", foreign_keys=[user_id])
+
+    __table_args__ = (
+        Index("uq_guardian_links_student_user", "student_id", "user_id", unique=True),
+    )
+
+
 class Course(Base):
     __tablename__ = "courses"
 
@@ -93,13 +122,18 @@ class Course(Base):
     description = Column(Text)
     teacher_id = Column(Integer, ForeignKey("teachers.id"))
     credits = Column(Integer, default=3)
+    grading_scale = Column(JSON)  # [{"min_percentage", "letter", "points"}]; None = school default
+    capacity = Column(Integer)  # None = unlimited
+    enrolled_count = Column(Integer, default=0)  # Seat counter maintained by seats.py
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     teacher = relationship("Teacher", back_populates="courses")
     enrollments = relationship("Enrollment", back_populates="course")
     assignments = relationship("Assignment", back_populates="course")
     attendance_records = relationship("Attendance", back_populates="course")
+    grading_categories = relationship("GradingCategory", back_populates="course", cascade="all, delete-orphan")
 
 
 class Enrollment(Base):
@@ -107,44 +141,112 @@ class Enrollment(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"))
-    course_id = Column(Integer, ForeignKey("courses.id"))
+    course_id = Column(Integer, ForeignKey("courses.id"), index=True)
     enrolled_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     student = relationship("Student", back_populates="enrollments")
     course = relationship("Course", back_populates="enrollments")
 
+    __table_args__ = (
+        # Bulk enrollment relies on this to skip existing pairs
+        Index("uq_enrollments_student_course", "student_id", "course_id", unique=True),
+        # Change feed (change_feed.py) reads a course's rows changed since a cursor
+        Index("ix_enrollments_course_updated", "course_id", "updated_at"),
+    )
+
+
+class WaitlistEntry(Base):
+    __tablename__ = "waitlist_entries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    student = relationship("Student")
+    course = relationship("Course")
+
+    __table_args__ = (
+        Index("uq_waitlist_entries_student_course", "student_id", "course_id", unique=True),
+        # Promotion takes the oldest entry of a course
+        Index("ix_waitlist_entries_course_created", "course_id", "created_at"),
+    )
+
 
 class Assignment(Base):
     __tablename__ = "assignments"
 
     id = Column(Integer, primary_key=True, index=True)
-    course_id = Column(Integer, ForeignKey("courses.id"))
+    course_id = Column(Integer, ForeignKey("courses.id"), index=True)
     title = Column(String, nullable=False)
     description = Column(Text)
     due_date = Column(DateTime)
     max_points = Column(Float, default=100.0)
+    category = Column(String)  # Matches a GradingCategory name of the course
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     course = relationship("Course", back_populates="assignments")
     grades = relationship("Grade", back_populates="assignment")
 
+    __table_args__ = (
+        Index("ix_assignments_course_updated", "course_id", "updated_at"),
+    )
+
+
+class GradingCategory(Base):
+    __tablename__ = "grading_categories"
+
+    id = Column(Integer, primary_key=True, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False, index=True)
+    name = Column(String, nullable=False)
+    weight = Column(Float, nullable=False)
+    drop_lowest = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    course = relationship("Course", back_populates="grading_categories")
+
 
 class Grade(Base):
     __tablename__ = "grades"
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"))
-    assignment_id = Column(Integer, ForeignKey("assignments.id"))
+    assignment_id = Column(Integer, ForeignKey("assignments.id"), index=True)
     points_earned = Column(Float)
     feedback = Column(Text)
-    graded_at = Column(DateTime, default=datetime.utcnow)
+    graded_at = Column(DateTime, default=datetime.utcnow, index=True)  # Early-warning grade trends
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     student = relationship("Student", back_populates="grades")
     assignment = relationship("Assignment", back_populates="grades")
 
+    __table_args__ = (
+        Index("ix_grades_assignment_updated", "assignment_id", "updated_at"),
+        # Cached student dashboards check for changes since they were computed (dashboards.py)
+        Index("ix_grades_student_updated", "student_id", "updated_at"),
+    )
+
+
+class GradeAggregate(Base):
+    """Running grade totals per student and course, maintained by grade_aggregates.py"""
+    __tablename__ = "grade_aggregates"
+
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), primary_key=True, index=True)
+    points_earned_sum = Column(Float, nullable=False, default=0.0)
+    max_points_sum = Column(Float, nullable=False, default=0.0)
+    percentage_sum = Column(Float, nullable=False, default=0.0)  # Sum of per-grade percentages
+    graded_count = Column(Integer, nullable=False, default=0)
+    last_graded_at = Column(DateTime)
+
 
 class Attendance(Base):
     __tablename__ = "attendance"
@@ -155,11 +257,21 @@ class Attendance(Base):
     date = Column(Date, nullable=False)
     status = Column(Enum(AttendanceStatusEnum), nullable=False)
     notes = Column(Text)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     student = relationship("Student", back_populates="attendance_records")
     course = relationship("Course", back_populates="attendance_records")
 
+    __table_args__ = (
+        # Per-course "marked today?" checks on dashboards
+        Index("ix_attendance_course_date", "course_id", "date"),
+        Index("ix_attendance_course_updated", "course_id", "updated_at"),
+        Index("ix_attendance_student_updated", "student_id", "updated_at"),
+        # Covers the whole-school early-warning windows without touching the table
+        Index("ix_attendance_date_student_status", "date", "student_id", "status"),
+    )
+
 
 class Announcement(Base):
     __tablename__ = "announcements"
@@ -170,6 +282,7 @@ class Announcement(Base):
     target_audience = Column(String, default="all")
     created_by_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # Relationships
     created_by = relationship("User", back_populates="announcements")
@@ -204,6 +317,7 @@ class SkillAssessment(Base):
     report_card_id = Column(Integer, ForeignKey("report_cards.id"))
     skill_name = Column(String, nullable=False)
     score = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     report_card = relationship("ReportCard", back_populates="skill_assessments")
@@ -258,3 +372,88 @@ class FeeRecord(Base):
 
     # Relationships
     student = relationship("Student", back_populates="fee_records")
+
+    __table_args__ = (
+        # Bank statement reconciliation (fee_reconciliation.py) looks records up by both
+        Index("ix_fee_records_transaction_id", "transaction_id"),
+        Index("ix_fee_records_student_status", "student_id", "status"),
+    )
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False, index=True)
+    status = Column(Enum(JobStatusEnum), nullable=False, default=JobStatusEnum.queued)
+    params = Column(JSON, default=dict)
+    result = Column(JSON)
+    error = Column(Text)
+    progress_current = Column(Integer, default=0)
+    progress_total = Column(Integer)
+    progress_message = Column(String)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    cancel_requested = Column(Boolean, default=False)
+    run_after = Column(DateTime, default=datetime.utcnow)
+    heartbeat_at = Column(DateTime)
+    created_by_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        # The runner polls for due work with this
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+
+class SyncTombstone(Base):
+    """A deleted row, kept so offline clients learn about the delete (change_feed.py)"""
+    __tablename__ = "sync_tombstones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String, nullable=False)  # Key of the /api/sync "deleted" list
+    entity_id = Column(Integer, nullable=False)
+    course_id = Column(Integer)
+    student_id = Column(Integer, index=True)  # Set for student-owned rows
+    deleted_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        Index("ix_sync_tombstones_course_deleted", "course_id", "deleted_at"),
+    )
+
+
+class IdempotencyKey(Base):
+    """Stored response of a write sent with an Idempotency-Key header (idempotency.py)"""
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)  # Keys are per caller; no FK so users stay deletable
+    key = Column(String, nullable=False)
+    fingerprint = Column(String, nullable=False)  # Hash of endpoint and request body
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        Index("uq_idempotency_keys_user_key", "user_id", "key", unique=True),
+    )
+
+
+class StudentRiskScore(Base):
+    """Latest early-warning figures per student, rewritten by each early_warning.py run"""
+    __tablename__ = "student_risk_scores"
+
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+    score = Column(Float, nullable=False, index=True)  # 0-100, higher is more at risk
+    at_risk = Column(Boolean, nullable=False, default=False)
+    attendance_rate = Column(Float)  # Present or late, recent window; None without records
+    previous_attendance_rate = Column(Float)
+    grade_average = Column(Float)
+    grade_slope = Column(Float)  # Percentage points per week
+    recent_grades = Column(Integer, nullable=False, default=0)
+    computed_at = Column(DateTime, nullable=False)
+
+    student = relationship("Student")
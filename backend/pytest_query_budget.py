@@ -0,0 +1,84 @@
+"""
+pytest plugin that enforces the per-route SQL budgets declared in
+query_inspector.ROUTE_QUERY_BUDGETS.
+
+conftest.py loads it for the test suite (tests/test_query_budgets.py calls
+every budgeted route). Call routes through the ``query_budget`` fixture:
+
+    def test_student_attendance(client, query_budget, seed, admin_headers):
+        response = query_budget(client, "GET", f"/api/students/{seed.students[0]}/attendance",
+                                headers=admin_headers)
+        assert response.status_code == 200
+
+The call fails if the route has no declared budget, runs more statements
+than its budget, or repeats a statement (an N+1 loop). Only the request's own
+statements count, not background threads (see capture_queries). Seed more
+rows than --query-repeat-threshold so per-row lazy loads actually show up.
+"""
+import pytest
+from starlette.routing import Match
+
+from config import get_settings
+from database import SessionLocal, engine
+from query_inspector import ROUTE_QUERY_BUDGETS, capture_queries, raise_on_lazy_load
+import routes
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("query budget")
+    group.addoption(
+        "--raise-on-lazy-load",
+        action="store_true",
+        default=False,
+        help="Treat every relationship as lazy='raise' for the whole run."
+    )
+    group.addoption(
+        "--query-repeat-threshold",
+        type=int,
+        default=3,
+        help="Fail when one statement runs this many times in a request."
+    )
+
+
+def pytest_configure(config):
+    if config.getoption("--raise-on-lazy-load"):
+        raise_on_lazy_load(SessionLocal)
+
+
+def _route_template(app, method: str, path: str) -> str:
+    routes.include_all_routers(app)
+    scope = {"type": "http", "method": method, "path": path, "root_path": ""}
+    for route in app.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    pytest.fail(f"No route matches {method} {path}")
+
+
+@pytest.fixture
+def query_budget(request):
+    threshold = request.config.getoption("--query-repeat-threshold")
+    if not get_settings().METRICS_ENABLED:
+        pytest.fail("Query budgets need METRICS_ENABLED: statements are attributed through the request metrics")
+
+    def call(client, method: str, path: str, **kwargs):
+        template = _route_template(client.app, method, path)
+        budget = ROUTE_QUERY_BUDGETS.get((method, template))
+        if budget is None:
+            pytest.fail(f"No query budget declared for {method} {template}")
+
+        with capture_queries(engine) as log:
+            response = client.request(method, path, **kwargs)
+
+        assert log.count <= budget, (
+            f"{method} {template} ran {log.count} statements, budget is {budget}:\n"
+            + "\n".join(log.statements)
+        )
+        repeated = log.repeated(threshold)
+        assert not repeated, (
+            f"{method} {template} repeated statements (N+1?):\n"
+            + "\n".join(f"{count}x {statement}" for statement, count in repeated)
+        )
+        return response
+
+    return call
@@ -0,0 +1,249 @@
+"""
+Development/test-mode SQL inspection.
+
+Counts the statements each request executes and flags statements that are
+repeated with only their parameters changing - the signature of an N+1
+lazy-load loop. Enable with QUERY_INSPECTOR_ENABLED=true; never in production.
+"""
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import raiseload
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Declared per-route statement budgets, keyed by (method, route template).
+# Budgets cover authentication (one user lookup) and must not grow with the
+# number of rows returned; routes that need more should eager-load instead.
+ROUTE_QUERY_BUDGETS: Dict[Tuple[str, str], int] = {
+    ("POST", "/api/auth/register"): 5,
+    ("POST", "/api/auth/login"): 1,
+
+    ("GET", "/api/students"): 2,
+    ("GET", "/api/students/{student_id}"): 2,
+    ("POST", "/api/students"): 7,
+    ("PUT", "/api/students/{student_id}"): 7,
+    # Measured 27: the delete cascade loads and unlinks the child rows (11), and each course with
+    # a waitlist takes a promotion (7 in the seeded school, where the student holds one such seat)
+    ("DELETE", "/api/students/{student_id}"): 28,
+    ("GET", "/api/students/{student_id}/courses"): 3,
+    ("GET", "/api/students/{student_id}/grades"): 3,
+    ("GET", "/api/students/{student_id}/transcript"): 3,
+    ("GET", "/api/students/{student_id}/attendance"): 3,
+    ("GET", "/api/students/{student_id}/overview"): 8,
+    ("GET", "/api/students/{student_id}/guardians"): 3,
+    ("POST", "/api/students/{student_id}/guardians"): 7,
+    ("DELETE", "/api/students/{student_id}/guardians/{user_id}"): 2,
+
+    ("GET", "/api/teachers"): 2,
+    ("POST", "/api/teachers"): 7,
+    ("PUT", "/api/teachers/{teacher_id}"): 5,
+    ("DELETE", "/api/teachers/{teacher_id}"): 11,
+
+    ("GET", "/api/courses"): 2,
+    ("GET", "/api/courses/summary"): 3,
+    ("GET", "/api/courses/{course_id}"): 2,
+    ("POST", "/api/courses"): 5,
+    ("PUT", "/api/courses/{course_id}"): 5,
+    ("DELETE", "/api/courses/{course_id}"): 14,
+    ("GET", "/api/courses/{course_id}/assignments"): 3,
+    ("GET", "/api/courses/{course_id}/grading-policy"): 4,
+    ("PUT", "/api/courses/{course_id}/grading-policy"): 10,
+    ("GET", "/api/courses/{course_id}/gradebook"): 8,
+
+    ("POST", "/api/enrollments"): 7,
+    ("POST", "/api/enrollments/bulk"): 6,
+    # Includes handing the freed seat to the first waitlisted student
+    ("DELETE", "/api/enrollments/{enrollment_id}"): 13,
+    ("GET", "/api/enrollments/waitlist"): 2,
+    ("DELETE", "/api/enrollments/waitlist/{entry_id}"): 3,
+
+    ("GET", "/api/assignments"): 2,
+    ("POST", "/api/assignments"): 5,
+    # Changing max_points (or deleting) recomputes the affected grade aggregates
+    ("PUT", "/api/assignments/{assignment_id}"): 8,
+    ("DELETE", "/api/assignments/{assignment_id}"): 10,
+
+    # Idempotency-Key adds the key lookup and insert, and now and then an expired-key prune
+    ("POST", "/api/grades"): 11,
+    ("PUT", "/api/grades/{grade_id}"): 7,
+    ("DELETE", "/api/grades/{grade_id}"): 7,
+
+    ("POST", "/api/attendance"): 9,
+    ("GET", "/api/attendance"): 2,
+
+    ("GET", "/api/announcements"): 2,
+    ("POST", "/api/announcements"): 4,
+    ("POST", "/api/announcements/read"): 2,
+    ("DELETE", "/api/announcements/{announcement_id}"): 3,
+
+    ("GET", "/api/dashboard/stats"): 5,
+    ("GET", "/api/dashboard/teacher"): 7,
+    ("GET", "/api/dashboard/student"): 8,  # A stale cached dashboard costs its change check on top
+
+    ("GET", "/api/report-cards"): 3,
+    ("GET", "/api/report-cards/student/{student_id}"): 4,
+    ("GET", "/api/report-cards/archive"): 3,
+    ("GET", "/api/report-cards/{report_card_id}"): 4,
+    ("POST", "/api/report-cards"): 7,
+    ("PUT", "/api/report-cards/{report_card_id}"): 5,
+    ("DELETE", "/api/report-cards/{report_card_id}"): 5,
+    ("POST", "/api/report-cards/generate/{student_id}"): 10,
+    ("POST", "/api/report-cards/generate-term"): 3,
+    ("GET", "/api/early-warning"): 4,
+    ("POST", "/api/early-warning/refresh"): 3,
+
+    ("GET", "/api/fees/structures"): 2,
+    ("GET", "/api/fees/structures/{academic_year}/{grade_level}"): 2,
+    ("POST", "/api/fees/structures"): 4,
+    ("PUT", "/api/fees/structures/{structure_id}"): 4,
+    ("DELETE", "/api/fees/structures/{structure_id}"): 3,
+    ("GET", "/api/fees/records"): 2,
+    ("GET", "/api/fees/records/student/{student_id}"): 4,
+    ("GET", "/api/fees/records/{record_id}"): 3,
+    ("POST", "/api/fees/records"): 6,
+    ("PUT", "/api/fees/records/{record_id}"): 4,
+    ("DELETE", "/api/fees/records/{record_id}"): 4,
+    ("POST", "/api/fees/records/generate/{student_id}"): 8,
+    ("POST", "/api/fees/records/generate-year"): 3,
+    # Per FEE_RECONCILE_CHUNK_SIZE lines of the statement
+    ("POST", "/api/fees/records/reconcile"): 5,
+    ("GET", "/api/jobs"): 2,
+    ("GET", "/api/jobs/{job_id}"): 2,
+    ("POST", "/api/jobs/{job_id}/cancel"): 5,
+    # The batch itself only authenticates; each sub-request is checked against its own budget
+    ("POST", "/api/batch"): 1,
+    ("GET", "/api/sync"): 9,
+}
+
+
+class QueryLog:
+    """Statements executed during one request (or one captured block)."""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements run at least ``threshold`` times.
+
+        SQLAlchemy sends bound parameters separately, so the statement text of
+        a lazy load is identical for every row - counting text finds N+1s.
+        """
+        return [
+            (statement, count)
+            for statement, count in Counter(self.statements).most_common()
+            if count >= threshold
+        ]
+
+
+current_query_log: ContextVar[Optional[QueryLog]] = ContextVar("current_query_log", default=None)
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    log = current_query_log.get()
+    if log is not None:
+        log.statements.append(statement)
+
+
+def instrument_engine(engine):
+    event.listen(engine, "after_cursor_execute", _record_statement)
+
+
+@contextmanager
+def capture_queries(engine):
+    """Record the statements of the HTTP request served inside the block.
+
+    Statements are attributed through the request context that
+    metrics.MetricsMiddleware sets, which sync endpoints inherit on their
+    worker threads. SQL from background threads (job runner, health monitor,
+    group-commit writer) and from /api/batch sub-requests is left out. The
+    first request to run a statement in the block is the one recorded, so this
+    needs METRICS_ENABLED and one request at a time.
+    """
+    log = QueryLog()
+    request = None
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        nonlocal request
+        stats = metrics.current_request_stats.get()
+        if stats is None:
+            return
+        if request is None:
+            request = stats
+        if stats is request:
+            log.statements.append(statement)
+
+    event.listen(engine, "after_cursor_execute", record)
+    try:
+        yield log
+    finally:
+        event.remove(engine, "after_cursor_execute", record)
+
+
+def raise_on_lazy_load(session_factory):
+    """Make relationship lazy loads raise instead of emitting SQL.
+
+    Equivalent to declaring every relationship with ``lazy="raise"``: any
+    route that touches an unloaded relationship fails loudly and has to
+    eager-load it. Many-to-one lookups already in the identity map still work.
+    """
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def _apply_raiseload(orm_execute_state):
+        if (
+            orm_execute_state.is_select
+            and not orm_execute_state.is_column_load
+            and not orm_execute_state.is_relationship_load
+        ):
+            orm_execute_state.statement = orm_execute_state.statement.options(
+                raiseload("*", sql_only=True)
+            )
+
+    return _apply_raiseload
+
+
+class QueryInspectorMiddleware:
+    """Adds X-Query-Count to responses and logs repeated statements."""
+
+    def __init__(self, app, repeat_threshold: int = 3):
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog()
+        token = current_query_log.set(log)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(log.count).encode()))
+                repeated = log.repeated(self.repeat_threshold)
+                if repeated:
+                    headers.append((b"x-query-repeats", str(len(repeated)).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_log.reset(token)
+
+        for statement, count in log.repeated(self.repeat_threshold):
+            logger.warning(
+                "Possible N+1 on %s %s: statement ran %d times: %s",
+                scope["method"], scope["path"], count, statement
+            )
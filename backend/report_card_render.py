@@ -0,0 +1,213 @@
+"""
+Printable report card documents, rendered in a process pool.
+
+Rendering only takes plain dicts (see report_card_document()), so the pool
+workers need no session and open no database connections. They do still
+import code: each spawned worker unpickles render_html(), importing this
+module, and first re-imports the parent's ``__main__`` module as
+multiprocessing's spawn start method does. Under serve.py that is serve.py
+and config.py; when the server is started as ``python main.py`` it is the
+whole app, models and database engine included, so keep module-level code in
+the entry points free of side effects. Documents are self-contained HTML
+with print styles; browsers "Save as PDF" them 1:1.
+"""
+import atexit
+import html
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Below this many documents the pool's IPC costs more than it saves
+MIN_PARALLEL_BATCH = 8
+CHUNK_SIZE = 64
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Report Card - {name}</title>
+<style>
+  body {{ font-family: Georgia, serif; margin: 2cm; color: #222; }}
+  h1 {{ margin-bottom: 0; }}
+  .meta {{ color: #555; margin-top: 4px; }}
+  table {{ border-collapse: collapse; width: 100%; margin-top: 1em; }}
+  th, td {{ border: 1px solid #999; padding: 6px 10px; text-align: left; }}
+  th {{ background: #eee; }}
+  .remarks {{ margin-top: 1.5em; }}
+  @page {{ size: A4; margin: 1.5cm; }}
+  @media print {{ body {{ margin: 0; }} }}
+</style>
+</head>
+<body>
+<h1>Kastra Systems - Report Card</h1>
+<p class="meta">{name} &middot; Student ID {student_code} &middot; Grade {grade_level}<br>
+Academic year {academic_year} &middot; {term} term</p>
+<table>
+  <tr><th>GPA</th><td>{gpa}</td><th>Class rank</th><td>{class_rank}</td></tr>
+  <tr><th>Attendance</th><td>{attendance}</td><th>Conduct</th><td>{conduct_grade}</td></tr>
+</table>
+<table>
+  <tr><th>Skill</th><th>Score</th></tr>
+{skills}
+</table>
+<div class="remarks">
+  <h3>Teacher's remarks</h3>
+  <p>{teacher_remarks}</p>
+  <h3>Principal's remarks</h3>
+  <p>{principal_remarks}</p>
+</div>
+<p class="meta">Generated {generated_at}</p>
+</body>
+</html>
+"""
+
+
+def report_card_document(report_card) -> dict:
+    """Flatten a ReportCard (with student, user and skills loaded) into picklable data."""
+    student = report_card.student
+    return {
+        "id": report_card.id,
+        "first_name": student.user.first_name,
+        "last_name": student.user.last_name,
+        "student_code": student.student_id or str(student.id),
+        "grade_level": student.grade_level,
+        "academic_year": report_card.academic_year,
+        "term": report_card.term.value,
+        "gpa": report_card.gpa,
+        "class_rank": report_card.class_rank,
+        "total_students": report_card.total_students,
+        "attendance_percentage": report_card.attendance_percentage,
+        "conduct_grade": report_card.conduct_grade,
+        "teacher_remarks": report_card.teacher_remarks,
+        "principal_remarks": report_card.principal_remarks,
+        "generated_at": report_card.generated_at.isoformat() if report_card.generated_at else "",
+        "skills": [(skill.skill_name, skill.score) for skill in report_card.skill_assessments],
+    }
+
+
+def _text(value, fmt: str = "{}") -> str:
+    return "-" if value is None else html.escape(fmt.format(value))
+
+
+def document_filename(document: dict) -> str:
+    stem = f"{document['student_code']}_{document['last_name']}_{document['first_name']}"
+    return re.sub(r"[^A-Za-z0-9_.-]+", "-", stem) + ".html"
+
+
+def render_html(document: dict) -> Tuple[str, bytes]:
+    """Return (archive filename, HTML bytes) for one report card."""
+    rank = document["class_rank"]
+    if rank is not None and document["total_students"]:
+        rank = f"{rank} of {document['total_students']}"
+    skills = "\n".join(
+        f"  <tr><td>{_text(name)}</td><td>{_text(score, '{:.1f}')}</td></tr>"
+        for name, score in document["skills"]
+    )
+    page = TEMPLATE.format(
+        name=html.escape(f"{document['first_name']} {document['last_name']}"),
+        student_code=_text(document["student_code"]),
+        grade_level=_text(document["grade_level"]),
+        academic_year=_text(document["academic_year"]),
+        term=_text(document["term"].capitalize()),
+        gpa=_text(document["gpa"], "{:.2f}"),
+        class_rank=_text(rank),
+        attendance=_text(document["attendance_percentage"], "{:.1f}%"),
+        conduct_grade=_text(document["conduct_grade"]),
+        skills=skills,
+        teacher_remarks=_text(document["teacher_remarks"]),
+        principal_remarks=_text(document["principal_remarks"]),
+        generated_at=_text(document["generated_at"]),
+    )
+    return document_filename(document), page.encode("utf-8")
+
+
+def get_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Shared render pool, started on first use.
+
+    Uses the spawn start method: the server process is multi-threaded, and
+    forking it could copy a lock held by another thread into the child.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers or os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(shutdown_pool)
+
+
+def render_all(documents: List[dict], max_workers: Optional[int] = None) -> Iterator[Tuple[str, bytes]]:
+    """Render documents in order, at most two chunks in flight so results never pile up."""
+    if len(documents) < MIN_PARALLEL_BATCH:
+        yield from map(render_html, documents)
+        return
+
+    pool = get_pool(max_workers)
+    pending = None
+    for start in range(0, len(documents), CHUNK_SIZE):
+        # map() submits right away, so the next chunk renders while this one is zipped
+        results = pool.map(render_html, documents[start:start + CHUNK_SIZE], chunksize=8)
+        if pending is not None:
+            yield from pending
+        pending = results
+    if pending is not None:
+        yield from pending
+
+
+class _StreamBuffer:
+    """Write-only sink for ZipFile; the generator drains it after every member."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data: bytes) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def stream_zip(files: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """Yield a ZIP archive of ``files`` piece by piece.
+
+    The sink is not seekable, so zipfile writes data descriptors after each
+    member instead of patching headers; only one member is buffered at a time.
+    """
+    buffer = _StreamBuffer()
+    seen = {}
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in files:
+            # Two students with the same name and no student code must not collide
+            count = seen.get(name, 0)
+            seen[name] = count + 1
+            if count:
+                stem, dot, ext = name.rpartition(".")
+                name = f"{stem}-{count + 1}{dot}{ext}"
+            archive.writestr(name, data)
+            yield buffer.drain()
+    yield buffer.drain()
@@ -1 +1,74 @@
 # Routes package
+import importlib
+import threading
+
+# First path segment under /api -> module defining that router
+ROUTE_MODULES = {
+    "auth": "routes.auth_routes",
+    "students": "routes.student_routes",
+    "teachers": "routes.teacher_routes",
+    "courses": "routes.course_routes",
+    "enrollments": "routes.enrollment_routes",
+    "assignments": "routes.assignment_routes",
+    "grades": "routes.grade_routes",
+    "attendance": "routes.attendance_routes",
+    "announcements": "routes.announcement_routes",
+    "dashboard": "routes.dashboard_routes",
+    "report-cards": "routes.report_card_routes",
+    "fees": "routes.fee_routes",
+    "jobs": "routes.job_routes",
+    "batch": "routes.batch_routes",
+    "sync": "routes.sync_routes",
+    "early-warning": "routes.early_warning_routes",
+}
+
+API_PREFIX = "/api"
+
+_lock = threading.Lock()
+
+
+def loaded_routers(app) -> set:
+    if not hasattr(app.state, "loaded_routers"):
+        app.state.loaded_routers = set()
+    return app.state.loaded_routers
+
+
+def include_router(app, segment: str):
+    """Import the router for ``segment`` and mount it under /api (once per app)."""
+    loaded = loaded_routers(app)
+    if segment in loaded:
+        return
+    with _lock:
+        if segment in loaded:
+            return
+        module = importlib.import_module(ROUTE_MODULES[segment])
+        app.include_router(module.router, prefix=API_PREFIX)
+        loaded.add(segment)
+
+
+def include_all_routers(app):
+    for segment in ROUTE_MODULES:
+        include_router(app, segment)
+
+
+class LazyRouterLoader:
+    """ASGI middleware that mounts a router the first time its prefix is hit.
+
+    Keeps route modules (and the schemas, passlib and jose imports behind them)
+    off the cold-start path. Anything that needs the full route table, such as
+    the OpenAPI schema, should call include_all_routers() first.
+    """
+
+    def __init__(self, app, fastapi_app):
+        self.app = app
+        self.fastapi_app = fastapi_app
+        self.loaded = loaded_routers(fastapi_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and len(self.loaded) < len(ROUTE_MODULES):
+            path = scope["path"]
+            if path.startswith(API_PREFIX + "/"):
+                segment = path[len(API_PREFIX) + 1:].split("/", 1)[0]
+                if segment in ROUTE_MODULES:
+                    include_router(self.fastapi_app, segment)
+        await self.app(scope, receive, send)
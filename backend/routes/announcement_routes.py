@@ -1,7 +1,9 @@
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from typing import List
 from database import get_db
+import dashboards
 import models
 import schemas
 from auth import get_current_user, require_role
@@ -14,7 +16,9 @@ def get_all_announcements(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    announcements = db.query(models.Announcement).order_by(
+    announcements = db.query(models.Announcement).options(
+        joinedload(models.Announcement.created_by)
+    ).order_by(
         models.Announcement.created_at.desc()
     ).all()
 
@@ -50,6 +54,8 @@ def create_announcement(
     db.add(announcement)
     db.commit()
     db.refresh(announcement)
+    # Unread counts on student dashboards
+    dashboards.invalidate_all()
 
     # Return with created_by_name
     return {
@@ -63,6 +69,19 @@ def create_announcement(
     }
 
 
+@router.post("/read")
+def mark_announcements_read(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Count announcements up to now as read on the user's student dashboard"""
+    user_id = current_user.id
+    current_user.announcements_read_at = datetime.utcnow()
+    db.commit()
+    dashboards.invalidate_user(user_id)
+    return {"message": "Announcements marked as read"}
+
+
 @router.delete("/{announcement_id}")
 def delete_announcement(
     announcement_id: int,
@@ -87,4 +106,5 @@ def delete_announcement(
 
     db.delete(announcement)
     db.commit()
+    dashboards.invalidate_all()
     return {"message": "Announcement deleted successfully"}
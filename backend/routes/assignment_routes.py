@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional
 from database import get_db
+import fieldsets
+import grade_aggregates
 import models
 import schemas
 from auth import get_current_user, require_role
@@ -11,9 +13,16 @@ router = APIRouter(prefix="/assignments", tags=["Assignments"])
 
 @router.get("", response_model=List[schemas.AssignmentResponse])
 def get_all_assignments(
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
+    fieldset = fieldsets.parse(fields, schemas.AssignmentResponse)
+    if fieldset:
+        assignments = db.query(models.Assignment).options(
+            *fieldsets.load_options(models.Assignment, fieldset)
+        ).all()
+        return fieldsets.respond(assignments, schemas.AssignmentResponse, fieldset, many=True)
     assignments = db.query(models.Assignment).all()
     return assignments
 
@@ -50,7 +59,8 @@ def create_assignment(
         title=assignment_data.title,
         description=assignment_data.description,
         due_date=assignment_data.due_date,
-        max_points=assignment_data.max_points
+        max_points=assignment_data.max_points,
+        category=assignment_data.category
     )
     db.add(assignment)
     db.commit()
@@ -65,7 +75,7 @@ def update_assignment(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("admin", "teacher"))
 ):
-    assignment = db.query(models.Assignment).filter(
+    assignment = db.query(models.Assignment).options(joinedload(models.Assignment.course)).filter(
         models.Assignment.id == assignment_id
     ).first()
     if not assignment:
@@ -91,8 +101,16 @@ def update_assignment(
         assignment.description = assignment_data.description
     if assignment_data.due_date is not None:
         assignment.due_date = assignment_data.due_date
+    max_points_changed = (
+        assignment_data.max_points is not None and assignment_data.max_points != assignment.max_points
+    )
     if assignment_data.max_points is not None:
         assignment.max_points = assignment_data.max_points
+    if assignment_data.category is not None:
+        assignment.category = assignment_data.category
+
+    if max_points_changed:
+        grade_aggregates.assignment_changed(db, assignment.id, assignment.course_id)
 
     db.commit()
     db.refresh(assignment)
@@ -105,7 +123,7 @@ def delete_assignment(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("admin", "teacher"))
 ):
-    assignment = db.query(models.Assignment).filter(
+    assignment = db.query(models.Assignment).options(joinedload(models.Assignment.course)).filter(
         models.Assignment.id == assignment_id
     ).first()
     if not assignment:
@@ -125,6 +143,14 @@ def delete_assignment(
                 detail="Not authorized to delete this assignment"
             )
 
+    # Grades on a deleted assignment no longer count towards the course
+    student_ids = db.query(models.Grade.student_id).filter(
+        models.Grade.assignment_id == assignment.id,
+        models.Grade.student_id.isnot(None)
+    ).distinct().all()
+    course_id = assignment.course_id
     db.delete(assignment)
+    if course_id is not None:
+        grade_aggregates.recompute(db, [(student_id, course_id) for (student_id,) in student_ids])
     db.commit()
     return {"message": "Assignment deleted successfully"}
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import date
 from database import get_db
+import idempotency
 import models
 import schemas
 from auth import get_current_user, require_role
@@ -13,9 +14,15 @@ router = APIRouter(prefix="/attendance", tags=["Attendance"])
 @router.post("", response_model=schemas.AttendanceResponse)
 def mark_attendance(
     attendance_data: schemas.AttendanceCreate,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("admin", "teacher"))
 ):
+    idempotent = idempotency.Idempotent(db, current_user, idempotency_key, "POST /api/attendance", attendance_data)
+    replay = idempotent.replay()
+    if replay is not None:
+        return replay
+
     # Verify student exists
     student = db.query(models.Student).filter(
         models.Student.id == attendance_data.student_id
@@ -47,34 +54,33 @@ def mark_attendance(
                 detail="Not authorized to mark attendance for this course"
             )
 
-    # Check if attendance already exists
-    existing_attendance = db.query(models.Attendance).filter(
-        models.Attendance.student_id == attendance_data.student_id,
-        models.Attendance.course_id == attendance_data.course_id,
-        models.Attendance.date == attendance_data.date
-    ).first()
+    def save(session: Session) -> models.Attendance:
+        # Check if attendance already exists
+        attendance = session.query(models.Attendance).filter(
+            models.Attendance.student_id == attendance_data.student_id,
+            models.Attendance.course_id == attendance_data.course_id,
+            models.Attendance.date == attendance_data.date
+        ).first()
 
-    if existing_attendance:
-        # Update existing attendance
-        existing_attendance.status = attendance_data.status
-        existing_attendance.notes = attendance_data.notes
-        db.commit()
-        db.refresh(existing_attendance)
-        return existing_attendance
-    else:
-        # Create new attendance record
-        attendance = models.Attendance(
-            student_id=attendance_data.student_id,
-            course_id=attendance_data.course_id,
-            date=attendance_data.date,
-            status=attendance_data.status,
-            notes=attendance_data.notes
-        )
-        db.add(attendance)
-        db.commit()
-        db.refresh(attendance)
+        if attendance:
+            # Update existing attendance
+            attendance.status = attendance_data.status
+            attendance.notes = attendance_data.notes
+        else:
+            # Create new attendance record
+            attendance = models.Attendance(
+                student_id=attendance_data.student_id,
+                course_id=attendance_data.course_id,
+                date=attendance_data.date,
+                status=attendance_data.status,
+                notes=attendance_data.notes
+            )
+            session.add(attendance)
         return attendance
 
+    # On the group-commit writer's session when GROUP_COMMIT_ENABLED
+    return idempotent.write(save, schemas.AttendanceResponse)
+
 
 @router.get("", response_model=List[schemas.AttendanceResponse])
 def get_attendance_by_date(
@@ -0,0 +1,203 @@
+"""
+POST /api/batch: many API calls in one HTTP request.
+
+Sub-requests are dispatched in-process through the full ASGI app, middleware
+included, with the caller's Authorization header. The batch authenticates
+once and hands that user to every sub-request (auth.PRINCIPAL_SCOPE_KEY), so
+they skip token decoding and the user lookup.
+
+Sub-requests run in order. Consecutive GETs are independent reads and run
+concurrently, up to BATCH_MAX_CONCURRENCY at a time. Any other method waits
+for everything before it and holds back everything after it, so a read listed
+after a write sees the write. Sub-requests not started within
+BATCH_TIMEOUT_SECONDS get a 504, as do reads still running then; a write that
+has started always runs to completion.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import List
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.orm import Session
+
+import admission
+from auth import PRINCIPAL_SCOPE_KEY, get_current_user
+from config import get_settings
+from database import get_db
+import models
+import schemas
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+router = APIRouter(prefix="/batch", tags=["Batch"])
+
+ALLOWED_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+READ_METHODS = {"GET"}
+# Passed from the batch request to every sub-request
+FORWARDED_HEADERS = {b"authorization", b"accept-language", b"user-agent"}
+
+
+def _validate(sub_requests: List[schemas.BatchSubRequest]):
+    if len(sub_requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BATCH_MAX_REQUESTS} requests per batch"
+        )
+    for index, sub in enumerate(sub_requests):
+        if sub.method.upper() not in ALLOWED_METHODS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Request {index}: unsupported method {sub.method}"
+            )
+        path = urlsplit(sub.path).path
+        if not path.startswith("/api/"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Request {index}: path must start with /api/"
+            )
+        if path.rstrip("/") == "/api/batch":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Request {index}: batches cannot be nested"
+            )
+
+
+def _sub_scope(parent: dict, sub: schemas.BatchSubRequest, headers: list, principal: models.User) -> dict:
+    target = urlsplit(sub.path)
+    scope = {
+        "type": "http",
+        "asgi": parent.get("asgi", {"version": "3.0"}),
+        "http_version": parent.get("http_version", "1.1"),
+        "method": sub.method.upper(),
+        "scheme": parent.get("scheme", "http"),
+        "server": parent.get("server"),
+        "client": parent.get("client"),
+        "root_path": parent.get("root_path", ""),
+        "path": target.path,
+        "raw_path": target.path.encode(),
+        "query_string": target.query.encode(),
+        "headers": headers,
+        PRINCIPAL_SCOPE_KEY: principal,
+    }
+    if "state" in parent:
+        scope["state"] = dict(parent["state"])
+    return scope
+
+
+def _decode_body(headers: dict, body: bytes):
+    if not body:
+        return None
+    if headers.get("content-type", "").startswith("application/json"):
+        return json.loads(body)
+    return body.decode("utf-8", errors="replace")
+
+
+async def _dispatch(app, scope: dict, body: bytes) -> dict:
+    """Run one request through the ASGI app and collect its response."""
+    response_complete = asyncio.Event()
+    request_sent = False
+    status_code, raw_headers, chunks = None, [], []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Like a real client, only disconnect once the response is finished
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status_code, raw_headers
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            raw_headers = message.get("headers", [])
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_complete.set()
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # ServerErrorMiddleware has already sent a 500 when it re-raises
+        logger.exception("Batch sub-request %s %s failed", scope["method"], scope["path"])
+        if status_code is None:
+            return {"status": 500, "headers": {}, "body": {"detail": "Internal Server Error"}}
+    finally:
+        response_complete.set()
+
+    headers = {
+        name.decode("latin-1"): value.decode("latin-1")
+        for name, value in raw_headers if name.lower() != b"content-length"
+    }
+    return {"status": status_code or 500, "headers": headers, "body": _decode_body(headers, b"".join(chunks))}
+
+
+def _timed_out(started: bool) -> dict:
+    detail = "Batch time limit exceeded" + ("" if started else " before this request started")
+    return {"status": status.HTTP_504_GATEWAY_TIMEOUT, "headers": {}, "body": {"detail": detail}}
+
+
+@router.post("", response_model=schemas.BatchResponse)
+async def run_batch(
+    batch: schemas.BatchRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Run up to BATCH_MAX_REQUESTS API calls and return their responses in order"""
+    _validate(batch.requests)
+    # Sub-requests merge the user into their own sessions; it must not be tied to this one.
+    # Closing also hands the authentication query's connection back before they check out theirs.
+    db.expunge(current_user)
+    db.close()
+    # Holding no connection now; the sub-requests take admission slots of their own
+    admission.release(request.scope)
+
+    deadline = time.monotonic() + settings.BATCH_TIMEOUT_SECONDS
+    headers = [(name, value) for name, value in request.scope["headers"] if name in FORWARDED_HEADERS]
+    concurrency = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+    responses: List[dict] = [None] * len(batch.requests)
+
+    async def run(index: int, sub: schemas.BatchSubRequest):
+        is_read = sub.method.upper() in READ_METHODS
+        async with concurrency:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                responses[index] = {"id": sub.id, **_timed_out(started=False)}
+                return
+
+            body = b"" if sub.body is None else json.dumps(sub.body).encode()
+            sub_headers = headers + ([
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ] if sub.body is not None else [])
+            dispatch = _dispatch(request.app, _sub_scope(request.scope, sub, sub_headers, current_user), body)
+            if is_read:
+                try:
+                    result = await asyncio.wait_for(dispatch, remaining)
+                except asyncio.TimeoutError:
+                    result = _timed_out(started=True)
+            else:
+                result = await dispatch
+            responses[index] = {"id": sub.id, **result}
+
+    # Each sub-request is its own task so per-request context (metrics, query log) stays separate
+    index = 0
+    while index < len(batch.requests):
+        end = index + 1
+        if batch.requests[index].method.upper() in READ_METHODS:
+            while end < len(batch.requests) and batch.requests[end].method.upper() in READ_METHODS:
+                end += 1
+        await asyncio.gather(*(
+            asyncio.create_task(run(i, batch.requests[i])) for i in range(index, end)
+        ))
+        index = end
+
+    return {"responses": responses}
@@ -1,32 +1,114 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
 from database import get_db
+import fieldsets
+import grade_aggregates
+import grading_engine
 import models
 import schemas
+import seats
 from auth import get_current_user, require_role
 
 router = APIRouter(prefix="/courses", tags=["Courses"])
 
 
+def _check_capacity(capacity):
+    if capacity is not None and capacity < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Capacity cannot be negative"
+        )
+
+
 @router.get("", response_model=List[schemas.CourseResponse])
 def get_all_courses(
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
+    fieldset = fieldsets.parse(fields, schemas.CourseResponse)
+    if fieldset:
+        courses = db.query(models.Course).options(*fieldsets.load_options(models.Course, fieldset)).all()
+        return fieldsets.respond(courses, schemas.CourseResponse, fieldset, many=True)
     courses = db.query(models.Course).all()
     return courses
 
 
+@router.get("/summary", response_model=schemas.CourseSummaryPage)
+def get_course_summaries(
+    teacher_id: Optional[int] = None,
+    department: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Courses with enrollment and assignment counts and teacher name, a page at a time.
+
+    The counts come from grouped subqueries joined into the page query, so a
+    page is one statement however many courses it holds (plus one for the total).
+    """
+    enrolled = db.query(
+        models.Enrollment.course_id,
+        func.count(models.Enrollment.id).label("enrolled_count")
+    ).filter(models.Enrollment.student_id.isnot(None)).group_by(models.Enrollment.course_id).subquery()
+    assignments = db.query(
+        models.Assignment.course_id,
+        func.count(models.Assignment.id).label("assignment_count")
+    ).group_by(models.Assignment.course_id).subquery()
+
+    query = db.query(models.Course).outerjoin(
+        models.Teacher, models.Course.teacher_id == models.Teacher.id
+    )
+    if teacher_id is not None:
+        query = query.filter(models.Course.teacher_id == teacher_id)
+    if department is not None:
+        query = query.filter(models.Teacher.department == department)
+    total = query.count()
+
+    rows = query.outerjoin(
+        models.User, models.Teacher.user_id == models.User.id
+    ).outerjoin(
+        enrolled, enrolled.c.course_id == models.Course.id
+    ).outerjoin(
+        assignments, assignments.c.course_id == models.Course.id
+    ).add_columns(
+        func.coalesce(enrolled.c.enrolled_count, 0),
+        func.coalesce(assignments.c.assignment_count, 0),
+        models.User.first_name,
+        models.User.last_name,
+        models.Teacher.department
+    ).order_by(models.Course.id).offset(offset).limit(limit).all()
+
+    items = []
+    for course, enrolled_count, assignment_count, first_name, last_name, teacher_department in rows:
+        item = schemas.CourseSummary.model_validate(course)
+        item.enrolled_count = enrolled_count
+        item.assignment_count = assignment_count
+        item.teacher_name = f"{first_name} {last_name}" if first_name is not None else None
+        item.teacher_department = teacher_department
+        items.append(item)
+    return {"total": total, "limit": limit, "offset": offset, "items": items}
+
+
 @router.get("/{course_id}", response_model=schemas.CourseResponse)
 def get_course_by_id(
     course_id: int,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    course = db.query(models.Course).filter(models.Course.id == course_id).first()
+    fieldset = fieldsets.parse(fields, schemas.CourseResponse)
+    query = db.query(models.Course)
+    if fieldset:
+        query = query.options(*fieldsets.load_options(models.Course, fieldset))
+    course = query.filter(models.Course.id == course_id).first()
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+    if fieldset:
+        return fieldsets.respond(course, schemas.CourseResponse, fieldset)
     return course
 
 
@@ -55,13 +137,15 @@ def create_course(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Teacher not found"
         )
+    _check_capacity(course_data.capacity)
 
     course = models.Course(
         name=course_data.name,
         code=course_data.code,
         description=course_data.description,
         teacher_id=course_data.teacher_id,
-        credits=course_data.credits
+        credits=course_data.credits,
+        capacity=course_data.capacity
     )
     db.add(course)
     db.commit()
@@ -97,6 +181,12 @@ def update_course(
         course.teacher_id = course_data.teacher_id
     if course_data.credits is not None:
         course.credits = course_data.credits
+    if course_data.capacity is not None:
+        _check_capacity(course_data.capacity)
+        course.capacity = course_data.capacity
+        db.flush()
+        # A larger capacity opens seats for the waitlist
+        seats.promote_waitlist(db, course.id)
 
     db.commit()
     db.refresh(course)
@@ -114,6 +204,8 @@ def delete_course(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
 
     db.delete(course)
+    grade_aggregates.forget_course(db, course_id)
+    seats.forget_course(db, course_id)
     db.commit()
     return {"message": "Course deleted successfully"}
 
@@ -132,3 +224,124 @@ def get_course_assignments(
         models.Assignment.course_id == course_id
     ).all()
     return assignments
+
+
+def _course_with_categories(db: Session, course_id: int):
+    return db.query(models.Course).options(
+        selectinload(models.Course.grading_categories)
+    ).filter(models.Course.id == course_id).first()
+
+
+def _course_for_grading(db: Session, course_id: int, current_user: models.User) -> models.Course:
+    """Course lookup for grading endpoints: admins, or the teacher of the course."""
+    course = _course_with_categories(db, course_id)
+    if not course:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+
+    if current_user.role == models.RoleEnum.teacher:
+        teacher = db.query(models.Teacher).filter(
+            models.Teacher.user_id == current_user.id
+        ).first()
+        if not teacher or course.teacher_id != teacher.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to view grades for this course"
+            )
+    return course
+
+
+def _grading_policy(course: models.Course) -> dict:
+    return {
+        "course_id": course.id,
+        "categories": sorted(course.grading_categories, key=lambda category: category.id),
+        "grading_scale": course.grading_scale or grading_engine.DEFAULT_GRADING_SCALE,
+    }
+
+
+@router.get("/{course_id}/grading-policy", response_model=schemas.GradingPolicyResponse)
+def get_grading_policy(
+    course_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin", "teacher"))
+):
+    course = _course_for_grading(db, course_id, current_user)
+    return _grading_policy(course)
+
+
+@router.put("/{course_id}/grading-policy", response_model=schemas.GradingPolicyResponse)
+def update_grading_policy(
+    course_id: int,
+    policy: schemas.GradingPolicyUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin", "teacher"))
+):
+    """Replace the course's grading categories (and optionally its letter scale)."""
+    course = _course_for_grading(db, course_id, current_user)
+
+    names = [category.name.strip().lower() for category in policy.categories]
+    if any(not name for name in names) or len(set(names)) != len(names):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Category names must be non-empty and unique"
+        )
+    if any(category.weight <= 0 or category.drop_lowest < 0 for category in policy.categories):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Category weights must be positive and drop_lowest non-negative"
+        )
+    if policy.grading_scale is not None:
+        letters = [band.letter for band in policy.grading_scale]
+        if not policy.grading_scale or len(set(letters)) != len(letters):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Grading scale needs at least one band and unique letters"
+            )
+        course.grading_scale = [
+            band.model_dump() for band in sorted(
+                policy.grading_scale, key=lambda band: band.min_percentage, reverse=True
+            )
+        ]
+
+    # Weights are relative; they don't need to add up to 100
+    course.grading_categories = [
+        models.GradingCategory(
+            name=category.name.strip(),
+            weight=category.weight,
+            drop_lowest=category.drop_lowest
+        )
+        for category in policy.categories
+    ]
+    db.commit()
+    return _grading_policy(_course_with_categories(db, course_id))
+
+
+@router.get("/{course_id}/gradebook", response_model=schemas.CourseGradebookResponse)
+def get_course_gradebook(
+    course_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin", "teacher"))
+):
+    """Weighted final grades for every enrolled student, computed in one pass."""
+    course = _course_for_grading(db, course_id, current_user)
+    grades = grading_engine.load_course_grades(db, course)
+
+    names = {}
+    if len(grades.student_ids):
+        names = {
+            student_id: f"{first_name} {last_name}"
+            for student_id, first_name, last_name in db.query(
+                models.Student.id, models.User.first_name, models.User.last_name
+            ).join(models.User, models.Student.user_id == models.User.id).filter(
+                models.Student.id.in_(grades.student_ids.tolist())
+            )
+        }
+
+    return {
+        "course_id": course.id,
+        "course_name": course.name,
+        "categories": [vars(category) for category in grades.categories],
+        "grading_scale": course.grading_scale or grading_engine.DEFAULT_GRADING_SCALE,
+        "uncategorized_assignments": grades.uncategorized_assignments,
+        "class_average": grading_engine.class_average(grades),
+        "students": grading_engine.to_rows(grades, names),
+    }
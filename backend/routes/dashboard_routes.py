@@ -1,12 +1,31 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.orm import Session, joinedload
+from config import get_settings
 from database import get_db
+import cache
+import dashboards
+import fee_structures
 import models
 import schemas
-from auth import get_current_user
+from auth import get_current_user, require_role
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
+settings = get_settings()
+
+UPCOMING_ASSIGNMENTS = 10
+STUDENT_UPCOMING_DAYS = 14
+# Announcement audiences shown to students and guardians
+STUDENT_AUDIENCES = ("all", "students")
+
+# Every teacher opens their dashboard at the start of the day; caching each
+# one briefly turns that burst into one computation per teacher
+teacher_dashboards = cache.TTLCache(ttl=settings.TEACHER_DASHBOARD_TTL_SECONDS, maxsize=4096, name="teacher_dashboard")
+
 
 @router.get("/stats", response_model=schemas.DashboardStats)
 def get_dashboard_stats(
@@ -24,3 +43,276 @@ def get_dashboard_stats(
         "total_courses": total_courses,
         "total_enrollments": total_enrollments
     }
+
+
+@router.get("/teacher", response_model=schemas.TeacherDashboard)
+def get_teacher_dashboard(
+    teacher_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin", "teacher"))
+):
+    """Workload summary of a teacher's courses; teachers get their own, admins pass teacher_id.
+
+    Cached per teacher for TEACHER_DASHBOARD_TTL_SECONDS, so the figures can lag
+    the data by that long.
+    """
+    if current_user.role == models.RoleEnum.teacher:
+        teacher = db.query(models.Teacher).filter(
+            models.Teacher.user_id == current_user.id
+        ).first()
+        if not teacher:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Teacher profile not found")
+        if teacher_id is not None and teacher_id != teacher.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to view this dashboard"
+            )
+    else:
+        if teacher_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="teacher_id is required"
+            )
+        teacher = db.query(models.Teacher).filter(models.Teacher.id == teacher_id).first()
+        if not teacher:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Teacher not found")
+
+    return teacher_dashboards.get_or_set(teacher.id, lambda: _teacher_dashboard(db, teacher.id))
+
+
+def _teacher_dashboard(db: Session, teacher_id: int) -> schemas.TeacherDashboard:
+    """Build the dashboard from one grouped query per figure, whatever the number of courses."""
+    now = datetime.utcnow()
+    today = date.today()
+
+    course_ids = db.query(models.Course.id).filter(models.Course.teacher_id == teacher_id)
+    roster = db.query(
+        models.Enrollment.course_id,
+        func.count(models.Enrollment.id).label("student_count")
+    ).filter(
+        models.Enrollment.course_id.in_(course_ids),
+        models.Enrollment.student_id.isnot(None)
+    ).group_by(models.Enrollment.course_id).subquery()
+    courses = db.query(
+        models.Course.id, models.Course.name, models.Course.code, func.coalesce(roster.c.student_count, 0)
+    ).outerjoin(
+        roster, roster.c.course_id == models.Course.id
+    ).filter(models.Course.teacher_id == teacher_id).order_by(models.Course.id).all()
+
+    student_count, ungraded, marked, upcoming = 0, {}, {}, []
+    if courses:
+        ids = [course_id for course_id, _, _, _ in courses]
+        student_count = db.query(func.count(func.distinct(models.Enrollment.student_id))).filter(
+            models.Enrollment.course_id.in_(ids),
+            models.Enrollment.student_id.isnot(None)
+        ).scalar()
+
+        # Every (enrolled student, past-due assignment) pair without a grade
+        ungraded = dict(db.query(models.Assignment.course_id, func.count()).join(
+            models.Enrollment, models.Enrollment.course_id == models.Assignment.course_id
+        ).outerjoin(
+            models.Grade,
+            (models.Grade.assignment_id == models.Assignment.id)
+            & (models.Grade.student_id == models.Enrollment.student_id)
+        ).filter(
+            models.Assignment.course_id.in_(ids),
+            models.Assignment.due_date < now,
+            models.Enrollment.student_id.isnot(None),
+            models.Grade.id.is_(None)
+        ).group_by(models.Assignment.course_id).all())
+
+        marked = dict(db.query(
+            models.Attendance.course_id, func.count(func.distinct(models.Attendance.student_id))
+        ).filter(
+            models.Attendance.course_id.in_(ids),
+            models.Attendance.date == today
+        ).group_by(models.Attendance.course_id).all())
+
+        upcoming = db.query(
+            models.Assignment.id, models.Assignment.course_id, models.Assignment.title, models.Assignment.due_date
+        ).filter(
+            models.Assignment.course_id.in_(ids),
+            models.Assignment.due_date >= now
+        ).order_by(models.Assignment.due_date, models.Assignment.id).limit(UPCOMING_ASSIGNMENTS).all()
+
+    course_rows = [
+        schemas.TeacherDashboardCourse(
+            course_id=course_id,
+            course_name=name,
+            course_code=code,
+            student_count=enrolled,
+            ungraded_count=ungraded.get(course_id, 0),
+            attendance_marked_today=marked.get(course_id, 0),
+            attendance_complete=marked.get(course_id, 0) >= enrolled
+        )
+        for course_id, name, code, enrolled in courses
+    ]
+    return schemas.TeacherDashboard(
+        teacher_id=teacher_id,
+        generated_at=now,
+        student_count=student_count,
+        ungraded_count=sum(course.ungraded_count for course in course_rows),
+        courses_attendance_complete=sum(course.attendance_complete for course in course_rows),
+        course_count=len(course_rows),
+        upcoming_assignments=[
+            schemas.UpcomingAssignment(assignment_id=assignment_id, course_id=course_id, title=title, due_date=due_date)
+            for assignment_id, course_id, title, due_date in upcoming
+        ],
+        courses=course_rows
+    )
+
+
+@router.get("/student", response_model=schemas.StudentDashboard)
+def get_student_dashboard(
+    student_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Course averages, term attendance, upcoming work and fees of the caller's students.
+
+    Covers the caller's own student record and every student an admin has
+    linked the caller to as a guardian (GuardianLink). Admins pass student_id
+    to see one student's dashboard. Cached per user (see dashboards.py).
+    """
+    if current_user.role == models.RoleEnum.admin and student_id is not None:
+        students = db.query(models.Student).options(joinedload(models.Student.user)).filter(
+            models.Student.id == student_id
+        ).all()
+        if not students:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
+        return _student_dashboard(db, current_user, students)
+    if student_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can choose a student"
+        )
+
+    students = db.query(models.Student).options(joinedload(models.Student.user)).filter(or_(
+        models.Student.user_id == current_user.id,
+        models.Student.id.in_(select(models.GuardianLink.student_id).where(
+            models.GuardianLink.user_id == current_user.id
+        ))
+    )).order_by(models.Student.id).all()
+    if not students:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No students linked to this account")
+    return dashboards.cached(
+        db,
+        current_user,
+        [student.id for student in students],
+        lambda: _student_dashboard(db, current_user, students)
+    )
+
+
+def _term_start(today: date) -> date:
+    """Start of the current term; terms start on their fee due dates."""
+    starts = sorted(date(today.year, month, day) for _, _, month, day, _ in fee_structures.TERM_SPLIT)
+    past = [start for start in starts if start <= today]
+    return past[-1] if past else starts[-1].replace(year=today.year - 1)
+
+
+def _student_dashboard(db: Session, user: models.User, students: List[models.Student]) -> schemas.StudentDashboard:
+    """One grouped query per figure, however many students the user is linked to."""
+    now = datetime.utcnow()
+    today = date.today()
+    term_start = _term_start(today)
+    ids = [student.id for student in students]
+
+    courses = defaultdict(list)
+    for row in db.query(
+        models.Enrollment.student_id, models.Course.id, models.Course.name, models.Course.code,
+        models.GradeAggregate.percentage_sum, models.GradeAggregate.graded_count
+    ).join(
+        models.Course, models.Course.id == models.Enrollment.course_id
+    ).outerjoin(
+        models.GradeAggregate,
+        (models.GradeAggregate.student_id == models.Enrollment.student_id)
+        & (models.GradeAggregate.course_id == models.Enrollment.course_id)
+    ).filter(models.Enrollment.student_id.in_(ids)).order_by(models.Course.name):
+        student_id, course_id, name, code, percentage_sum, graded_count = row
+        courses[student_id].append(schemas.DashboardCourseAverage(
+            course_id=course_id,
+            course_name=name,
+            course_code=code,
+            average_percentage=round(percentage_sum / graded_count, 2) if graded_count else None,
+            graded_count=graded_count or 0
+        ))
+
+    attendance = defaultdict(lambda: {attendance_status.value: 0 for attendance_status in models.AttendanceStatusEnum})
+    for student_id, attendance_status, count in db.query(
+        models.Attendance.student_id, models.Attendance.status, func.count(models.Attendance.id)
+    ).filter(
+        models.Attendance.student_id.in_(ids),
+        models.Attendance.date >= term_start
+    ).group_by(models.Attendance.student_id, models.Attendance.status):
+        attendance[student_id][attendance_status.value] = count
+
+    # Due within STUDENT_UPCOMING_DAYS in an enrolled course, without a grade yet
+    upcoming = defaultdict(list)
+    for student_id, assignment_id, course_id, title, due_date in db.query(
+        models.Enrollment.student_id, models.Assignment.id, models.Assignment.course_id,
+        models.Assignment.title, models.Assignment.due_date
+    ).join(
+        models.Assignment, models.Assignment.course_id == models.Enrollment.course_id
+    ).outerjoin(
+        models.Grade,
+        (models.Grade.assignment_id == models.Assignment.id)
+        & (models.Grade.student_id == models.Enrollment.student_id)
+    ).filter(
+        models.Enrollment.student_id.in_(ids),
+        models.Assignment.due_date >= now,
+        models.Assignment.due_date < now + timedelta(days=STUDENT_UPCOMING_DAYS),
+        models.Grade.id.is_(None)
+    ).order_by(models.Assignment.due_date, models.Assignment.id):
+        if len(upcoming[student_id]) < UPCOMING_ASSIGNMENTS:
+            upcoming[student_id].append(schemas.UpcomingAssignment(
+                assignment_id=assignment_id, course_id=course_id, title=title, due_date=due_date
+            ))
+
+    fees = {
+        student_id: schemas.FeeBalance(
+            outstanding_balance=outstanding,
+            outstanding_records=outstanding_records,
+            overdue_balance=overdue,
+            next_due_date=next_due_date
+        )
+        for student_id, outstanding, outstanding_records, overdue, next_due_date in db.query(
+            models.FeeRecord.student_id,
+            func.coalesce(func.sum(models.FeeRecord.amount), 0.0),
+            func.count(models.FeeRecord.id),
+            func.coalesce(func.sum(case((models.FeeRecord.due_date < today, models.FeeRecord.amount), else_=0.0)), 0.0),
+            func.min(case((models.FeeRecord.due_date >= today, models.FeeRecord.due_date)))
+        ).filter(
+            models.FeeRecord.student_id.in_(ids),
+            models.FeeRecord.status != models.PaymentStatusEnum.paid
+        ).group_by(models.FeeRecord.student_id)
+    }
+
+    unread = db.query(func.count(models.Announcement.id)).filter(
+        models.Announcement.target_audience.in_(STUDENT_AUDIENCES)
+    )
+    if user.announcements_read_at is not None:
+        unread = unread.filter(models.Announcement.created_at > user.announcements_read_at)
+
+    entries = []
+    for student in students:
+        counts = attendance[student.id]
+        total = sum(counts.values())
+        entries.append(schemas.StudentDashboardEntry(
+            student_id=student.id,
+            student_name=f"{student.user.first_name} {student.user.last_name}",
+            grade_level=student.grade_level,
+            courses=courses[student.id],
+            attendance=schemas.AttendanceSummary(
+                total=total,
+                **counts,
+                attendance_percentage=round((counts["present"] + counts["late"]) / total * 100, 2) if total else None
+            ),
+            upcoming_assignments=upcoming[student.id],
+            fees=fees.get(student.id, schemas.FeeBalance())
+        ))
+    return schemas.StudentDashboard(
+        generated_at=now,
+        term_start=term_start,
+        unread_announcements=unread.scalar(),
+        students=entries
+    )
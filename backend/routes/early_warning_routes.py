@@ -0,0 +1,109 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import get_db
+import early_warning
+import jobs
+import models
+import schemas
+from auth import require_role
+
+router = APIRouter(prefix="/early-warning", tags=["Early Warning"])
+
+# ?sort= values -> column; ties are broken by student ID
+SORT_COLUMNS = {
+    "score": models.StudentRiskScore.score,
+    "attendance_rate": models.StudentRiskScore.attendance_rate,
+    "attendance_change": models.StudentRiskScore.attendance_rate - models.StudentRiskScore.previous_attendance_rate,
+    "grade_average": models.StudentRiskScore.grade_average,
+    "grade_slope": models.StudentRiskScore.grade_slope,
+    # Students without an account sort by their student ID, which is also the name they are listed under
+    "name": func.coalesce(models.User.last_name, models.Student.student_id),
+}
+
+
+@router.get("", response_model=schemas.StudentRiskPage)
+def get_risk_scores(
+    at_risk: Optional[bool] = None,
+    grade_level: Optional[int] = None,
+    sort: str = "score",
+    order: str = "desc",
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin", "teacher"))
+):
+    """Students by early-warning risk from the latest scoring run, a page at a time.
+
+    Teachers see the students enrolled in their courses. Students without
+    figures yet (created since the last run) are not listed.
+    """
+    if sort not in SORT_COLUMNS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"sort must be one of: {', '.join(SORT_COLUMNS)}"
+        )
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="order must be asc or desc")
+
+    query = db.query(models.StudentRiskScore).join(
+        models.Student, models.Student.id == models.StudentRiskScore.student_id
+    ).outerjoin(models.User, models.User.id == models.Student.user_id)
+    if current_user.role == models.RoleEnum.teacher:
+        teacher = db.query(models.Teacher).filter(models.Teacher.user_id == current_user.id).first()
+        if not teacher:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Teacher profile not found")
+        taught = db.query(models.Enrollment.student_id).join(
+            models.Course, models.Course.id == models.Enrollment.course_id
+        ).filter(models.Course.teacher_id == teacher.id)
+        query = query.filter(models.StudentRiskScore.student_id.in_(taught))
+    if at_risk is not None:
+        query = query.filter(models.StudentRiskScore.at_risk == at_risk)
+    if grade_level is not None:
+        query = query.filter(models.Student.grade_level == grade_level)
+    total = query.count()
+
+    column = SORT_COLUMNS[sort]
+    # Students without the figure go last either way
+    ordering = column.desc().nullslast() if order == "desc" else column.asc().nullslast()
+    rows = query.add_columns(
+        models.Student.student_id, models.Student.grade_level, models.User.first_name, models.User.last_name
+    ).order_by(ordering, models.StudentRiskScore.student_id).offset(offset).limit(limit).all()
+
+    items = [
+        schemas.StudentRiskResponse(
+            student_id=risk.student_id,
+            student_reference=reference,
+            student_name=f"{first_name} {last_name}" if last_name is not None else reference,
+            grade_level=level,
+            score=risk.score,
+            at_risk=risk.at_risk,
+            attendance_rate=risk.attendance_rate,
+            previous_attendance_rate=risk.previous_attendance_rate,
+            grade_average=risk.grade_average,
+            grade_slope=risk.grade_slope,
+            recent_grades=risk.recent_grades,
+            computed_at=risk.computed_at
+        )
+        for risk, reference, level, first_name, last_name in rows
+    ]
+    return {"total": total, "limit": limit, "offset": offset, "items": items}
+
+
+@router.post("/refresh", response_model=schemas.JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def refresh_risk_scores(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin"))
+):
+    """Queue a scoring run over every student; poll /api/jobs/{job_id}"""
+    return jobs.enqueue(db, "early_warning.score", created_by=current_user)
+
+
+def score_students_job(ctx):
+    """Job handler: a whole run is one transaction, so a retry simply starts over"""
+    db = ctx.session_factory()
+    try:
+        return early_warning.compute(db, progress=ctx.progress)
+    finally:
+        db.close()
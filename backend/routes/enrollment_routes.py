@@ -1,14 +1,29 @@
+from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from database import get_db
+import dashboards
 import models
 import schemas
+import seats
 from auth import get_current_user, require_role
 
 router = APIRouter(prefix="/enrollments", tags=["Enrollments"])
 
+MAX_BULK_ENROLLMENTS = 50_000
+# Pairs inserted (and committed) per statement, and IDs per validation query
+BULK_ENROLLMENT_CHUNK_SIZE = 1000
 
-@router.post("", response_model=schemas.EnrollmentResponse)
+
+@router.post(
+    "",
+    response_model=schemas.EnrollmentResponse,
+    responses={202: {"model": schemas.WaitlistEntryResponse, "description": "Course full; student waitlisted"}}
+)
 def enroll_student(
     enrollment_data: schemas.EnrollmentCreate,
     db: Session = Depends(get_db),
@@ -45,16 +60,137 @@ def enroll_student(
             detail="Student already enrolled in this course"
         )
 
-    enrollment = models.Enrollment(
-        student_id=enrollment_data.student_id,
-        course_id=enrollment_data.course_id
-    )
-    db.add(enrollment)
-    db.commit()
+    try:
+        # Seat check and claim are one conditional UPDATE, so a full course is never oversubscribed
+        enrollment = seats.enroll(db, enrollment_data.student_id, enrollment_data.course_id)
+        if enrollment is None:
+            entry = seats.join_waitlist(db, enrollment_data.student_id, enrollment_data.course_id)
+            # Built before the commit, which would expire the entry
+            waitlisted = _waitlist_response(db, entry)
+        db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent enrollment of the same pair
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Student already enrolled in this course"
+        )
+
+    if enrollment is None:
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=jsonable_encoder(waitlisted)
+        )
     db.refresh(enrollment)
     return enrollment
 
 
+def _waitlist_response(db: Session, entry: models.WaitlistEntry) -> schemas.WaitlistEntryResponse:
+    return schemas.WaitlistEntryResponse(
+        id=entry.id,
+        student_id=entry.student_id,
+        course_id=entry.course_id,
+        created_at=entry.created_at,
+        position=seats.waitlist_position(db, entry)
+    )
+
+
+def _chunks(items: list, size: int = BULK_ENROLLMENT_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _missing_detail(label: str, ids: list) -> str:
+    shown = ", ".join(str(i) for i in sorted(ids)[:20])
+    more = f" and {len(ids) - 20} more" if len(ids) > 20 else ""
+    return f"{label} not found: {shown}{more}"
+
+
+@router.post("/bulk", response_model=schemas.BulkEnrollmentResponse)
+def bulk_enroll(
+    bulk_data: schemas.BulkEnrollmentCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin", "teacher"))
+):
+    """Enroll many (student, course) pairs at once; pairs that already exist are skipped.
+
+    Every ID is validated up front, so an unknown student or course rejects the
+    whole request. Inserts are committed in chunks, so a failure part-way leaves
+    earlier chunks enrolled and the request can simply be retried.
+    """
+    if bulk_data.student_ids and bulk_data.course_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="course_id is required with student_ids"
+        )
+    requested = [(student_id, bulk_data.course_id) for student_id in bulk_data.student_ids]
+    requested += [(pair.student_id, pair.course_id) for pair in bulk_data.pairs]
+    if len(requested) > MAX_BULK_ENROLLMENTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BULK_ENROLLMENTS} enrollments per request"
+        )
+    pairs = list(dict.fromkeys(requested))
+
+    # Set-based validation: one query per chunk of distinct IDs instead of one per pair
+    student_ids = list({student_id for student_id, _ in pairs})
+    found_students = set()
+    for chunk in _chunks(student_ids):
+        found_students.update(
+            student_id for (student_id,) in db.query(models.Student.id).filter(models.Student.id.in_(chunk))
+        )
+    missing_students = set(student_ids) - found_students
+    if missing_students:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=_missing_detail("Students", list(missing_students))
+        )
+
+    course_ids = list({course_id for _, course_id in pairs})
+    course_teachers = {}
+    for chunk in _chunks(course_ids):
+        course_teachers.update(
+            db.query(models.Course.id, models.Course.teacher_id).filter(models.Course.id.in_(chunk)).all()
+        )
+    missing_courses = set(course_ids) - set(course_teachers)
+    if missing_courses:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=_missing_detail("Courses", list(missing_courses))
+        )
+
+    # Teachers may only fill their own courses
+    if current_user.role == models.RoleEnum.teacher:
+        teacher = db.query(models.Teacher).filter(
+            models.Teacher.user_id == current_user.id
+        ).first()
+        if not teacher or any(teacher_id != teacher.id for teacher_id in course_teachers.values()):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to enroll students in these courses"
+            )
+
+    # The unique (student_id, course_id) index makes existing pairs no-ops.
+    # Bulk placement is an administrative override of course capacity; the
+    # seat counters are recounted in the same transaction as each chunk.
+    statement = insert(models.Enrollment.__table__).prefix_with("OR IGNORE", dialect="sqlite")
+    enrolled = 0
+    for chunk in _chunks(pairs):
+        result = db.execute(statement, [
+            {"student_id": student_id, "course_id": course_id} for student_id, course_id in chunk
+        ])
+        enrolled += result.rowcount
+        dashboards.students_changed(db, [student_id for student_id, _ in chunk])
+        seats.recount(db, {course_id for _, course_id in chunk})
+        db.commit()
+
+    return {
+        "requested": len(pairs),
+        "enrolled": enrolled,
+        "already_enrolled": len(pairs) - enrolled,
+    }
+
+
 @router.delete("/{enrollment_id}")
 def unenroll_student(
     enrollment_id: int,
@@ -70,6 +206,50 @@ def unenroll_student(
             detail="Enrollment not found"
         )
 
-    db.delete(enrollment)
+    # Frees the seat and hands it to the front of the waitlist
+    promoted = seats.unenroll(db, enrollment)
+    db.commit()
+    return {
+        "message": "Student unenrolled successfully",
+        "promoted_student_ids": [promoted_enrollment.student_id for promoted_enrollment in promoted],
+    }
+
+
+@router.get("/waitlist", response_model=List[schemas.WaitlistEntryResponse])
+def get_waitlist(
+    course_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin", "teacher"))
+):
+    """A course's waitlist in promotion order."""
+    entries = db.query(models.WaitlistEntry).filter(
+        models.WaitlistEntry.course_id == course_id
+    ).order_by(models.WaitlistEntry.created_at, models.WaitlistEntry.id).all()
+    return [
+        schemas.WaitlistEntryResponse(
+            id=entry.id,
+            student_id=entry.student_id,
+            course_id=entry.course_id,
+            created_at=entry.created_at,
+            position=position
+        )
+        for position, entry in enumerate(entries, start=1)
+    ]
+
+
+@router.delete("/waitlist/{entry_id}")
+def leave_waitlist(
+    entry_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin", "teacher"))
+):
+    entry = db.query(models.WaitlistEntry).filter(models.WaitlistEntry.id == entry_id).first()
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Waitlist entry not found"
+        )
+
+    db.delete(entry)
     db.commit()
-    return {"message": "Student unenrolled successfully"}
+    return {"message": "Removed from waitlist"}
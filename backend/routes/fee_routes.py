@@ -1,14 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, UploadFile, status
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import exists, insert
+from typing import List, Optional
 from datetime import date, datetime
+from config import get_settings
 from database import get_db
+import dashboards
+import fee_reconciliation
+import fee_structures
+import fieldsets
+import idempotency
+import jobs
 import models
 import schemas
 from auth import get_current_user, require_role
 
 router = APIRouter(prefix="/fees", tags=["Fees"])
 
+settings = get_settings()
+
 
 # Fee Structure Routes
 @router.get("/structures", response_model=List[schemas.FeeStructureResponse])
@@ -21,18 +31,15 @@ def get_all_fee_structures(
     return structures
 
 
-@router.get("/structures/{academic_year}/{grade_level}", response_model=schemas.FeeStructureResponse)
+@router.get("/structures/{academic_year}/{grade_level}", response_model=schemas.FeeStructureDetail)
 def get_fee_structure(
     academic_year: str,
     grade_level: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    """Get fee structure for a specific academic year and grade level"""
-    structure = db.query(models.FeeStructure).filter(
-        models.FeeStructure.academic_year == academic_year,
-        models.FeeStructure.grade_level == grade_level
-    ).first()
+    """Get fee structure for a specific academic year and grade level, with its term split"""
+    structure = fee_structures.get(db, academic_year, grade_level)
 
     if not structure:
         raise HTTPException(
@@ -66,6 +73,7 @@ def create_fee_structure(
     db.add(structure)
     db.commit()
     db.refresh(structure)
+    fee_structures.invalidate(structure.academic_year, structure.grade_level)
     return structure
 
 
@@ -93,6 +101,7 @@ def update_fee_structure(
 
     db.commit()
     db.refresh(structure)
+    fee_structures.invalidate(structure.academic_year, structure.grade_level)
     return structure
 
 
@@ -113,18 +122,25 @@ def delete_fee_structure(
             detail="Fee structure not found"
         )
 
+    academic_year, grade_level = structure.academic_year, structure.grade_level
     db.delete(structure)
     db.commit()
+    fee_structures.invalidate(academic_year, grade_level)
     return {"message": "Fee structure deleted successfully"}
 
 
 # Fee Record Routes
 @router.get("/records", response_model=List[schemas.FeeRecordResponse])
 def get_all_fee_records(
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("admin"))
 ):
     """Get all fee records"""
+    fieldset = fieldsets.parse(fields, schemas.FeeRecordResponse)
+    if fieldset:
+        records = db.query(models.FeeRecord).options(*fieldsets.load_options(models.FeeRecord, fieldset)).all()
+        return fieldsets.respond(records, schemas.FeeRecordResponse, fieldset, many=True)
     records = db.query(models.FeeRecord).all()
     return records
 
@@ -165,11 +181,17 @@ def get_student_fee_records(
 @router.get("/records/{record_id}", response_model=schemas.FeeRecordResponse)
 def get_fee_record(
     record_id: int,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Get a specific fee record"""
-    record = db.query(models.FeeRecord).filter(
+    fieldset = fieldsets.parse(fields, schemas.FeeRecordResponse)
+    query = db.query(models.FeeRecord)
+    if fieldset:
+        # student_id is always loaded for the ownership check below
+        query = query.options(*fieldsets.load_options(models.FeeRecord, fieldset, always=[models.FeeRecord.student_id]))
+    record = query.filter(
         models.FeeRecord.id == record_id
     ).first()
 
@@ -190,16 +212,24 @@ def get_fee_record(
                 detail="Not authorized to view this fee record"
             )
 
+    if fieldset:
+        return fieldsets.respond(record, schemas.FeeRecordResponse, fieldset)
     return record
 
 
 @router.post("/records", response_model=schemas.FeeRecordResponse)
 def create_fee_record(
     record_data: schemas.FeeRecordCreate,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("admin"))
 ):
-    """Create a new fee record"""
+    """Create a new fee record; send an Idempotency-Key header to make retries safe"""
+    idempotent = idempotency.Idempotent(db, current_user, idempotency_key, "POST /api/fees/records", record_data)
+    replay = idempotent.replay()
+    if replay is not None:
+        return replay
+
     # Verify student exists
     student = db.query(models.Student).filter(
         models.Student.id == record_data.student_id
@@ -212,9 +242,21 @@ def create_fee_record(
 
     record = models.FeeRecord(**record_data.dict())
     db.add(record)
-    db.commit()
-    db.refresh(record)
-    return record
+    db.flush()
+    return idempotent.commit(record, schemas.FeeRecordResponse)
+
+
+@router.post("/records/reconcile", response_model=schemas.ReconciliationReport)
+def reconcile_bank_statement(
+    file: UploadFile = File(...),
+    payment_method: str = Form("bank_transfer"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin"))
+):
+    """Mark fee records paid from a bank statement CSV and report what matched"""
+    return fee_reconciliation.reconcile(
+        db, file.file, payment_method.strip() or "bank_transfer", settings.FEE_RECONCILE_CHUNK_SIZE
+    )
 
 
 @router.put("/records/{record_id}", response_model=schemas.FeeRecordResponse)
@@ -286,11 +328,9 @@ def generate_fee_records(
             detail="Student not found"
         )
 
-    # Get fee structure for student's grade level
-    structure = db.query(models.FeeStructure).filter(
-        models.FeeStructure.academic_year == academic_year,
-        models.FeeStructure.grade_level == student.grade_level
-    ).first()
+    # Get fee structure for student's grade level; the amounts get written, so
+    # read them from the database rather than this worker's cache
+    structure = fee_structures.load(db, academic_year, student.grade_level)
 
     if not structure:
         raise HTTPException(
@@ -310,45 +350,73 @@ def generate_fee_records(
             detail="Fee records already exist for this student and academic year"
         )
 
-    # Generate fee records for three terms
-    year = int(academic_year.split('-')[0])
-    terms = [
-        {
-            "term": models.TermEnum.fall,
-            "due_date": date(year, 8, 15),
-            "amount": structure.total_annual * 0.35
-        },
-        {
-            "term": models.TermEnum.spring,
-            "due_date": date(year + 1, 1, 15),
-            "amount": structure.total_annual * 0.35
-        },
-        {
-            "term": models.TermEnum.summer,
-            "due_date": date(year + 1, 5, 15),
-            "amount": structure.total_annual * 0.30
-        }
-    ]
-
-    created_records = []
-    for term_data in terms:
-        record = models.FeeRecord(
-            student_id=student_id,
-            academic_year=academic_year,
-            term=term_data["term"],
-            amount=round(term_data["amount"], 2),
-            due_date=term_data["due_date"],
-            status=models.PaymentStatusEnum.unpaid
-        )
-        db.add(record)
-        created_records.append(record)
-
+    created_records = fee_structures.fee_record_rows(structure, student_id)
+    db.execute(insert(models.FeeRecord), created_records)
+    dashboards.students_changed(db, [student_id])
     db.commit()
-    for record in created_records:
-        db.refresh(record)
 
     return {
         "message": "Fee records generated successfully",
         "records_count": len(created_records),
         "total_amount": structure.total_annual
     }
+
+
+@router.post("/records/generate-year", response_model=schemas.JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def generate_year_fee_records(
+    academic_year: str,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin"))
+):
+    """Queue fee record generation for every student in an academic year; poll /api/jobs/{job_id}"""
+    return jobs.enqueue(db, "fees.generate_year", {"academic_year": academic_year}, created_by=current_user)
+
+
+FEE_JOB_BATCH_SIZE = 500
+
+
+def generate_year_fee_records_job(ctx, academic_year: str):
+    """Job handler: students that already have records for the year are skipped, so re-runs resume"""
+    db = ctx.session_factory()
+    try:
+        structures = {
+            structure.grade_level: fee_structures.detail(structure)
+            for structure in db.query(models.FeeStructure).filter(
+                models.FeeStructure.academic_year == academic_year
+            )
+        }
+        has_records = exists().where(
+            models.FeeRecord.student_id == models.Student.id,
+            models.FeeRecord.academic_year == academic_year
+        )
+        students = db.query(models.Student.id, models.Student.grade_level).filter(
+            ~has_records
+        ).order_by(models.Student.id).all()
+
+        total = len(students)
+        records_created = 0
+        skipped = 0
+        ctx.progress(0, total, f"Generating fee records for {total} students")
+        for start in range(0, total, FEE_JOB_BATCH_SIZE):
+            rows = []
+            for student_id, grade_level in students[start:start + FEE_JOB_BATCH_SIZE]:
+                structure = structures.get(grade_level)
+                if structure is None:
+                    skipped += 1
+                    continue
+                rows.extend(fee_structures.fee_record_rows(structure, student_id))
+            if rows:
+                db.execute(insert(models.FeeRecord), rows)
+                dashboards.students_changed(db, {row["student_id"] for row in rows})
+            db.commit()
+            records_created += len(rows)
+            done = min(start + FEE_JOB_BATCH_SIZE, total)
+            ctx.progress(done, total, f"Processed {done} of {total} students")
+
+        return {
+            "academic_year": academic_year,
+            "records_created": records_created,
+            "students_without_fee_structure": skipped
+        }
+    finally:
+        db.close()
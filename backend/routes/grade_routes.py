@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy.orm import Session, joinedload
+from typing import Optional
 from database import get_db
+import grade_aggregates
+import idempotency
 import models
 import schemas
 from auth import get_current_user, require_role
@@ -11,9 +14,15 @@ router = APIRouter(prefix="/grades", tags=["Grades"])
 @router.post("", response_model=schemas.GradeResponse)
 def add_grade(
     grade_data: schemas.GradeCreate,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("admin", "teacher"))
 ):
+    idempotent = idempotency.Idempotent(db, current_user, idempotency_key, "POST /api/grades", grade_data)
+    replay = idempotent.replay()
+    if replay is not None:
+        return replay
+
     # Verify student exists
     student = db.query(models.Student).filter(
         models.Student.id == grade_data.student_id
@@ -25,7 +34,7 @@ def add_grade(
         )
 
     # Verify assignment exists
-    assignment = db.query(models.Assignment).filter(
+    assignment = db.query(models.Assignment).options(joinedload(models.Assignment.course)).filter(
         models.Assignment.id == grade_data.assignment_id
     ).first()
     if not assignment:
@@ -45,27 +54,31 @@ def add_grade(
                 detail="Not authorized to grade this assignment"
             )
 
-    # Check if grade already exists for this student and assignment
-    existing_grade = db.query(models.Grade).filter(
-        models.Grade.student_id == grade_data.student_id,
-        models.Grade.assignment_id == grade_data.assignment_id
-    ).first()
-    if existing_grade:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Grade already exists for this student and assignment"
+    def save(session: Session) -> models.Grade:
+        # Check if grade already exists for this student and assignment
+        existing_grade = session.query(models.Grade).filter(
+            models.Grade.student_id == grade_data.student_id,
+            models.Grade.assignment_id == grade_data.assignment_id
+        ).first()
+        if existing_grade:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Grade already exists for this student and assignment"
+            )
+
+        grade = models.Grade(
+            student_id=grade_data.student_id,
+            assignment_id=grade_data.assignment_id,
+            points_earned=grade_data.points_earned,
+            feedback=grade_data.feedback
         )
+        session.add(grade)
+        session.flush()
+        grade_aggregates.grade_added(session, grade, assignment)
+        return grade
 
-    grade = models.Grade(
-        student_id=grade_data.student_id,
-        assignment_id=grade_data.assignment_id,
-        points_earned=grade_data.points_earned,
-        feedback=grade_data.feedback
-    )
-    db.add(grade)
-    db.commit()
-    db.refresh(grade)
-    return grade
+    # On the group-commit writer's session when GROUP_COMMIT_ENABLED
+    return idempotent.write(save, schemas.GradeResponse)
 
 
 @router.put("/{grade_id}", response_model=schemas.GradeResponse)
@@ -75,7 +88,9 @@ def update_grade(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("admin", "teacher"))
 ):
-    grade = db.query(models.Grade).filter(models.Grade.id == grade_id).first()
+    grade = db.query(models.Grade).options(
+        joinedload(models.Grade.assignment).joinedload(models.Assignment.course)
+    ).filter(models.Grade.id == grade_id).first()
     if not grade:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -93,11 +108,15 @@ def update_grade(
                 detail="Not authorized to update this grade"
             )
 
+    old_points = grade.points_earned
     if grade_data.points_earned is not None:
         grade.points_earned = grade_data.points_earned
     if grade_data.feedback is not None:
         grade.feedback = grade_data.feedback
 
+    if grade.assignment is not None:
+        grade_aggregates.grade_points_changed(db, grade, grade.assignment, old_points)
+
     db.commit()
     db.refresh(grade)
     return grade
@@ -109,7 +128,9 @@ def delete_grade(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("admin", "teacher"))
 ):
-    grade = db.query(models.Grade).filter(models.Grade.id == grade_id).first()
+    grade = db.query(models.Grade).options(
+        joinedload(models.Grade.assignment).joinedload(models.Assignment.course)
+    ).filter(models.Grade.id == grade_id).first()
     if not grade:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -127,6 +148,8 @@ def delete_grade(
                 detail="Not authorized to delete this grade"
             )
 
+    course_id = grade.assignment.course_id if grade.assignment is not None else None
     db.delete(grade)
+    grade_aggregates.grade_removed(db, grade.student_id, course_id)
     db.commit()
     return {"message": "Grade deleted successfully"}
@@ -1,22 +1,37 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, contains_eager, selectinload
+from sqlalchemy import exists, func, insert
+from typing import List, Optional
+from config import get_settings
 from database import get_db
+import fieldsets
+import grade_aggregates
+import jobs
 import models
+import report_card_render
 import schemas
 from auth import get_current_user, require_role
 
+settings = get_settings()
+
 router = APIRouter(prefix="/report-cards", tags=["Report Cards"])
 
 
 @router.get("", response_model=List[schemas.ReportCardResponse])
 def get_all_report_cards(
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("admin", "teacher"))
 ):
     """Get all report cards"""
-    report_cards = db.query(models.ReportCard).all()
+    fieldset = fieldsets.parse(fields, schemas.ReportCardResponse)
+    options = fieldsets.load_options(models.ReportCard, fieldset) if fieldset else [
+        selectinload(models.ReportCard.skill_assessments)
+    ]
+    report_cards = db.query(models.ReportCard).options(*options).all()
+    if fieldset:
+        return fieldsets.respond(report_cards, schemas.ReportCardResponse, fieldset, many=True)
     return report_cards
 
 
@@ -46,21 +61,73 @@ def get_student_report_cards(
                 detail="Not authorized to view this student's report cards"
             )
 
-    report_cards = db.query(models.ReportCard).filter(
+    report_cards = db.query(models.ReportCard).options(
+        selectinload(models.ReportCard.skill_assessments)
+    ).filter(
         models.ReportCard.student_id == student_id
     ).order_by(models.ReportCard.generated_at.desc()).all()
 
     return report_cards
 
 
+@router.get("/archive")
+def download_report_card_archive(
+    academic_year: str,
+    term: models.TermEnum,
+    grade_level: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin", "teacher"))
+):
+    """Download every report card for a term (optionally one grade level) as a ZIP of printable HTML"""
+    query = db.query(models.ReportCard).join(models.ReportCard.student).join(models.Student.user).options(
+        contains_eager(models.ReportCard.student).contains_eager(models.Student.user),
+        selectinload(models.ReportCard.skill_assessments)
+    ).filter(
+        models.ReportCard.academic_year == academic_year,
+        models.ReportCard.term == term
+    )
+    if grade_level is not None:
+        query = query.filter(models.Student.grade_level == grade_level)
+    report_cards = query.order_by(
+        models.Student.grade_level, models.User.last_name, models.User.first_name
+    ).all()
+
+    if not report_cards:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No report cards found for this academic year and term"
+        )
+
+    # Plain data only: rendering happens after the session is closed, in other processes
+    documents = [report_card_render.report_card_document(report_card) for report_card in report_cards]
+    archive = report_card_render.stream_zip(
+        report_card_render.render_all(documents, max_workers=settings.REPORT_RENDER_WORKERS or None)
+    )
+
+    filename = f"report-cards_{academic_year}_{term.value}"
+    if grade_level is not None:
+        filename += f"_grade-{grade_level}"
+    return StreamingResponse(
+        archive,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.zip"'}
+    )
+
+
 @router.get("/{report_card_id}", response_model=schemas.ReportCardResponse)
 def get_report_card(
     report_card_id: int,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Get a specific report card by ID"""
-    report_card = db.query(models.ReportCard).filter(
+    fieldset = fieldsets.parse(fields, schemas.ReportCardResponse)
+    # student_id is always loaded for the ownership check below
+    options = fieldsets.load_options(
+        models.ReportCard, fieldset, always=[models.ReportCard.student_id]
+    ) if fieldset else [selectinload(models.ReportCard.skill_assessments)]
+    report_card = db.query(models.ReportCard).options(*options).filter(
         models.ReportCard.id == report_card_id
     ).first()
 
@@ -81,6 +148,8 @@ def get_report_card(
                 detail="Not authorized to view this report card"
             )
 
+    if fieldset:
+        return fieldsets.respond(report_card, schemas.ReportCardResponse, fieldset)
     return report_card
 
 
@@ -131,14 +200,16 @@ def create_report_card(
     db.add(report_card)
     db.flush()  # Get the report_card.id
 
-    # Add skill assessments
-    for skill_data in report_card_data.skill_assessments:
-        skill = models.SkillAssessment(
-            report_card_id=report_card.id,
-            skill_name=skill_data.skill_name,
-            score=skill_data.score
-        )
-        db.add(skill)
+    # Add skill assessments in a single executemany
+    if report_card_data.skill_assessments:
+        db.execute(insert(models.SkillAssessment), [
+            {
+                "report_card_id": report_card.id,
+                "skill_name": skill_data.skill_name,
+                "score": skill_data.score
+            }
+            for skill_data in report_card_data.skill_assessments
+        ])
 
     db.commit()
     db.refresh(report_card)
@@ -206,47 +277,16 @@ def delete_report_card(
     return {"message": "Report card deleted successfully"}
 
 
-@router.post("/generate/{student_id}", response_model=schemas.ReportCardResponse)
-def generate_report_card(
-    student_id: int,
-    academic_year: str,
-    term: models.TermEnum,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_role("admin", "teacher"))
-):
-    """Auto-generate a report card for a student based on their grades and attendance"""
-    # Verify student exists
-    student = db.query(models.Student).filter(models.Student.id == student_id).first()
-    if not student:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Student not found"
-        )
+def _build_report_card(db: Session, student_id: int, academic_year: str, term: models.TermEnum) -> models.ReportCard:
+    """Add (without committing) a report card computed from grades and attendance"""
+    # Calculate GPA from the per-course grade aggregates
+    total_percentage, graded_count = grade_aggregates.student_totals(db, student_id)
 
-    # Calculate GPA from grades
-    grades = db.query(models.Grade).join(models.Assignment).filter(
-        models.Grade.student_id == student_id
-    ).all()
-
-    if not grades:
+    if not graded_count:
         gpa = 0.0
     else:
-        total_percentage = sum(
-            (grade.points_earned / grade.assignment.max_points) * 100
-            for grade in grades
-        )
-        avg_percentage = total_percentage / len(grades)
-        # Convert to 4.0 scale
-        if avg_percentage >= 90:
-            gpa = 4.0
-        elif avg_percentage >= 80:
-            gpa = 3.0
-        elif avg_percentage >= 70:
-            gpa = 2.0
-        elif avg_percentage >= 60:
-            gpa = 1.0
-        else:
-            gpa = 0.0
+        avg_percentage = total_percentage / graded_count
+        gpa = grade_aggregates.gpa_for_percentage(avg_percentage)
 
     # Calculate attendance percentage
     attendance = db.query(models.Attendance).filter(
@@ -292,7 +332,7 @@ def generate_report_card(
 
     # Add default skill assessments
     default_skills = [
-        {"skill_name": "Academic Performance", "score": avg_percentage if grades else 85.0},
+        {"skill_name": "Academic Performance", "score": avg_percentage if graded_count else 85.0},
         {"skill_name": "Participation", "score": 85.0},
         {"skill_name": "Assignment Completion", "score": 92.0},
         {"skill_name": "Behavior", "score": 95.0},
@@ -300,14 +340,78 @@ def generate_report_card(
         {"skill_name": "Creativity", "score": 90.0}
     ]
 
-    for skill_data in default_skills:
-        skill = models.SkillAssessment(
-            report_card_id=report_card.id,
-            skill_name=skill_data["skill_name"],
-            score=skill_data["score"]
+    db.execute(insert(models.SkillAssessment), [
+        {"report_card_id": report_card.id, **skill_data}
+        for skill_data in default_skills
+    ])
+    return report_card
+
+
+@router.post("/generate/{student_id}", response_model=schemas.ReportCardResponse)
+def generate_report_card(
+    student_id: int,
+    academic_year: str,
+    term: models.TermEnum,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin", "teacher"))
+):
+    """Auto-generate a report card for a student based on their grades and attendance"""
+    # Verify student exists
+    student = db.query(models.Student).filter(models.Student.id == student_id).first()
+    if not student:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Student not found"
         )
-        db.add(skill)
 
+    report_card = _build_report_card(db, student_id, academic_year, term)
     db.commit()
     db.refresh(report_card)
     return report_card
+
+
+@router.post("/generate-term", response_model=schemas.JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def generate_term_report_cards(
+    academic_year: str,
+    term: models.TermEnum,
+    grade_level: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin"))
+):
+    """Queue report card generation for every student in a term; poll /api/jobs/{job_id}"""
+    params = {"academic_year": academic_year, "term": term.value}
+    if grade_level is not None:
+        params["grade_level"] = grade_level
+    return jobs.enqueue(db, "report_cards.generate_term", params, created_by=current_user)
+
+
+TERM_JOB_BATCH_SIZE = 50
+
+
+def generate_term_report_cards_job(ctx, academic_year: str, term: str, grade_level: Optional[int] = None):
+    """Job handler: students that already have a card for the term are skipped, so re-runs resume"""
+    term = models.TermEnum(term)
+    db = ctx.session_factory()
+    try:
+        has_card = exists().where(
+            models.ReportCard.student_id == models.Student.id,
+            models.ReportCard.academic_year == academic_year,
+            models.ReportCard.term == term
+        )
+        query = db.query(models.Student.id).filter(~has_card)
+        if grade_level is not None:
+            query = query.filter(models.Student.grade_level == grade_level)
+        student_ids = [student_id for (student_id,) in query.order_by(models.Student.id)]
+
+        total = len(student_ids)
+        ctx.progress(0, total, f"Generating {total} report cards")
+        for start in range(0, total, TERM_JOB_BATCH_SIZE):
+            for student_id in student_ids[start:start + TERM_JOB_BATCH_SIZE]:
+                _build_report_card(db, student_id, academic_year, term)
+            db.commit()
+            done = min(start + TERM_JOB_BATCH_SIZE, total)
+            ctx.progress(done, total, f"Generated {done} of {total} report cards")
+
+        return {"academic_year": academic_year, "term": term.value, "generated": total}
+    finally:
+        db.close()
@@ -1,32 +1,49 @@
+from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import case, delete, func, or_
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import List, Optional
 from database import get_db
+import fieldsets
+import grade_aggregates
 import models
 import schemas
+import seats
 from auth import get_current_user, require_role, get_password_hash
 
 router = APIRouter(prefix="/students", tags=["Students"])
 
+OVERVIEW_RECENT_GRADES = 10
+
 
 @router.get("", response_model=List[schemas.StudentResponse])
 def get_all_students(
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    students = db.query(models.Student).all()
+    fieldset = fieldsets.parse(fields, schemas.StudentResponse)
+    options = fieldsets.load_options(models.Student, fieldset) if fieldset else [joinedload(models.Student.user)]
+    students = db.query(models.Student).options(*options).all()
+    if fieldset:
+        return fieldsets.respond(students, schemas.StudentResponse, fieldset, many=True)
     return students
 
 
 @router.get("/{student_id}", response_model=schemas.StudentResponse)
 def get_student_by_id(
     student_id: int,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    student = db.query(models.Student).filter(models.Student.id == student_id).first()
+    fieldset = fieldsets.parse(fields, schemas.StudentResponse)
+    options = fieldsets.load_options(models.Student, fieldset) if fieldset else [joinedload(models.Student.user)]
+    student = db.query(models.Student).options(*options).filter(models.Student.id == student_id).first()
     if not student:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
+    if fieldset:
+        return fieldsets.respond(student, schemas.StudentResponse, fieldset)
     return student
 
 
@@ -90,7 +107,9 @@ def update_student(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("admin", "student"))
 ):
-    student = db.query(models.Student).filter(models.Student.id == student_id).first()
+    student = db.query(models.Student).options(
+        joinedload(models.Student.user)
+    ).filter(models.Student.id == student_id).first()
     if not student:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
 
@@ -123,19 +142,100 @@ def delete_student(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("admin"))
 ):
-    student = db.query(models.Student).filter(models.Student.id == student_id).first()
+    # The user's profiles come along here rather than one query each in the delete cascade
+    account = joinedload(models.Student.user)
+    student = db.query(models.Student).options(
+        account.joinedload(models.User.student), account.joinedload(models.User.teacher)
+    ).filter(models.Student.id == student_id).first()
     if not student:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
 
     # Delete student and associated user
     user = student.user
+    # The cascade loads the enrollments anyway; their courses are the seats to refill
+    course_ids = sorted({enrollment.course_id for enrollment in student.enrollments if enrollment.course_id})
+    db.execute(delete(models.GuardianLink).where(or_(
+        models.GuardianLink.student_id == student_id, models.GuardianLink.user_id == user.id
+    )))
     db.delete(student)
     db.delete(user)
+    grade_aggregates.forget_student(db, student_id)
+    seats.forget_student(db, student_id, course_ids)
     db.commit()
 
     return {"message": "Student deleted successfully"}
 
 
+@router.get("/{student_id}/guardians", response_model=List[schemas.GuardianLinkResponse])
+def get_student_guardians(
+    student_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin"))
+):
+    """Users linked to the student as guardians, who see the student's dashboard"""
+    student = db.query(models.Student).filter(models.Student.id == student_id).first()
+    if not student:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
+
+    return db.query(models.GuardianLink).options(joinedload(models.GuardianLink.user)).filter(
+        models.GuardianLink.student_id == student_id
+    ).order_by(models.GuardianLink.id).all()
+
+
+@router.post("/{student_id}/guardians", response_model=schemas.GuardianLinkResponse)
+def link_guardian(
+    student_id: int,
+    link_data: schemas.GuardianLinkCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin"))
+):
+    """Let an existing user see the student's dashboard as their guardian.
+
+    Links are only made here, by an admin: guardian_email on the student is
+    contact information and grants no access.
+    """
+    student = db.query(models.Student).filter(models.Student.id == student_id).first()
+    if not student:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
+    user = db.query(models.User).filter(models.User.id == link_data.user_id).first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    if user.role == models.RoleEnum.admin or student.user_id == user.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Admins and the student themselves cannot be linked as guardians"
+        )
+    existing = db.query(models.GuardianLink.id).filter(
+        models.GuardianLink.student_id == student_id,
+        models.GuardianLink.user_id == user.id
+    ).first()
+    if existing:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Guardian already linked")
+
+    link = models.GuardianLink(student_id=student_id, user_id=user.id, created_by_id=current_user.id)
+    db.add(link)
+    db.commit()
+    link.user = user
+    return link
+
+
+@router.delete("/{student_id}/guardians/{user_id}")
+def unlink_guardian(
+    student_id: int,
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("admin"))
+):
+    removed = db.execute(delete(models.GuardianLink).where(
+        models.GuardianLink.student_id == student_id,
+        models.GuardianLink.user_id == user_id
+    )).rowcount
+    if not removed:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Guardian link not found")
+    db.commit()
+    return {"message": "Guardian unlinked successfully"}
+
+
 @router.get("/{student_id}/courses", response_model=List[schemas.CourseResponse])
 def get_student_courses(
     student_id: int,
@@ -146,11 +246,9 @@ def get_student_courses(
     if not student:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
 
-    enrollments = db.query(models.Enrollment).filter(
+    courses = db.query(models.Course).join(models.Enrollment).filter(
         models.Enrollment.student_id == student_id
     ).all()
-
-    courses = [enrollment.course for enrollment in enrollments]
     return courses
 
 
@@ -164,7 +262,9 @@ def get_student_grades(
     if not student:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
 
-    grades = db.query(models.Grade).filter(models.Grade.student_id == student_id).all()
+    grades = db.query(models.Grade).options(
+        joinedload(models.Grade.assignment).joinedload(models.Assignment.course)
+    ).filter(models.Grade.student_id == student_id).all()
 
     result = []
     for grade in grades:
@@ -182,6 +282,59 @@ def get_student_grades(
     return result
 
 
+@router.get("/{student_id}/transcript", response_model=schemas.TranscriptResponse)
+def get_student_transcript(
+    student_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Per-course grade totals and GPA, read from the grade aggregates"""
+    student = db.query(models.Student).filter(models.Student.id == student_id).first()
+    if not student:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
+
+    # Students can only view their own transcript
+    if current_user.role == models.RoleEnum.student and student.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this student's transcript"
+        )
+
+    rows = db.query(models.GradeAggregate, models.Course).join(
+        models.Course, models.GradeAggregate.course_id == models.Course.id
+    ).filter(
+        models.GradeAggregate.student_id == student_id,
+        models.GradeAggregate.graded_count > 0
+    ).order_by(models.Course.name).all()
+
+    courses = []
+    total_percentage = 0.0
+    graded_count = 0
+    for aggregate, course in rows:
+        courses.append({
+            "course_id": course.id,
+            "course_name": course.name,
+            "course_code": course.code,
+            "credits": course.credits,
+            "points_earned": aggregate.points_earned_sum,
+            "max_points": aggregate.max_points_sum,
+            "graded_count": aggregate.graded_count,
+            "average_percentage": round(aggregate.percentage_sum / aggregate.graded_count, 2),
+            "last_graded_at": aggregate.last_graded_at
+        })
+        total_percentage += aggregate.percentage_sum
+        graded_count += aggregate.graded_count
+
+    average_percentage = total_percentage / graded_count if graded_count else 0.0
+    return {
+        "student_id": student_id,
+        "courses": courses,
+        "graded_count": graded_count,
+        "average_percentage": round(average_percentage, 2),
+        "gpa": grade_aggregates.gpa_for_percentage(average_percentage) if graded_count else 0.0
+    }
+
+
 @router.get("/{student_id}/attendance")
 def get_student_attendance(
     student_id: int,
@@ -193,7 +346,9 @@ def get_student_attendance(
     if not student:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
 
-    query = db.query(models.Attendance).filter(models.Attendance.student_id == student_id)
+    query = db.query(models.Attendance).options(
+        joinedload(models.Attendance.course)
+    ).filter(models.Attendance.student_id == student_id)
 
     if course_id:
         query = query.filter(models.Attendance.course_id == course_id)
@@ -212,3 +367,95 @@ def get_student_attendance(
         })
 
     return result
+
+
+@router.get("/{student_id}/overview", response_model=schemas.StudentOverview)
+def get_student_overview(
+    student_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Everything the student profile page shows, in one request.
+
+    Profile, courses, recent grades, attendance summary, latest report card and
+    fee balance; the summaries are aggregated in SQL rather than loaded row by row.
+    """
+    student = db.query(models.Student).options(
+        joinedload(models.Student.user)
+    ).filter(models.Student.id == student_id).first()
+    if not student:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
+
+    # Students can only view their own overview
+    if current_user.role == models.RoleEnum.student and student.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this student's overview"
+        )
+
+    courses = db.query(models.Course).join(models.Enrollment).filter(
+        models.Enrollment.student_id == student_id
+    ).order_by(models.Course.name).all()
+
+    grades = db.query(models.Grade).options(
+        joinedload(models.Grade.assignment).joinedload(models.Assignment.course)
+    ).filter(models.Grade.student_id == student_id).order_by(
+        models.Grade.graded_at.desc(), models.Grade.id.desc()
+    ).limit(OVERVIEW_RECENT_GRADES).all()
+    recent_grades = [
+        {
+            "id": grade.id,
+            "assignment_id": grade.assignment_id,
+            "assignment_title": grade.assignment.title,
+            "course_id": grade.assignment.course_id,
+            "course_name": grade.assignment.course.name,
+            "points_earned": grade.points_earned,
+            "max_points": grade.assignment.max_points,
+            "feedback": grade.feedback,
+            "graded_at": grade.graded_at
+        }
+        for grade in grades
+    ]
+
+    attendance = {attendance_status.value: 0 for attendance_status in models.AttendanceStatusEnum}
+    for attendance_status, count in db.query(models.Attendance.status, func.count(models.Attendance.id)).filter(
+        models.Attendance.student_id == student_id
+    ).group_by(models.Attendance.status):
+        attendance[attendance_status.value] = count
+    total = sum(attendance.values())
+    attended = attendance["present"] + attendance["late"]
+
+    latest_report_card = db.query(models.ReportCard).options(
+        selectinload(models.ReportCard.skill_assessments)
+    ).filter(
+        models.ReportCard.student_id == student_id
+    ).order_by(models.ReportCard.generated_at.desc(), models.ReportCard.id.desc()).first()
+
+    today = date.today()
+    outstanding, outstanding_records, overdue, next_due_date = db.query(
+        func.coalesce(func.sum(models.FeeRecord.amount), 0.0),
+        func.count(models.FeeRecord.id),
+        func.coalesce(func.sum(case((models.FeeRecord.due_date < today, models.FeeRecord.amount), else_=0.0)), 0.0),
+        func.min(case((models.FeeRecord.due_date >= today, models.FeeRecord.due_date)))
+    ).filter(
+        models.FeeRecord.student_id == student_id,
+        models.FeeRecord.status != models.PaymentStatusEnum.paid
+    ).one()
+
+    return {
+        "student": student,
+        "courses": courses,
+        "recent_grades": recent_grades,
+        "attendance": {
+            "total": total,
+            **attendance,
+            "attendance_percentage": round(attended / total * 100, 2) if total else None
+        },
+        "latest_report_card": latest_report_card,
+        "fees": {
+            "outstanding_balance": outstanding,
+            "outstanding_records": outstanding_records,
+            "overdue_balance": overdue,
+            "next_due_date": next_due_date
+        }
+    }
@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from database import get_db
+import change_feed
+import models
+import schemas
+from auth import get_current_user
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+
+@router.get("", response_model=schemas.SyncResponse)
+def sync_changes(
+    since: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Rows of the caller's courses changed since the ``cursor`` of their last sync.
+
+    Without ``since`` (or with one older than the tombstone retention) the
+    response is a full snapshot with ``reset`` set.
+    """
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return change_feed.changes_since(db, current_user, since)
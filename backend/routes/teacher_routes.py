@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import delete
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional
 from database import get_db
+import fieldsets
 import models
 import schemas
 from auth import get_current_user, require_role, get_password_hash
@@ -11,10 +13,15 @@ router = APIRouter(prefix="/teachers", tags=["Teachers"])
 
 @router.get("", response_model=List[schemas.TeacherResponse])
 def get_all_teachers(
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    teachers = db.query(models.Teacher).all()
+    fieldset = fieldsets.parse(fields, schemas.TeacherResponse)
+    options = fieldsets.load_options(models.Teacher, fieldset) if fieldset else [joinedload(models.Teacher.user)]
+    teachers = db.query(models.Teacher).options(*options).all()
+    if fieldset:
+        return fieldsets.respond(teachers, schemas.TeacherResponse, fieldset, many=True)
     return teachers
 
 
@@ -84,12 +91,15 @@ def delete_teacher(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("admin"))
 ):
-    teacher = db.query(models.Teacher).filter(models.Teacher.id == teacher_id).first()
+    teacher = db.query(models.Teacher).options(
+        joinedload(models.Teacher.user)
+    ).filter(models.Teacher.id == teacher_id).first()
     if not teacher:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Teacher not found")
 
     # Delete teacher and associated user
     user = teacher.user
+    db.execute(delete(models.GuardianLink).where(models.GuardianLink.user_id == user.id))
     db.delete(teacher)
     db.delete(user)
     db.commit()
@@ -0,0 +1,79 @@
+"""
+Additive schema sync for databases created by an older version of the app.
+
+There is no migration tool: init_db.py's create_all() creates missing
+tables but never touches existing ones. sync() runs at startup on databases
+that were already initialized: it creates tables added since, adds columns
+that the models define but an existing table lacks (ALTER TABLE ... ADD
+COLUMN) and creates missing indexes. Only additive, nullable (or
+server-defaulted) columns are handled; anything else still needs a manual
+migration.
+"""
+import logging
+
+from sqlalchemy import exc, inspect
+from sqlalchemy.schema import CreateColumn
+
+from database import Base
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(bind) -> list:
+    """Add model columns and indexes missing from existing tables; returns what was added."""
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    preparer = bind.dialect.identifier_preparer
+    added = []
+
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    logger.warning("Cannot add NOT NULL column %s.%s without a server default",
+                                   table.name, column.name)
+                    continue
+                ddl = CreateColumn(column).compile(dialect=bind.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}")
+                added.append(f"{table.name}.{column.name}")
+
+    # Indexes declared since the table was created, including ones on new columns.
+    # Each gets its own transaction: a unique index fails on existing duplicates.
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            try:
+                with bind.begin() as conn:
+                    index.create(bind=conn)
+            except exc.IntegrityError:
+                logger.warning("Cannot create unique index %s: %s has duplicate rows", index.name, table.name)
+                continue
+            added.append(f"{table.name}.{index.name}")
+
+    if added:
+        logger.info("Added to schema: %s", ", ".join(added))
+    return added
+
+
+def sync(bind) -> list:
+    """Bring an initialized database up to the models; uninitialized ones are left to init_db.py."""
+    if not inspect(bind).get_table_names():
+        return []
+    Base.metadata.create_all(bind=bind, checkfirst=True)
+    return add_missing_columns(bind)
+
+
+if __name__ == "__main__":
+    from database import engine
+    import models  # noqa: F401  (registers the tables)
+    logging.basicConfig(level=logging.INFO)
+    print(sync(engine) or "Schema is up to date")
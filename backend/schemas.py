@@ -1,7 +1,7 @@
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, date
-from typing import Optional, List
-from models import RoleEnum, AttendanceStatusEnum, PaymentStatusEnum, TermEnum
+from typing import Optional, List, Any, Dict
+from models import RoleEnum, AttendanceStatusEnum, PaymentStatusEnum, TermEnum, JobStatusEnum
 
 
 # User Schemas
@@ -110,12 +110,27 @@ class StudentResponse(StudentBase):
         from_attributes = True
 
 
+class GuardianLinkCreate(BaseModel):
+    user_id: int
+
+
+class GuardianLinkResponse(BaseModel):
+    user_id: int
+    student_id: int
+    user: UserResponse
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 # Course Schemas
 class CourseBase(BaseModel):
     name: str
     code: str
     description: Optional[str] = None
     credits: int = 3
+    capacity: Optional[int] = None
 
 
 class CourseCreate(CourseBase):
@@ -127,17 +142,104 @@ class CourseUpdate(BaseModel):
     description: Optional[str] = None
     teacher_id: Optional[int] = None
     credits: Optional[int] = None
+    capacity: Optional[int] = None
 
 
 class CourseResponse(CourseBase):
     id: int
     teacher_id: int
+    enrolled_count: Optional[int] = None
     created_at: datetime
 
     class Config:
         from_attributes = True
 
 
+class CourseSummary(CourseResponse):
+    enrolled_count: int = 0
+    assignment_count: int = 0
+    teacher_name: Optional[str] = None
+    teacher_department: Optional[str] = None
+
+
+class CourseSummaryPage(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    items: List[CourseSummary]
+
+
+class TranscriptCourse(BaseModel):
+    course_id: int
+    course_name: str
+    course_code: str
+    credits: int
+    points_earned: float
+    max_points: float
+    graded_count: int
+    average_percentage: float
+    last_graded_at: Optional[datetime] = None
+
+
+class TranscriptResponse(BaseModel):
+    student_id: int
+    courses: List[TranscriptCourse]
+    graded_count: int
+    average_percentage: float
+    gpa: float
+
+
+# Grading Policy Schemas
+class GradeBand(BaseModel):
+    min_percentage: float
+    letter: str
+    points: float
+
+
+class GradingCategoryBase(BaseModel):
+    name: str
+    weight: float
+    drop_lowest: int = 0
+
+
+class GradingCategoryResponse(GradingCategoryBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+
+class GradingPolicyUpdate(BaseModel):
+    categories: List[GradingCategoryBase]
+    grading_scale: Optional[List[GradeBand]] = None
+
+
+class GradingPolicyResponse(BaseModel):
+    course_id: int
+    categories: List[GradingCategoryResponse]
+    grading_scale: List[GradeBand]
+
+
+class StudentCourseGrade(BaseModel):
+    student_id: int
+    student_name: str
+    category_averages: Dict[str, Optional[float]]
+    average: Optional[float] = None
+    letter: Optional[str] = None
+    gpa_points: Optional[float] = None
+    graded_count: int
+
+
+class CourseGradebookResponse(BaseModel):
+    course_id: int
+    course_name: str
+    categories: List[GradingCategoryBase]
+    grading_scale: List[GradeBand]
+    uncategorized_assignments: int
+    class_average: Optional[float] = None
+    students: List[StudentCourseGrade]
+
+
 # Enrollment Schemas
 class EnrollmentCreate(BaseModel):
     student_id: int
@@ -154,12 +256,34 @@ class EnrollmentResponse(BaseModel):
         from_attributes = True
 
 
+class WaitlistEntryResponse(BaseModel):
+    id: int
+    student_id: int
+    course_id: int
+    position: int
+    created_at: datetime
+
+
+class BulkEnrollmentCreate(BaseModel):
+    # Either many students for one course, explicit pairs, or both
+    course_id: Optional[int] = None
+    student_ids: List[int] = []
+    pairs: List[EnrollmentCreate] = []
+
+
+class BulkEnrollmentResponse(BaseModel):
+    requested: int
+    enrolled: int
+    already_enrolled: int
+
+
 # Assignment Schemas
 class AssignmentBase(BaseModel):
     title: str
     description: Optional[str] = None
     due_date: Optional[datetime] = None
     max_points: float = 100.0
+    category: Optional[str] = None
 
 
 class AssignmentCreate(AssignmentBase):
@@ -171,6 +295,7 @@ class AssignmentUpdate(BaseModel):
     description: Optional[str] = None
     due_date: Optional[datetime] = None
     max_points: Optional[float] = None
+    category: Optional[str] = None
 
 
 class AssignmentResponse(AssignmentBase):
@@ -258,6 +383,34 @@ class DashboardStats(BaseModel):
     total_enrollments: int
 
 
+class UpcomingAssignment(BaseModel):
+    assignment_id: int
+    course_id: int
+    title: str
+    due_date: datetime
+
+
+class TeacherDashboardCourse(BaseModel):
+    course_id: int
+    course_name: str
+    course_code: str
+    student_count: int
+    ungraded_count: int  # Enrolled students without a grade, summed over past-due assignments
+    attendance_marked_today: int  # Students with an attendance record for today
+    attendance_complete: bool
+
+
+class TeacherDashboard(BaseModel):
+    teacher_id: int
+    generated_at: datetime
+    student_count: int  # Distinct students across the teacher's courses
+    ungraded_count: int
+    courses_attendance_complete: int
+    course_count: int
+    upcoming_assignments: List[UpcomingAssignment]
+    courses: List[TeacherDashboardCourse]
+
+
 # Report Card Schemas
 class SkillAssessmentBase(BaseModel):
     skill_name: str
@@ -372,6 +525,17 @@ class FeeStructureResponse(FeeStructureBase):
         from_attributes = True
 
 
+class FeeTermAmount(BaseModel):
+    term: TermEnum
+    due_date: date
+    amount: float
+
+
+class FeeStructureDetail(FeeStructureResponse):
+    components_total: float  # Sum of the itemized fees
+    terms: List[FeeTermAmount]  # How total_annual is split into term fee records
+
+
 # Fee Record Schemas
 class FeeRecordBase(BaseModel):
     academic_year: str
@@ -405,3 +569,183 @@ class FeeRecordResponse(FeeRecordBase):
 
     class Config:
         from_attributes = True
+
+
+class ReconciliationLine(BaseModel):
+    line: int  # Line number in the uploaded file, header = 1
+    transaction_id: Optional[str] = None
+    student_reference: Optional[str] = None
+    amount: Optional[float] = None
+    fee_record_id: Optional[int] = None
+    candidate_ids: List[int] = []  # Fee records an ambiguous line could belong to
+    reason: Optional[str] = None
+
+
+class ReconciliationReport(BaseModel):
+    total_lines: int
+    matched_count: int
+    updated_count: int  # Matched lines that marked a record paid (others were already paid)
+    unmatched_count: int
+    ambiguous_count: int
+    matched: List[ReconciliationLine]
+    unmatched: List[ReconciliationLine]
+    ambiguous: List[ReconciliationLine]
+
+
+# Student Overview Schemas
+class StudentGradeEntry(BaseModel):
+    id: int
+    assignment_id: int
+    assignment_title: str
+    course_id: int
+    course_name: str
+    points_earned: Optional[float] = None
+    max_points: Optional[float] = None
+    feedback: Optional[str] = None
+    graded_at: datetime
+
+
+class AttendanceSummary(BaseModel):
+    total: int = 0
+    present: int = 0
+    absent: int = 0
+    late: int = 0
+    attendance_percentage: Optional[float] = None  # Present or late; None without records
+
+
+class FeeBalance(BaseModel):
+    outstanding_balance: float = 0.0
+    outstanding_records: int = 0
+    overdue_balance: float = 0.0
+    next_due_date: Optional[date] = None
+
+
+class StudentOverview(BaseModel):
+    student: StudentResponse
+    courses: List[CourseResponse]
+    recent_grades: List[StudentGradeEntry]
+    attendance: AttendanceSummary
+    latest_report_card: Optional[ReportCardResponse] = None
+    fees: FeeBalance
+
+
+# Student Dashboard Schemas
+class DashboardCourseAverage(BaseModel):
+    course_id: int
+    course_name: str
+    course_code: str
+    average_percentage: Optional[float] = None  # None until something is graded
+    graded_count: int = 0
+
+
+class StudentDashboardEntry(BaseModel):
+    student_id: int
+    student_name: str
+    grade_level: Optional[int] = None
+    courses: List[DashboardCourseAverage]
+    attendance: AttendanceSummary  # Since term_start
+    upcoming_assignments: List[UpcomingAssignment]  # Due soon and not yet graded
+    fees: FeeBalance
+
+
+class StudentDashboard(BaseModel):
+    generated_at: datetime
+    term_start: date
+    unread_announcements: int
+    students: List[StudentDashboardEntry]
+
+
+# Batch Schemas
+class BatchSubRequest(BaseModel):
+    id: Optional[str] = None  # Echoed back to match responses to requests
+    method: str
+    path: str  # Under /api, may include a query string
+    body: Optional[Any] = None
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest]
+
+
+class BatchSubResponse(BaseModel):
+    id: Optional[str] = None
+    status: int
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchSubResponse]
+
+
+# Sync Schemas
+class SyncChanges(BaseModel):
+    courses: List[CourseResponse] = []
+    students: List[StudentResponse] = []
+    enrollments: List[EnrollmentResponse] = []
+    assignments: List[AssignmentResponse] = []
+    grades: List[GradeResponse] = []
+    attendance: List[AttendanceResponse] = []
+
+
+class SyncDeletions(BaseModel):
+    courses: List[int] = []
+    enrollments: List[int] = []
+    assignments: List[int] = []
+    grades: List[int] = []
+    attendance: List[int] = []
+
+
+class SyncResponse(BaseModel):
+    cursor: datetime  # Pass back as ?since= on the next sync
+    reset: bool  # Full snapshot: replace local data instead of merging
+    course_ids: List[int]  # Every course in scope; drop local courses not listed
+    changes: SyncChanges
+    deleted: SyncDeletions
+
+
+# Early Warning Schemas
+class StudentRiskResponse(BaseModel):
+    student_id: int
+    student_reference: Optional[str] = None  # School student ID
+    student_name: str
+    grade_level: Optional[int] = None
+    score: float  # 0-100, higher is more at risk
+    at_risk: bool
+    attendance_rate: Optional[float] = None  # 0-1 over the recent window; None without records
+    previous_attendance_rate: Optional[float] = None  # The window before it
+    grade_average: Optional[float] = None
+    grade_slope: Optional[float] = None  # Percentage points per week; None with too few recent grades
+    recent_grades: int = 0
+    computed_at: datetime
+
+
+class StudentRiskPage(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    items: List[StudentRiskResponse]
+
+
+# Job Schemas
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: JobStatusEnum
+    params: Optional[Dict[str, Any]] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    progress_current: int = 0
+    progress_total: Optional[int] = None
+    progress_message: Optional[str] = None
+    attempts: int = 0
+    max_attempts: int
+    cancel_requested: bool = False
+    run_after: Optional[datetime] = None
+    created_by_id: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,194 @@
+"""
+Course capacity: seat claims and waitlists.
+
+``courses.enrolled_count`` is a seat counter kept next to ``capacity``
+(NULL = unlimited). A seat is claimed with one conditional UPDATE that checks
+and increments the counter together, so concurrent enrollments can never
+oversubscribe a course, whatever the isolation level. Every path that adds
+or removes enrollment rows goes through this module in the same transaction
+as the row change.
+
+When a seat frees up, the oldest waitlist entries for the course are turned
+into enrollments. Courses from before the counter existed are counted once
+at startup (backfill()); ``python seats.py --recount`` rebuilds every counter.
+"""
+import argparse
+from typing import Iterable, List, Optional
+
+from sqlalchemy import delete, func, inspect, or_, select, update
+from sqlalchemy.orm import Session
+
+import models
+
+Course = models.Course
+
+
+def _active_enrollments(course_id_column):
+    return select(func.count(models.Enrollment.id)).where(
+        models.Enrollment.course_id == course_id_column,
+        models.Enrollment.student_id.isnot(None)
+    ).scalar_subquery()
+
+
+def claim_seat(db: Session, course_id: int) -> bool:
+    """Take one seat if the course has room; the check and increment are one statement."""
+    return db.execute(
+        update(Course).where(
+            Course.id == course_id,
+            or_(Course.capacity.is_(None), Course.enrolled_count < Course.capacity)
+        ).values(enrolled_count=Course.enrolled_count + 1)
+    ).rowcount == 1
+
+
+def release_seat(db: Session, course_id: int):
+    db.execute(
+        update(Course).where(Course.id == course_id, Course.enrolled_count > 0).values(
+            enrolled_count=Course.enrolled_count - 1
+        )
+    )
+
+
+def enroll(db: Session, student_id: int, course_id: int) -> Optional[models.Enrollment]:
+    """Claim a seat and add the enrollment; None when the course is full."""
+    if not claim_seat(db, course_id):
+        return None
+    enrollment = models.Enrollment(student_id=student_id, course_id=course_id)
+    db.add(enrollment)
+    db.flush()
+    return enrollment
+
+
+def join_waitlist(db: Session, student_id: int, course_id: int) -> models.WaitlistEntry:
+    """Add the student to the course's waitlist, or return their existing entry."""
+    entry = db.query(models.WaitlistEntry).filter(
+        models.WaitlistEntry.student_id == student_id,
+        models.WaitlistEntry.course_id == course_id
+    ).first()
+    if entry is None:
+        entry = models.WaitlistEntry(student_id=student_id, course_id=course_id)
+        db.add(entry)
+        db.flush()
+    return entry
+
+
+def waitlist_position(db: Session, entry: models.WaitlistEntry) -> int:
+    """1-based position: entries are served oldest first."""
+    ahead = db.query(func.count(models.WaitlistEntry.id)).filter(
+        models.WaitlistEntry.course_id == entry.course_id,
+        or_(
+            models.WaitlistEntry.created_at < entry.created_at,
+            (models.WaitlistEntry.created_at == entry.created_at) & (models.WaitlistEntry.id < entry.id)
+        )
+    ).scalar()
+    return ahead + 1
+
+
+def promote_waitlist(db: Session, course_id: int) -> List[models.Enrollment]:
+    """Fill free seats from the front of the waitlist."""
+    promoted = []
+    while True:
+        entry = db.query(models.WaitlistEntry).filter(
+            models.WaitlistEntry.course_id == course_id
+        ).order_by(models.WaitlistEntry.created_at, models.WaitlistEntry.id).first()
+        if entry is None or not claim_seat(db, course_id):
+            return promoted
+
+        # A concurrent promotion may have taken this entry; give the seat back and retry
+        taken = db.execute(
+            delete(models.WaitlistEntry).where(models.WaitlistEntry.id == entry.id)
+        ).rowcount
+        db.expunge(entry)
+        if not taken:
+            release_seat(db, course_id)
+            continue
+
+        already_enrolled = db.query(models.Enrollment.id).filter(
+            models.Enrollment.student_id == entry.student_id,
+            models.Enrollment.course_id == course_id
+        ).first()
+        if already_enrolled:
+            release_seat(db, course_id)
+            continue
+
+        enrollment = models.Enrollment(student_id=entry.student_id, course_id=course_id)
+        db.add(enrollment)
+        db.flush()
+        promoted.append(enrollment)
+
+
+def unenroll(db: Session, enrollment: models.Enrollment) -> List[models.Enrollment]:
+    """Delete the enrollment, free its seat and promote from the waitlist."""
+    course_id = enrollment.course_id
+    counted = enrollment.student_id is not None
+    db.delete(enrollment)
+    db.flush()
+    if course_id is None:
+        return []
+    if counted:
+        release_seat(db, course_id)
+    return promote_waitlist(db, course_id)
+
+
+def recount(db: Session, course_ids: Iterable[int]):
+    """Reset the counters of the given courses from the enrollments table."""
+    course_ids = list(set(course_ids))
+    if course_ids:
+        db.flush()
+        db.execute(
+            update(Course).where(Course.id.in_(course_ids)).values(enrolled_count=_active_enrollments(Course.id))
+        )
+
+
+def forget_student(db: Session, student_id: int, course_ids: List[int]):
+    """After a student is deleted: drop their waitlist entries and refill their seats.
+
+    ``course_ids`` are the student's courses, read before the delete.
+    """
+    db.execute(delete(models.WaitlistEntry).where(models.WaitlistEntry.student_id == student_id))
+    recount(db, course_ids)
+    if not course_ids:
+        return
+    # Only courses with someone waiting have seats to hand out
+    waitlisted = db.execute(
+        select(models.WaitlistEntry.course_id).where(models.WaitlistEntry.course_id.in_(course_ids)).distinct()
+    ).scalars().all()
+    for course_id in waitlisted:
+        promote_waitlist(db, course_id)
+
+
+def forget_course(db: Session, course_id: int):
+    db.execute(delete(models.WaitlistEntry).where(models.WaitlistEntry.course_id == course_id))
+
+
+def backfill(bind):
+    """Count courses whose counter was never set (databases that predate it)."""
+    if not inspect(bind).has_table(Course.__tablename__):
+        return
+    with bind.begin() as conn:
+        conn.execute(
+            update(Course).where(Course.enrolled_count.is_(None)).values(
+                enrolled_count=_active_enrollments(Course.id)
+            )
+        )
+
+
+def recount_all(bind):
+    with bind.begin() as conn:
+        conn.execute(update(Course).values(enrolled_count=_active_enrollments(Course.id)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain course seat counters.")
+    parser.add_argument("--recount", action="store_true", help="Recount every course from the enrollments table")
+    args = parser.parse_args()
+
+    from database import engine
+    if args.recount:
+        recount_all(engine)
+        print("Recounted enrolled_count for every course")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Production server: pre-forked uvicorn workers sharing one listening socket.
+
+    python serve.py                          # one worker per CPU core on 0.0.0.0:8000
+    python serve.py --workers 8 --port 8080
+
+The app is imported once in the supervisor and the heap frozen with
+gc.freeze() before forking, so workers share those pages copy-on-write.
+Schema updates and backfills (main.prepare_database) also run there, once,
+before any worker starts.
+Each worker drops the inherited connection pool, runs uvloop + httptools,
+and drains in-flight requests on SIGTERM. The supervisor forwards SIGTERM
+/SIGINT to the workers, waits for them, and replaces workers that die.
+
+`python main.py` is still the single-process, auto-reloading dev server.
+"""
+import argparse
+import gc
+import importlib.util
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from config import get_settings
+
+logger = logging.getLogger("kastra.serve")
+
+# A worker that exits sooner than this after starting is crash-looping
+MIN_WORKER_LIFETIME = 1.0
+# Exit status of a worker whose server never started (bad config, lifespan error)
+WORKER_BOOT_ERROR = 3
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def _available(module: str, preferred: str) -> str:
+    return preferred if importlib.util.find_spec(module) is not None else "auto"
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, args):
+    """Body of a forked worker; never returns."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    # Connections opened before the fork belong to the supervisor; close=False
+    # forgets them without sending a close on the shared socket.
+    from database import engine
+    engine.dispose(close=False)
+
+    config = uvicorn.Config(
+        app,
+        loop=_available("uvloop", "uvloop"),
+        http=_available("httptools", "httptools"),
+        lifespan="on",
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        limit_concurrency=args.limit_concurrency,
+        access_log=args.access_log,
+        proxy_headers=True,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+    )
+    server = uvicorn.Server(config)
+    exit_code = 0
+    try:
+        server.run(sockets=[sock])
+        if not server.started:
+            exit_code = WORKER_BOOT_ERROR
+    except BaseException:
+        logger.exception("Worker %s crashed", os.getpid())
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
+
+
+class Supervisor:
+    def __init__(self, app, sock: socket.socket, args):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers = {}  # pid -> start time
+        self.stopping = False
+        self.exit_code = 0
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(self.app, self.sock, self.args)
+        self.workers[pid] = time.monotonic()
+        logger.info("Started worker %s", pid)
+
+    def stop(self, signum, frame):
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info("Received %s, draining %d workers", signal.Signals(signum).name, len(self.workers))
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for _ in range(self.args.workers):
+            self.spawn()
+
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.workers.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+
+            exit_code = os.waitstatus_to_exitcode(status)
+            if exit_code == WORKER_BOOT_ERROR:
+                # Replacing it would fail the same way; take the whole server down
+                logger.error("Worker %s failed to boot, shutting down", pid)
+                self.exit_code = 1
+                self.stop(signal.SIGTERM, None)
+                continue
+
+            logger.warning("Worker %s exited with status %s; replacing it", pid, exit_code)
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            if not self.stopping:
+                self.spawn()
+
+        self.sock.close()
+        logger.info("All workers stopped")
+        return self.exit_code
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Run the API with pre-forked uvicorn workers.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY or default_workers(),
+                        help="Worker processes (default: WEB_CONCURRENCY or one per CPU core)")
+    parser.add_argument("--backlog", type=int, default=settings.SERVER_BACKLOG,
+                        help="Pending connections queued by the kernel before refusing")
+    parser.add_argument("--keep-alive", type=int, default=settings.SERVER_KEEP_ALIVE_SECONDS,
+                        help="Idle keep-alive seconds; keep above the load balancer's idle timeout")
+    parser.add_argument("--graceful-timeout", type=int, default=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+                        help="Seconds a worker waits for in-flight requests on SIGTERM")
+    parser.add_argument("--limit-concurrency", type=int, default=None,
+                        help="Per-worker cap on concurrent connections before returning 503")
+    parser.add_argument("--forwarded-allow-ips", default="127.0.0.1")
+    parser.add_argument("--access-log", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(message)s")
+
+    # Preload: everything imported here is shared with the workers after fork
+    from main import app, prepare_database
+    from routes import include_all_routers
+    include_all_routers(app)
+
+    # Migrations and backfills run here, once; the workers' lifespans skip them
+    prepare_database()
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    logger.info("Listening on %s:%d with %d workers", args.host, args.port, args.workers)
+
+    # Move the preloaded heap to the permanent generation so collections in the
+    # workers never traverse (and so never write to) those shared pages
+    gc.collect()
+    gc.freeze()
+
+    return Supervisor(app, sock, args).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"""
+POST /api/batch.
+"""
+from database import engine
+from routes import batch_routes
+
+
+def test_batch_returns_its_connection_before_dispatching(client, db, seed, admin_headers, monkeypatch):
+    db.close()
+    checked_out = []
+    dispatch = batch_routes._dispatch
+
+    async def counting_dispatch(app, scope, body):
+        checked_out.append(engine.pool.checkedout())
+        return await dispatch(app, scope, body)
+
+    monkeypatch.setattr(batch_routes, "_dispatch", counting_dispatch)
+    response = client.post("/api/batch", json={"requests": [
+        {"method": "GET", "path": f"/api/students/{seed.students[0]}"},
+        {"method": "GET", "path": f"/api/courses/{seed.courses[0]}"},
+    ]}, headers=admin_headers)
+
+    assert response.status_code == 200, response.text
+    assert [sub["status"] for sub in response.json()["responses"]] == [200, 200]
+    # Both reads start together; neither waits on a connection the batch still holds
+    assert checked_out == [0, 0]
@@ -0,0 +1,89 @@
+"""
+Student dashboard cache: invalidation across workers, link pruning and guardian links.
+"""
+import pytest
+from sqlalchemy import update
+
+from config import get_settings
+from conftest import auth_headers
+import dashboards
+from database import engine
+import models
+
+
+@pytest.fixture
+def no_overlap(monkeypatch):
+    # Rows seeded a moment ago would otherwise count as changed on every hit
+    monkeypatch.setattr(get_settings(), "SYNC_CURSOR_OVERLAP_SECONDS", 0.0)
+
+
+def _outstanding(response) -> float:
+    assert response.status_code == 200, response.text
+    return response.json()["students"][0]["fees"]["outstanding_balance"]
+
+
+def test_unchanged_dashboard_is_served_from_cache(client, seed, student_headers, no_overlap):
+    first = client.get("/api/dashboard/student", headers=student_headers)
+    hits = dashboards.student_dashboards.hits
+
+    second = client.get("/api/dashboard/student", headers=student_headers)
+
+    assert second.json() == first.json()
+    assert dashboards.student_dashboards.hits == hits + 1
+
+
+def test_change_from_another_worker_reaches_cached_dashboard(client, seed, student_headers, no_overlap):
+    before = _outstanding(client.get("/api/dashboard/student", headers=student_headers))
+
+    # A plain connection, as another worker's write looks to this one: no session events fire here
+    with engine.begin() as conn:
+        conn.execute(update(models.FeeRecord).where(models.FeeRecord.student_id == seed.students[0]).values(
+            status=models.PaymentStatusEnum.paid
+        ))
+
+    assert before > 0
+    assert _outstanding(client.get("/api/dashboard/student", headers=student_headers)) == 0
+
+
+def test_delete_from_another_worker_reaches_cached_dashboard(client, db, seed, student_headers, no_overlap,
+                                                             monkeypatch):
+    before = _outstanding(client.get("/api/dashboard/student", headers=student_headers))
+
+    # An ORM delete whose local invalidation, on the other worker, never reaches this one
+    with monkeypatch.context() as other_worker:
+        other_worker.setattr(dashboards, "invalidate_students", lambda student_ids: None)
+        record = db.query(models.FeeRecord).filter(models.FeeRecord.student_id == seed.students[0]).first()
+        db.delete(record)
+        db.commit()
+
+    assert _outstanding(client.get("/api/dashboard/student", headers=student_headers)) == before - record.amount
+
+
+def test_viewers_of_expired_dashboards_are_pruned(client, seed, student_headers, no_overlap, monkeypatch):
+    client.get("/api/dashboard/student", headers=student_headers)
+    assert seed.student_users[0] in dashboards._viewers[seed.students[0]]
+
+    dashboards.student_dashboards.invalidate(seed.student_users[0])
+    monkeypatch.setattr(dashboards, "_last_prune", 0.0)
+    dashboards._prune_viewers_if_due()
+
+    assert seed.students[0] not in dashboards._viewers
+
+
+def test_guardian_sees_only_linked_students(client, seed, admin_headers):
+    headers = auth_headers(seed.guardian)
+
+    linked = client.get("/api/dashboard/student", headers=headers).json()
+    client.delete(f"/api/students/{seed.students[1]}/guardians/{seed.guardian}", headers=admin_headers)
+    unlinked = client.get("/api/dashboard/student", headers=headers).json()
+
+    # Every seeded student lists the guardian's email; only the links count
+    assert [entry["student_id"] for entry in linked["students"]] == seed.students[:2]
+    assert [entry["student_id"] for entry in unlinked["students"]] == seed.students[:1]
+
+
+def test_only_admins_link_guardians(client, seed, student_headers):
+    response = client.post(f"/api/students/{seed.students[0]}/guardians",
+                           json={"user_id": seed.student_users[1]}, headers=student_headers)
+
+    assert response.status_code == 403
@@ -0,0 +1,24 @@
+"""
+Early-warning risk listing.
+"""
+from datetime import datetime
+
+import models
+
+
+def test_students_without_accounts_are_listed(client, db, seed, admin_headers):
+    student = models.Student(grade_level=10, student_id="NOACCT01")
+    db.add(student)
+    db.flush()
+    db.add(models.StudentRiskScore(student_id=student.id, score=95.0, at_risk=True, attendance_rate=0.5,
+                                   previous_attendance_rate=0.9, grade_average=40.0, recent_grades=4,
+                                   computed_at=datetime.utcnow()))
+    db.commit()
+
+    response = client.get("/api/early-warning", params={"sort": "name", "order": "asc"}, headers=admin_headers)
+
+    assert response.status_code == 200, response.text
+    page = response.json()
+    assert page["total"] == len(seed.students) + 1
+    listed = {item["student_id"]: item["student_name"] for item in page["items"]}
+    assert listed[student.id] == "NOACCT01"
@@ -0,0 +1,69 @@
+"""
+Fee structures and fee records.
+"""
+from sqlalchemy import update
+
+from config import get_settings
+from conftest import GRADE_LEVEL, NEXT_ACADEMIC_YEAR
+from database import engine
+import models
+
+
+def test_generated_records_use_current_structure_not_cached_one(client, seed, admin_headers):
+    structure_url = f"/api/fees/structures/{NEXT_ACADEMIC_YEAR}/{GRADE_LEVEL}"
+    assert client.get(structure_url, headers=admin_headers).json()["total_annual"] == 9000
+
+    # Changed by another worker: this one's cache still holds the old amount
+    with engine.begin() as conn:
+        conn.execute(update(models.FeeStructure).where(
+            models.FeeStructure.academic_year == NEXT_ACADEMIC_YEAR
+        ).values(total_annual=12000))
+    response = client.post(f"/api/fees/records/generate/{seed.students[0]}",
+                           params={"academic_year": NEXT_ACADEMIC_YEAR}, headers=admin_headers)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["total_amount"] == 12000
+    assert client.get(structure_url, headers=admin_headers).json()["total_annual"] == 9000
+
+
+def _reconcile(client, headers, statement: bytes):
+    return client.post("/api/fees/records/reconcile", files={"file": ("statement.csv", statement, "text/csv")},
+                       headers=headers)
+
+
+def _paid_count(db) -> int:
+    db.expire_all()
+    return db.query(models.FeeRecord).filter(models.FeeRecord.status == models.PaymentStatusEnum.paid).count()
+
+
+def test_reconcile_rejects_undecodable_line_before_committing(client, db, seed, admin_headers, monkeypatch):
+    # Several chunks of good lines ahead of the bad one, each of which would commit on its own
+    monkeypatch.setattr(get_settings(), "FEE_RECONCILE_CHUNK_SIZE", 2)
+    lines = [f"BNK-{student_id}-{i},,3000.00,2024-09-01" for student_id in seed.students for i in range(3)]
+    statement = "\ufefftransaction_id,student_id,amount,date\n" + "\n".join(lines[:6]) + "\n"
+    statement = statement.encode() + b"BNK-X,STU0001,1.00,2024-09-0\xff\n" + "\n".join(lines[6:]).encode()
+
+    response = _reconcile(client, admin_headers, statement)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Statement line 8 is not UTF-8 text; nothing was reconciled"
+    assert _paid_count(db) == 0
+
+
+def test_reconcile_reads_quoted_multiline_fields(client, db, seed, admin_headers):
+    statement = (
+        "\ufefftransaction_id,student_id,amount,date,payment_method\n"
+        f"BNK-{seed.students[0]}-0,,3000.00,2024-09-01,\"card\nending 42\"\n"
+        "\n"
+        "BNK-UNKNOWN,,3000.00,2024-09-01,\"card\nending\n7\"\n"
+        f"BNK-{seed.students[0]}-1,,3000.00,2024-09-01,cash\n"
+    ).encode()
+
+    response = _reconcile(client, admin_headers, statement)
+
+    assert response.status_code == 200, response.text
+    report = response.json()
+    # Lines each record starts on: the blank line 4 is skipped, the second quoted field spans 5-7
+    assert [entry["line"] for entry in report["matched"]] == [2, 8]
+    assert [entry["line"] for entry in report["unmatched"]] == [5]
+    assert _paid_count(db) == 2
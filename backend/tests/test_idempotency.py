@@ -0,0 +1,65 @@
+"""
+Idempotency-Key retries, with and without the group-commit writer.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import get_settings
+from conftest import auth_headers
+import group_commit
+import models
+
+
+@pytest.fixture(params=["per-request", "group"])
+def commit_mode(request):
+    settings = get_settings()
+    settings.GROUP_COMMIT_ENABLED = request.param == "group"
+    yield request.param
+    settings.GROUP_COMMIT_ENABLED = False
+    group_commit.writer.stop()
+
+
+def _attendance(seed) -> dict:
+    return {"student_id": seed.students[0], "course_id": seed.courses[0], "date": "2024-10-01", "status": "late"}
+
+
+def test_retry_replays_stored_response(client, seed, commit_mode):
+    headers = {**auth_headers(seed.teacher_users[0]), "Idempotency-Key": "mark-1"}
+
+    first = client.post("/api/attendance", json=_attendance(seed), headers=headers)
+    retry = client.post("/api/attendance", json=_attendance(seed), headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+
+
+def test_expired_key_is_replaced(client, db, seed, commit_mode):
+    # An expired row not yet pruned: with group commit on, deleting it on the
+    # request session used to hold the SQLite lock the writer waits for
+    db.add(models.IdempotencyKey(
+        user_id=seed.teacher_users[0], key="mark-1", fingerprint="an older request", status_code=200,
+        response_body="{}", created_at=datetime.utcnow() - timedelta(days=2),
+        expires_at=datetime.utcnow() - timedelta(days=1)
+    ))
+    db.commit()
+    headers = {**auth_headers(seed.teacher_users[0]), "Idempotency-Key": "mark-1"}
+
+    response = client.post("/api/attendance", json=_attendance(seed), headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert "Idempotent-Replayed" not in response.headers
+    db.expire_all()
+    keys = db.query(models.IdempotencyKey).filter(models.IdempotencyKey.key == "mark-1").all()
+    assert len(keys) == 1
+    assert keys[0].expires_at > datetime.utcnow()
+    assert db.query(models.Attendance).filter(models.Attendance.id == response.json()["id"]).count() == 1
+
+
+def test_group_commit_refuses_session_with_pending_writes(db, seed):
+    db.query(models.Course).filter(models.Course.id == seed.courses[0]).update({"description": "changed"})
+
+    assert group_commit.holds_write_lock(db)
+    db.rollback()
+    assert not group_commit.holds_write_lock(db)
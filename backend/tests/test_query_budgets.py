@@ -0,0 +1,217 @@
+"""
+Every route in query_inspector.ROUTE_QUERY_BUDGETS, called once against the
+seeded school through the query_budget fixture.
+"""
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import ACADEMIC_YEAR, NEXT_ACADEMIC_YEAR, GRADE_LEVEL, PASSWORD, auth_headers
+from query_inspector import ROUTE_QUERY_BUDGETS
+
+
+def call(path, role="admin", status=200, **kwargs):
+    return {"path": path, "role": role, "status": status, "kwargs": kwargs}
+
+
+STATEMENT_CSV = (
+    "transaction_id,student_id,amount,date,payment_method\n"
+    "BNK-1-0,STU0000,3000.00,2024-09-01,\n"
+    "BNK-NEW-1,STU0001,3000.00,2024-09-02,card\n"
+    "BNK-NEW-2,STU9999,10.00,2024-09-03,\n"
+)
+
+# (method, route template) -> the call to make, given the seed
+CASES = {
+    ("POST", "/api/auth/register"): lambda s: call("/api/auth/register", role=None, json={
+        "email": "new@example.com", "password": "pw", "first_name": "New", "last_name": "User", "role": "student"
+    }),
+    ("POST", "/api/auth/login"): lambda s: call("/api/auth/login", role=None, json={
+        "email": "admin@example.com", "password": PASSWORD
+    }),
+
+    ("GET", "/api/students"): lambda s: call("/api/students"),
+    ("GET", "/api/students/{student_id}"): lambda s: call(f"/api/students/{s.students[0]}"),
+    ("POST", "/api/students"): lambda s: call("/api/students", json={
+        "email": "enrolling@example.com", "password": "pw", "first_name": "En", "last_name": "Rolling",
+        "grade_level": GRADE_LEVEL, "student_id": "STU0100"
+    }),
+    ("PUT", "/api/students/{student_id}"): lambda s: call(f"/api/students/{s.students[0]}", json={"phone": "555"}),
+    ("DELETE", "/api/students/{student_id}"): lambda s: call(f"/api/students/{s.students[0]}"),
+    ("GET", "/api/students/{student_id}/courses"): lambda s: call(f"/api/students/{s.students[0]}/courses"),
+    ("GET", "/api/students/{student_id}/grades"): lambda s: call(f"/api/students/{s.students[0]}/grades"),
+    ("GET", "/api/students/{student_id}/transcript"): lambda s: call(f"/api/students/{s.students[0]}/transcript"),
+    ("GET", "/api/students/{student_id}/attendance"): lambda s: call(f"/api/students/{s.students[0]}/attendance"),
+    ("GET", "/api/students/{student_id}/overview"): lambda s: call(f"/api/students/{s.students[0]}/overview"),
+    ("GET", "/api/students/{student_id}/guardians"): lambda s: call(f"/api/students/{s.students[0]}/guardians"),
+    ("POST", "/api/students/{student_id}/guardians"): lambda s: call(
+        f"/api/students/{s.students[4]}/guardians", json={"user_id": s.guardian}
+    ),
+    ("DELETE", "/api/students/{student_id}/guardians/{user_id}"): lambda s: call(
+        f"/api/students/{s.students[0]}/guardians/{s.guardian}"
+    ),
+
+    ("GET", "/api/teachers"): lambda s: call("/api/teachers"),
+    ("POST", "/api/teachers"): lambda s: call("/api/teachers", json={
+        "email": "hired@example.com", "password": "pw", "first_name": "Hi", "last_name": "Red"
+    }),
+    ("PUT", "/api/teachers/{teacher_id}"): lambda s: call(f"/api/teachers/{s.teachers[0]}", json={"phone": "555"}),
+    ("DELETE", "/api/teachers/{teacher_id}"): lambda s: call(f"/api/teachers/{s.teachers[1]}"),
+
+    ("GET", "/api/courses"): lambda s: call("/api/courses"),
+    ("GET", "/api/courses/summary"): lambda s: call("/api/courses/summary"),
+    ("GET", "/api/courses/{course_id}"): lambda s: call(f"/api/courses/{s.courses[0]}"),
+    ("POST", "/api/courses"): lambda s: call("/api/courses", json={
+        "name": "New Course", "code": "NEW-1", "teacher_id": s.teachers[0], "capacity": 30
+    }),
+    ("PUT", "/api/courses/{course_id}"): lambda s: call(f"/api/courses/{s.courses[0]}", json={"capacity": 40}),
+    ("DELETE", "/api/courses/{course_id}"): lambda s: call(f"/api/courses/{s.courses[0]}"),
+    ("GET", "/api/courses/{course_id}/assignments"): lambda s: call(f"/api/courses/{s.courses[0]}/assignments"),
+    ("GET", "/api/courses/{course_id}/grading-policy"): lambda s: call(
+        f"/api/courses/{s.courses[0]}/grading-policy", role="teacher"
+    ),
+    ("PUT", "/api/courses/{course_id}/grading-policy"): lambda s: call(
+        f"/api/courses/{s.courses[0]}/grading-policy", role="teacher", json={
+            "categories": [{"name": "Homework", "weight": 30}, {"name": "Exams", "weight": 70, "drop_lowest": 1}]
+        }
+    ),
+    ("GET", "/api/courses/{course_id}/gradebook"): lambda s: call(
+        f"/api/courses/{s.courses[0]}/gradebook", role="teacher"
+    ),
+
+    ("POST", "/api/enrollments"): lambda s: call("/api/enrollments", status=202, json={
+        "student_id": s.students[4], "course_id": s.full_course
+    }),
+    ("POST", "/api/enrollments/bulk"): lambda s: call("/api/enrollments/bulk", json={
+        "course_id": s.full_course, "student_ids": s.students
+    }),
+    ("DELETE", "/api/enrollments/{enrollment_id}"): lambda s: call(f"/api/enrollments/{s.enrollments[-1]}"),
+    ("GET", "/api/enrollments/waitlist"): lambda s: call("/api/enrollments/waitlist", params={
+        "course_id": s.full_course
+    }),
+    ("DELETE", "/api/enrollments/waitlist/{entry_id}"): lambda s: call(f"/api/enrollments/waitlist/{s.waitlist[0]}"),
+
+    ("GET", "/api/assignments"): lambda s: call("/api/assignments"),
+    ("POST", "/api/assignments"): lambda s: call("/api/assignments", role="teacher", json={
+        "course_id": s.courses[0], "title": "Essay", "max_points": 50, "category": "Homework"
+    }),
+    ("PUT", "/api/assignments/{assignment_id}"): lambda s: call(
+        f"/api/assignments/{s.assignments[0]}", role="teacher", json={"max_points": 25}
+    ),
+    ("DELETE", "/api/assignments/{assignment_id}"): lambda s: call(
+        f"/api/assignments/{s.assignments[0]}", role="teacher"
+    ),
+
+    ("POST", "/api/grades"): lambda s: call("/api/grades", role="teacher", headers={"Idempotency-Key": "grade-1"},
+                                            json={"student_id": s.students[0], "assignment_id": s.assignments[3],
+                                                  "points_earned": 18}),
+    ("PUT", "/api/grades/{grade_id}"): lambda s: call(f"/api/grades/{s.grades[0]}", role="teacher", json={
+        "points_earned": 12
+    }),
+    ("DELETE", "/api/grades/{grade_id}"): lambda s: call(f"/api/grades/{s.grades[0]}", role="teacher"),
+
+    ("POST", "/api/attendance"): lambda s: call("/api/attendance", role="teacher",
+                                                headers={"Idempotency-Key": "attendance-1"}, json={
+        "student_id": s.students[0], "course_id": s.courses[0], "date": "2024-10-01", "status": "late"
+    }),
+    ("GET", "/api/attendance"): lambda s: call("/api/attendance", role="teacher", params={
+        "date": (date.today() - timedelta(days=1)).isoformat()
+    }),
+
+    ("GET", "/api/announcements"): lambda s: call("/api/announcements"),
+    ("POST", "/api/announcements"): lambda s: call("/api/announcements", role="teacher", json={
+        "title": "Trip", "content": "Museum on Friday"
+    }),
+    ("POST", "/api/announcements/read"): lambda s: call("/api/announcements/read", role="student"),
+    ("DELETE", "/api/announcements/{announcement_id}"): lambda s: call(f"/api/announcements/{s.announcements[0]}"),
+
+    ("GET", "/api/dashboard/stats"): lambda s: call("/api/dashboard/stats"),
+    ("GET", "/api/dashboard/teacher"): lambda s: call("/api/dashboard/teacher", role="teacher"),
+    ("GET", "/api/dashboard/student"): lambda s: call("/api/dashboard/student", role="student"),
+
+    ("GET", "/api/report-cards"): lambda s: call("/api/report-cards"),
+    ("GET", "/api/report-cards/student/{student_id}"): lambda s: call(f"/api/report-cards/student/{s.students[0]}"),
+    ("GET", "/api/report-cards/archive"): lambda s: call("/api/report-cards/archive", params={
+        "academic_year": ACADEMIC_YEAR, "term": "fall"
+    }),
+    ("GET", "/api/report-cards/{report_card_id}"): lambda s: call(f"/api/report-cards/{s.report_cards[0]}"),
+    ("POST", "/api/report-cards"): lambda s: call("/api/report-cards", json={
+        "student_id": s.students[0], "academic_year": ACADEMIC_YEAR, "term": "spring",
+        "skill_assessments": [{"skill_name": "Reading", "score": 4}, {"skill_name": "Writing", "score": 3}]
+    }),
+    ("PUT", "/api/report-cards/{report_card_id}"): lambda s: call(f"/api/report-cards/{s.report_cards[0]}", json={
+        "teacher_remarks": "Steady progress"
+    }),
+    ("DELETE", "/api/report-cards/{report_card_id}"): lambda s: call(f"/api/report-cards/{s.report_cards[0]}"),
+    ("POST", "/api/report-cards/generate/{student_id}"): lambda s: call(
+        f"/api/report-cards/generate/{s.students[0]}", params={"academic_year": ACADEMIC_YEAR, "term": "spring"}
+    ),
+    ("POST", "/api/report-cards/generate-term"): lambda s: call("/api/report-cards/generate-term", status=202, params={
+        "academic_year": ACADEMIC_YEAR, "term": "spring"
+    }),
+
+    ("GET", "/api/early-warning"): lambda s: call("/api/early-warning", role="teacher"),
+    ("POST", "/api/early-warning/refresh"): lambda s: call("/api/early-warning/refresh", status=202),
+
+    ("GET", "/api/fees/structures"): lambda s: call("/api/fees/structures"),
+    ("GET", "/api/fees/structures/{academic_year}/{grade_level}"): lambda s: call(
+        f"/api/fees/structures/{ACADEMIC_YEAR}/{GRADE_LEVEL}"
+    ),
+    ("POST", "/api/fees/structures"): lambda s: call("/api/fees/structures", json={
+        "academic_year": ACADEMIC_YEAR, "grade_level": GRADE_LEVEL + 1, "tuition": 9500, "total_annual": 9500
+    }),
+    ("PUT", "/api/fees/structures/{structure_id}"): lambda s: call(f"/api/fees/structures/{s.structures[0]}", json={
+        "total_annual": 9900
+    }),
+    ("DELETE", "/api/fees/structures/{structure_id}"): lambda s: call(f"/api/fees/structures/{s.structures[1]}"),
+    ("GET", "/api/fees/records"): lambda s: call("/api/fees/records"),
+    ("GET", "/api/fees/records/student/{student_id}"): lambda s: call(f"/api/fees/records/student/{s.students[0]}"),
+    ("GET", "/api/fees/records/{record_id}"): lambda s: call(f"/api/fees/records/{s.fee_records[0]}"),
+    ("POST", "/api/fees/records"): lambda s: call("/api/fees/records", headers={"Idempotency-Key": "fee-1"}, json={
+        "student_id": s.students[0], "academic_year": ACADEMIC_YEAR, "term": "summer", "amount": 150,
+        "due_date": "2025-06-01"
+    }),
+    ("PUT", "/api/fees/records/{record_id}"): lambda s: call(f"/api/fees/records/{s.fee_records[0]}", json={
+        "status": "paid", "paid_date": "2024-09-01"
+    }),
+    ("DELETE", "/api/fees/records/{record_id}"): lambda s: call(f"/api/fees/records/{s.fee_records[0]}"),
+    ("POST", "/api/fees/records/generate/{student_id}"): lambda s: call(
+        f"/api/fees/records/generate/{s.students[0]}", params={"academic_year": NEXT_ACADEMIC_YEAR}
+    ),
+    ("POST", "/api/fees/records/generate-year"): lambda s: call("/api/fees/records/generate-year", status=202, params={
+        "academic_year": NEXT_ACADEMIC_YEAR
+    }),
+    ("POST", "/api/fees/records/reconcile"): lambda s: call("/api/fees/records/reconcile", files={
+        "file": ("statement.csv", STATEMENT_CSV.encode(), "text/csv")
+    }),
+
+    ("GET", "/api/jobs"): lambda s: call("/api/jobs"),
+    ("GET", "/api/jobs/{job_id}"): lambda s: call(f"/api/jobs/{s.job}"),
+    ("POST", "/api/jobs/{job_id}/cancel"): lambda s: call(f"/api/jobs/{s.job}/cancel"),
+    ("POST", "/api/batch"): lambda s: call("/api/batch", json={"requests": [
+        {"method": "GET", "path": f"/api/students/{s.students[0]}/overview"},
+        {"method": "GET", "path": "/api/courses/summary"},
+    ]}),
+    ("GET", "/api/sync"): lambda s: call("/api/sync", role="teacher"),
+}
+
+
+def test_every_budgeted_route_has_a_case():
+    assert set(CASES) == set(ROUTE_QUERY_BUDGETS)
+
+
+@pytest.mark.parametrize("route", sorted(ROUTE_QUERY_BUDGETS), ids=" ".join)
+def test_route_within_query_budget(route, client, query_budget, seed):
+    method, _ = route
+    case = CASES[route](seed)
+    kwargs = dict(case["kwargs"])
+    users = {"admin": seed.admin, "teacher": seed.teacher_users[0], "student": seed.student_users[0]}
+    if case["role"] is not None:
+        kwargs["headers"] = {**auth_headers(users[case["role"]]), **kwargs.get("headers", {})}
+
+    response = query_budget(client, method, case["path"], **kwargs)
+
+    assert response.status_code == case["status"], response.text
+    if route == ("POST", "/api/batch"):
+        assert [item["status"] for item in json.loads(response.content)["responses"]] == [200, 200]
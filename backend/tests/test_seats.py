@@ -0,0 +1,87 @@
+"""
+Course capacity under concurrent enrollment: no oversubscription, no counter
+drift, and freed seats go to the waitlist.
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import models
+
+CAPACITY = 5
+APPLICANTS = 24
+
+
+@pytest.fixture
+def rush(db, seed):
+    course = models.Course(name="Popular", code="POP-1", teacher_id=seed.teachers[0], capacity=CAPACITY,
+                           enrolled_count=0)
+    students = [models.Student(grade_level=10, student_id=f"RUSH{i:04d}") for i in range(APPLICANTS)]
+    db.add_all([course, *students])
+    db.commit()
+    return course.id, [student.id for student in students]
+
+
+def _concurrently(calls):
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        return [future.result() for future in [pool.submit(call) for call in calls]]
+
+
+def _seats(db, course_id):
+    db.expire_all()
+    course = db.get(models.Course, course_id)
+    enrollments = db.query(models.Enrollment).filter(models.Enrollment.course_id == course_id).all()
+    waitlisted = db.query(models.WaitlistEntry.student_id).filter(models.WaitlistEntry.course_id == course_id).count()
+    return course.enrolled_count, enrollments, waitlisted
+
+
+def test_concurrent_claims_fill_exactly_capacity(client, db, rush, teacher_headers):
+    course_id, student_ids = rush
+
+    responses = _concurrently([
+        lambda student_id=student_id: client.post(
+            "/api/enrollments", json={"student_id": student_id, "course_id": course_id}, headers=teacher_headers
+        )
+        for student_id in student_ids
+    ])
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200] * CAPACITY + [202] * (APPLICANTS - CAPACITY)
+    enrolled_count, enrollments, waitlisted = _seats(db, course_id)
+    assert enrolled_count == CAPACITY == len(enrollments)
+    assert waitlisted == APPLICANTS - CAPACITY
+
+
+def test_concurrent_unenrollments_refill_from_waitlist(client, db, rush, teacher_headers):
+    course_id, student_ids = rush
+    for student_id in student_ids:
+        client.post("/api/enrollments", json={"student_id": student_id, "course_id": course_id},
+                    headers=teacher_headers)
+    _, enrollments, _ = _seats(db, course_id)
+    leaving = [enrollment.id for enrollment in enrollments[:3]]
+
+    responses = _concurrently([
+        lambda enrollment_id=enrollment_id: client.delete(f"/api/enrollments/{enrollment_id}", headers=teacher_headers)
+        for enrollment_id in leaving
+    ])
+
+    assert [response.status_code for response in responses] == [200] * len(leaving)
+    promoted = [student_id for response in responses for student_id in response.json()["promoted_student_ids"]]
+    enrolled_count, enrollments, waitlisted = _seats(db, course_id)
+    assert enrolled_count == CAPACITY == len(enrollments)
+    assert len(promoted) == len(set(promoted)) == len(leaving)
+    assert set(promoted) <= {enrollment.student_id for enrollment in enrollments}
+    assert waitlisted == APPLICANTS - CAPACITY - len(leaving)
+
+
+def test_registration_rush_benchmark(db):
+    # The benchmark's default run: 500 students after 100 seats, 100 requests in flight
+    from benchmarks import enrollment_contention
+
+    args = argparse.Namespace(students=500, capacity=100, concurrency=100, drop=25, base_url=None, output=None)
+    report = asyncio.run(enrollment_contention.run(args))
+
+    assert enrollment_contention.check(report, args.students, args.capacity, args.drop) == []
+    assert report["phases"]["enroll"]["errors"] == 0
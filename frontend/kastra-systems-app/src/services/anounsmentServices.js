@@ -3,5 +3,6 @@ import { get, post, del } from './api';
 export const announcementService = {
   getAllAnnouncements: async () => await get('/announcements'),
   createAnnouncement: async (data) => await post('/announcements', data),
+  markAnnouncementsRead: async () => await post('/announcements/read'),
   deleteAnnouncement: async (id) => await del(`/announcements/${id}`),
 };
@@ -2,6 +2,7 @@ import { get, post, put, del } from './api';
 
 export const courseService = {
   getAllCourses: async () => await get('/courses'),
+  getCourseSummaries: async (params = {}) => await get(`/courses/summary?${new URLSearchParams(params)}`),
   getCourseById: async (id) => await get(`/courses/${id}`),
   createCourse: async (data) => await post('/courses', data),
   updateCourse: async (id, data) => await put(`/courses/${id}`, data),
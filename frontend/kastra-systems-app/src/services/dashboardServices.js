@@ -4,6 +4,8 @@ const API_BASE_URL = import.meta.env.VITE_API_URL?.replace('/api', '') || 'http:
 
 export const dashboardService = {
   getStats: async () => await get('/dashboard/stats'),
+  getTeacherDashboard: async () => await get('/dashboard/teacher'),
+  getStudentDashboard: async () => await get('/dashboard/student'),
   getHealth: async () => {
     try {
       const response = await fetch(`${API_BASE_URL}/health`);
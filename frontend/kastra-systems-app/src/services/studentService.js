@@ -26,6 +26,11 @@ const studentService = {
     return await del(`/students/${id}`);
   },
 
+  // Get profile, courses, recent grades, attendance, latest report card and fees in one request
+  getStudentOverview: async (id) => {
+    return await get(`/students/${id}/overview`);
+  },
+
   // Get student courses
   getStudentCourses: async (id) => {
     return await get(`/students/${id}/courses`);